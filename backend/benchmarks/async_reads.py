@@ -0,0 +1,108 @@
+"""Load test of the read-heavy endpoints on the sync engine versus the async engine.
+
+Ingests a synthetic corpus once (see benchmarks.e2e), then starts the server with
+DB_ASYNC_READS=false and =true in turn and drives /api/search, /api/papers and
+/api/projects with the same number of concurrent clients, reporting throughput and
+latency percentiles per path as JSON.
+
+    python -m benchmarks.async_reads --clients 200 --requests 4000 --output async-reads.json
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+from typing import Dict, List
+from sqlalchemy import create_engine, text
+from config import EMBEDDING_DIMENSION
+from benchmarks import corpus
+from benchmarks.e2e import (
+    git_revision, ingest, load_test, prepare_database, running_server, scratch_schema, server_env
+)
+from benchmarks.stub_embeddings import StubEmbeddingServer
+
+PROJECTS = 20
+
+
+def add_projects(database_url: str):
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as conn:
+            user_id = conn.execute(text("SELECT id FROM users WHERE username = 'bench'")).scalar()
+            conn.execute(text(
+                "INSERT INTO projects (name, status, investigatory_team, date_initialized, created_by) "
+                "VALUES (:name, 'ongoing', '[]', now(), :user_id)"
+            ), [{"name": f"Project {i}", "user_id": user_id} for i in range(PROJECTS)])
+    finally:
+        engine.dispose()
+
+
+def endpoint_params(queries: List[str], top_k: int) -> Dict[str, List[dict]]:
+    return {
+        "/api/search": [{"query": query, "top_k": top_k} for query in queries],
+        "/api/papers": [{"limit": 50}, {"limit": 50, "after": 25}, {"limit": 20, "fields": "id,title,category"}],
+        "/api/projects": [{}],
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=5, help="pages per synthetic paper")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=4000, help="requests per endpoint and path")
+    parser.add_argument("--queries", type=int, default=500, help="distinct synthetic search queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--dimension", type=int, default=EMBEDDING_DIMENSION, help="stub embedding dimension")
+    parser.add_argument("--stub-latency", type=float, default=0.02, help="seconds added to every embeddings request")
+    parser.add_argument("--output", help="JSON report path (default: stdout)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench-async-")
+    stub = StubEmbeddingServer(dimension=args.dimension, latency=args.stub_latency).start()
+    report = {**git_revision(), "config": {key: value for key, value in vars(args).items() if key != "output"}, "results": []}
+    params = endpoint_params(corpus.queries(args.queries), args.top_k)
+    try:
+        with scratch_schema() as (_, database_url):
+            prepare_database(database_url)
+            add_projects(database_url)
+            # Caches off so every request reaches the database
+            env = server_env(workdir, database_url, stub, args.dimension, caches=False)
+            incoming = os.path.join(workdir, "incoming")
+            corpus.generate(incoming, args.papers, args.pages)
+            print(f"Ingesting {args.papers} papers", file=sys.stderr)
+            report["ingest"] = ingest(env, incoming, args.papers, args.papers * args.pages)
+
+            for path_name, flag in (("sync", "false"), ("async", "true")):
+                with running_server({**env, "DB_ASYNC_READS": flag}, args.port, args.workers) as (_, base_url, _):
+                    for endpoint, endpoint_queries in params.items():
+                        print(f"{path_name} {endpoint}: {args.clients} clients", file=sys.stderr)
+                        load_test(base_url, endpoint, endpoint_queries, args.clients, args.clients)  # warm-up
+                        result = load_test(base_url, endpoint, endpoint_queries, args.clients, args.requests)
+                        report["results"].append({"path": path_name, "endpoint": endpoint, **result})
+    finally:
+        stub.shutdown()
+        stub.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    by_key = {(row["path"], row["endpoint"]): row for row in report["results"]}
+    report["speedup"] = {
+        endpoint: round(by_key[("async", endpoint)]["throughput_rps"] / by_key[("sync", endpoint)]["throughput_rps"], 2)
+        for endpoint in params if by_key[("sync", endpoint)]["throughput_rps"]
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+    for row in report["results"]:
+        print(f"{row['path']:>6} {row['endpoint']:<14} {row['throughput_rps']:>8} req/s  p50 {row.get('p50_ms')}  "
+              f"p99 {row.get('p99_ms')} ms  errors {row['errors']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
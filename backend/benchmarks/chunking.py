@@ -0,0 +1,97 @@
+"""Compare the structure-aware chunker with the previous fixed-width character chunker.
+
+    python -m benchmarks.chunking                          # every PDF in STORAGE_PATH
+    python -m benchmarks.chunking book.pdf --pages 1000    # repeat pages up to a 1,000-page book
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from typing import Callable, Dict, List, Tuple
+from config import STORAGE_PATH, CHUNK_SIZE, CHUNK_OVERLAP
+from chunker import chunk_document, count_tokens
+from pdf_extract import PAGE_BREAK, iter_pages
+
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*$")
+
+
+def legacy_chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[Tuple[int, int]]:
+    """The previous utils.chunk_text as spans; its broken ``chunks[-1].start`` progress
+    check (an AttributeError on str) is dropped, since ``size > overlap`` guarantees progress"""
+    spans = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if text[start:end].strip():
+            spans.append((start, end))
+        start += size - overlap
+    return spans
+
+
+def new_chunk_spans(text: str) -> List[Tuple[int, int]]:
+    return [(chunk.start, chunk.end) for chunk in chunk_document(text)]
+
+
+def measure(name: str, chunk: Callable[[str], List[Tuple[int, int]]], text: str) -> Dict[str, float]:
+    started = time.perf_counter()
+    spans = chunk(text)
+    elapsed = time.perf_counter() - started
+
+    pieces = [text[start:end].strip() for start, end in spans]
+    tokens = count_tokens(pieces)
+    mid_word = sum(
+        1 for start, end in spans
+        if (start > 0 and text[start - 1].isalnum() and text[start].isalnum())
+        or (end < len(text) and text[end - 1].isalnum() and text[end].isalnum())
+    )
+    mid_sentence = sum(1 for piece in pieces if not SENTENCE_END.search(piece))
+    return {
+        "chunker": name,
+        "seconds": round(elapsed, 4),
+        "chunks": len(spans),
+        "mean_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0,
+        "max_tokens": max(tokens, default=0),
+        "mid_word_cuts": round(mid_word / len(spans), 3) if spans else 0,
+        "mid_sentence_ends": round(mid_sentence / len(spans), 3) if spans else 0,
+    }
+
+
+def load_text(paths: List[str], pages: int) -> Tuple[str, int]:
+    page_texts = [text + "\n" for path in paths for _, text in iter_pages(path)]
+    if not page_texts:
+        sys.exit("No PDF pages to benchmark")
+    if pages:
+        page_texts = (page_texts * (pages // len(page_texts) + 1))[:pages]
+    return PAGE_BREAK.join(page_texts), len(page_texts)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="*", help="PDFs to chunk (default: every PDF in STORAGE_PATH)")
+    parser.add_argument("--pages", type=int, default=0, help="repeat pages to reach this many")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    paths = args.pdfs or sorted(
+        os.path.join(STORAGE_PATH, name) for name in os.listdir(STORAGE_PATH) if name.lower().endswith(".pdf")
+    )
+    text, page_count = load_text(paths, args.pages)
+    results = [
+        measure("legacy_chunk_text", legacy_chunk_text, text),
+        measure("chunk_document", new_chunk_spans, text),
+    ]
+
+    if args.json:
+        print(json.dumps({"pages": page_count, "characters": len(text), "results": results}, indent=2))
+        return
+    print(f"{page_count} pages, {len(text)} characters")
+    columns = list(results[0])
+    print("  ".join(f"{column:>18}" for column in columns))
+    for row in results:
+        print("  ".join(f"{row[column]:>18}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Synthetic research papers for benchmarks: deterministic PDFs or plain text of any size.
+
+Each paper draws most of its vocabulary from one topic, so keyword and (stub) semantic
+search return structured results, and carries a title, authors, abstract and keywords
+on its first page for metadata extraction.
+
+    python -m benchmarks.corpus out/ --papers 200 --pages 12
+    python -m benchmarks.corpus out/ --papers 50 --format txt
+"""
+import os
+import random
+import argparse
+from typing import List
+
+TOPICS = {
+    "ayurveda": ["ayurvedic", "dosha", "vata", "pitta", "kapha", "rasayana", "churna", "ashwagandha", "triphala", "panchakarma"],
+    "cardiology": ["cardiac", "hypertension", "arrhythmia", "myocardial", "statin", "cholesterol", "ventricular", "angina", "vascular", "infarction"],
+    "oncology": ["tumour", "carcinoma", "chemotherapy", "metastasis", "radiotherapy", "biopsy", "lymphoma", "malignant", "oncogene", "remission"],
+    "neurology": ["neuronal", "cognitive", "dementia", "epilepsy", "synaptic", "cortex", "migraine", "stroke", "neuropathy", "dopamine"],
+    "nutrition": ["dietary", "micronutrient", "protein", "vitamin", "glycaemic", "obesity", "fibre", "metabolism", "supplement", "calorie"],
+    "immunology": ["antibody", "cytokine", "antigen", "immunity", "vaccine", "inflammation", "lymphocyte", "allergy", "autoimmune", "interleukin"],
+    "pharmacology": ["dosage", "pharmacokinetic", "bioavailability", "toxicity", "receptor", "inhibitor", "clearance", "plasma", "agonist", "formulation"],
+    "epidemiology": ["cohort", "prevalence", "incidence", "mortality", "population", "surveillance", "outbreak", "risk", "exposure", "screening"],
+}
+COMMON = [
+    "the", "study", "patients", "results", "were", "observed", "significant", "analysis", "group", "treatment",
+    "effect", "clinical", "trial", "randomised", "controlled", "data", "compared", "outcome", "baseline", "follow",
+    "reported", "associated", "increase", "reduction", "method", "measured", "evidence", "sample", "participants", "level",
+]
+SURNAMES = ["Sharma", "Gupta", "Iyer", "Rao", "Mehta", "Singh", "Nair", "Das", "Kulkarni", "Bose", "Chen", "Smith"]
+WORDS_PER_PAGE = 450  # about a page of body text at 11pt
+
+
+def topic_of(index: int) -> str:
+    return sorted(TOPICS)[index % len(TOPICS)]
+
+
+def sentence(rng: random.Random, topic: str) -> str:
+    words = [rng.choice(TOPICS[topic]) if rng.random() < 0.3 else rng.choice(COMMON) for _ in range(rng.randint(8, 22))]
+    return " ".join(words).capitalize() + "."
+
+
+def paragraph(rng: random.Random, topic: str) -> str:
+    return " ".join(sentence(rng, topic) for _ in range(rng.randint(3, 7)))
+
+
+def paper_pages(index: int, pages: int, seed: int = 0) -> List[str]:
+    """Page texts of synthetic paper ``index``; the same arguments always give the same paper"""
+    rng = random.Random(seed * 1_000_003 + index)
+    topic = topic_of(index)
+    keywords = rng.sample(TOPICS[topic], 4)
+    header = "\n".join([
+        f"{keywords[0].capitalize()} and {keywords[1]} outcomes in {topic} cohorts: study {index}",
+        ", ".join(f"{rng.choice('ABCDEFGHJKMNPRS')}. {rng.choice(SURNAMES)}" for _ in range(rng.randint(1, 4))),
+        f"Journal of Synthetic {topic.capitalize()} Research, {rng.randint(2000, 2024)}",
+        "",
+        "Abstract",
+        paragraph(rng, topic),
+        f"Keywords: {', '.join(keywords)}",
+        "",
+    ])
+    texts = []
+    for page in range(pages):
+        body = [header] if page == 0 else []
+        words = header.count(" ") if page == 0 else 0
+        while words < WORDS_PER_PAGE:
+            text = paragraph(rng, topic)
+            body.append(text)
+            words += text.count(" ") + 1
+        texts.append("\n\n".join(body))
+    return texts
+
+
+def write_pdf(path: str, pages: List[str]):
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    try:
+        for text in pages:
+            page = doc.new_page()
+            page.insert_textbox(page.rect + (50, 50, -50, -50), text, fontsize=9)
+        doc.save(path, deflate=True)
+    finally:
+        doc.close()
+
+
+def generate(directory: str, papers: int, pages: int = 10, fmt: str = "pdf", seed: int = 0, start: int = 0) -> List[str]:
+    """Write papers [start, start + papers) to directory, returning their paths"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(start, start + papers):
+        path = os.path.join(directory, f"synthetic-{seed}-{index:06d}.{fmt}")
+        texts = paper_pages(index, pages, seed)
+        if fmt == "pdf":
+            write_pdf(path, texts)
+        else:
+            with open(path, "w") as f:
+                f.write("\f".join(texts))
+        paths.append(path)
+    return paths
+
+
+def queries(count: int, seed: int = 0) -> List[str]:
+    """Search queries mixing topic and common words, spread across topics"""
+    rng = random.Random(seed + 7919)
+    out = []
+    for i in range(count):
+        topic = topic_of(i)
+        terms = rng.sample(TOPICS[topic], rng.randint(1, 3)) + rng.sample(COMMON[5:], rng.randint(0, 2))
+        rng.shuffle(terms)
+        out.append(" ".join(terms))
+    return out
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--papers", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=10, help="pages per paper")
+    parser.add_argument("--format", choices=("pdf", "txt"), default="pdf")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    paths = generate(args.directory, args.papers, args.pages, args.format, args.seed)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {len(paths)} papers ({size / 2 ** 20:.1f} MB) to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
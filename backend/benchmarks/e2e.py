@@ -0,0 +1,354 @@
+"""End-to-end benchmarks: ingestion throughput, search latency under concurrency, memory and
+index size as the corpus grows.
+
+Each run uses a scratch Postgres schema and a temporary data directory, swaps the embeddings
+API for the local stub (benchmarks.stub_embeddings), ingests synthetic PDFs with ingest.py and
+load-tests a real uvicorn server. The report is JSON, so runs can be compared between commits.
+
+    python -m benchmarks.e2e --sizes 50 200 --pages 10 --concurrency 1 8 32 --output e2e.json
+    python -m benchmarks.e2e --compare before.json after.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import itertools
+import threading
+import statistics
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+import requests
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from config import DATABASE_URL, EMBEDDING_DIMENSION
+from benchmarks import corpus
+from benchmarks.stub_embeddings import StubEmbeddingServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_TIMEOUT = 600
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {"p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99),
+            "mean_ms": round(statistics.mean(ordered), 2), "max_ms": round(ordered[-1], 2)}
+
+
+def load_test(base_url: str, path: str, params: List[dict], concurrency: int, total: int,
+              headers: Optional[dict] = None, timeout: float = 60) -> Dict:
+    """Send ``total`` GETs from ``concurrency`` clients, cycling through ``params``; returns
+    throughput, latency percentiles and error counts"""
+    latencies, errors, lock = [], {}, threading.Lock()
+    counter = itertools.count()
+
+    def client():
+        session = requests.Session()
+        if headers:
+            session.headers.update(headers)
+        while (n := next(counter)) < total:
+            started = time.perf_counter()
+            try:
+                response = session.get(f"{base_url}{path}", params=params[n % len(params)], timeout=timeout)
+                status = response.status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+        session.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {"concurrency": concurrency, "requests": total, "seconds": round(elapsed, 2),
+            "throughput_rps": round(len(latencies) / elapsed, 1), **percentiles(latencies), "errors": errors}
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident memory in bytes of a process and all its descendants (Linux /proc)"""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    tree, frontier = {pid}, [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [child for child, ppid in parents.items() if ppid == parent and child not in tree]
+        tree.update(children)
+        frontier.extend(children)
+    rss = 0
+    for member in tree:
+        try:
+            with open(f"/proc/{member}/status") as f:
+                rss += next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            continue
+    return rss
+
+
+def dir_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def git_revision() -> Dict:
+    def git(*args) -> str:
+        result = subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True)
+        return result.stdout.strip()
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+@contextmanager
+def scratch_schema():
+    """Database URL whose connections use a fresh schema, dropped afterwards"""
+    schema = f"bench_e2e_{os.getpid()}"
+    admin_engine = create_engine(DATABASE_URL)
+    with admin_engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    url = make_url(DATABASE_URL).update_query_dict({"options": f"-csearch_path={schema}"})
+    try:
+        yield schema, url.render_as_string(hide_password=False)
+    finally:
+        with admin_engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin_engine.dispose()
+
+
+def prepare_database(url: str):
+    """Tables and the admin user that ingest.py records as the uploader"""
+    import models
+
+    engine = create_engine(url)
+    try:
+        models.Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(models.User.__table__.insert().values(
+                username="bench", email="bench@example.com", hashed_password="x", is_admin=True
+            ))
+    finally:
+        engine.dispose()
+
+
+def database_counts(url: str, schema: str) -> Dict[str, int]:
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            return {
+                "papers": conn.execute(text("SELECT count(*) FROM research_papers")).scalar(),
+                "chunks": conn.execute(text("SELECT count(*) FROM paper_chunks")).scalar(),
+                "database_bytes": int(conn.execute(text(
+                    "SELECT coalesce(sum(pg_total_relation_size(c.oid)), 0) FROM pg_class c "
+                    "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = :schema AND c.relkind = 'r'"
+                ), {"schema": schema}).scalar()),
+            }
+    finally:
+        engine.dispose()
+
+
+def server_env(workdir: str, database_url: str, stub: StubEmbeddingServer, dimension: int, caches: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("JWT_SECRET_KEY", "bench")
+    env.update({
+        "DATABASE_URL": database_url,
+        "STORAGE_PATH": os.path.join(workdir, "pdfs"),
+        "FAISS_INDEX_DIR": os.path.join(workdir, "faiss"),
+        "FAISS_INDEX_PATH": os.path.join(workdir, "faiss_index.pkl"),  # no legacy pickle to migrate
+        "VECTOR_STORE_DIR": os.path.join(workdir, "vectors"),
+        "KEYWORD_INDEX_DIR": os.path.join(workdir, "keyword"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+        "OPENROUTER_BASE_URL": stub.url,
+        "OPENROUTER_API_KEY": "stub",
+        "EMBEDDING_DIMENSION": str(dimension),
+    })
+    if not caches:  # measure the full pipeline on every request
+        env.update({"SEARCH_RESULT_CACHE_SIZE": "0", "QUERY_EMBEDDING_CACHE_SIZE": "0", "EMBEDDING_CACHE_MAX_MB": "0"})
+    return env
+
+
+def ingest(env: Dict[str, str], directory: str, papers: int, pages: int) -> Dict:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "ingest.py", directory, "--user", "bench"], cwd=BACKEND_DIR, env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - started
+    size = dir_size(directory)
+    return {"papers": papers, "pages": pages, "megabytes": round(size / 2 ** 20, 2), "seconds": round(elapsed, 2),
+            "papers_per_s": round(papers / elapsed, 2), "pages_per_s": round(pages / elapsed, 1),
+            "mb_per_s": round(size / 2 ** 20 / elapsed, 2)}
+
+
+@contextmanager
+def running_server(env: Dict[str, str], port: int, workers: int):
+    """Start uvicorn; yields (process, base_url, startup timings) once /api/ready answers 200"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    started, timings = time.perf_counter(), {}
+    try:
+        while "ready_s" not in timings:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with status {process.returncode}")
+            if time.perf_counter() - started > READY_TIMEOUT:
+                raise RuntimeError("Server did not become ready in time")
+            try:
+                for name, path in (("healthy_s", "/api/health"), ("ready_s", "/api/ready")):
+                    if name not in timings and requests.get(base_url + path, timeout=1).status_code == 200:
+                        timings[name] = round(time.perf_counter() - started, 2)
+            except requests.RequestException:
+                pass
+            time.sleep(0.05)
+        yield process, base_url, timings
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    stub = StubEmbeddingServer(dimension=args.dimension, latency=args.stub_latency).start()
+    report = {
+        **git_revision(),
+        "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "steps": [],
+    }
+    queries = [{"query": query, "top_k": args.top_k} for query in corpus.queries(args.queries, args.seed)]
+    try:
+        with scratch_schema() as (schema, database_url):
+            prepare_database(database_url)
+            env = server_env(workdir, database_url, stub, args.dimension, args.caches)
+            size = 0
+            for target in sorted(set(args.sizes)):
+                incoming = os.path.join(workdir, "incoming", str(target))
+                corpus.generate(incoming, target - size, args.pages, "pdf", args.seed, start=size)
+                print(f"Ingesting papers {size}..{target}", file=sys.stderr)
+                step = {"papers": target, "ingest": ingest(env, incoming, target - size, (target - size) * args.pages)}
+                size = target
+
+                with running_server(env, args.port, args.workers) as (process, base_url, startup):
+                    step["startup"] = startup
+                    step["search"] = []
+                    for concurrency in args.concurrency:
+                        print(f"Searching {target} papers with {concurrency} clients", file=sys.stderr)
+                        load_test(base_url, "/api/search", queries, concurrency, min(len(queries), concurrency * 2))  # warm-up
+                        step["search"].append(load_test(base_url, "/api/search", queries, concurrency, args.requests))
+                    rss = process_tree_rss(process.pid)
+                step["footprint"] = {
+                    "server_rss_mb": round(rss / 2 ** 20, 1),
+                    **{f"{name}_mb": round(dir_size(env[key]) / 2 ** 20, 2) for name, key in (
+                        ("faiss", "FAISS_INDEX_DIR"), ("vectors", "VECTOR_STORE_DIR"), ("keyword", "KEYWORD_INDEX_DIR")
+                    ) if os.path.exists(env[key])},
+                    **database_counts(database_url, schema),
+                }
+                report["steps"].append(step)
+    finally:
+        report["stub"] = stub.stats()
+        stub.shutdown()
+        stub.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves keyed by path; list items are keyed by their papers/concurrency field"""
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            out.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return out
+    if isinstance(value, list):
+        out = {}
+        for i, item in enumerate(value):
+            label = i
+            if isinstance(item, dict):
+                label = next((f"{key}={item[key]}" for key in ("papers", "concurrency") if key in item), i)
+            out.update(flatten(item, f"{prefix}[{label}]"))
+        return out
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before.get('commit') or before_path} -> {after.get('commit') or after_path}")
+    old, new = flatten(before.get("steps", [])), flatten(after.get("steps", []))
+    labels = ("papers", "pages", "concurrency", "requests")
+    for key in [key for key in new if key in old and key.rsplit(".", 1)[-1] not in labels]:
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else ""
+        print(f"{key:<60} {old[key]:>12} {new[key]:>12} {change:>9}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200], help="corpus sizes (papers), ingested incrementally")
+    parser.add_argument("--pages", type=int, default=10, help="pages per synthetic paper")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="concurrent search clients")
+    parser.add_argument("--requests", type=int, default=500, help="searches per concurrency level")
+    parser.add_argument("--queries", type=int, default=200, help="distinct synthetic queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dimension", type=int, default=EMBEDDING_DIMENSION, help="stub embedding dimension")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="seconds added to every embeddings request")
+    parser.add_argument("--caches", action="store_true", help="keep result, query and embedding caches enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON report path (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two JSON reports instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = run(args)
+    if not args.output:
+        print(json.dumps(report, indent=2))
+        return
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+    for step in report["steps"]:
+        ingest_stats = step["ingest"]
+        print(f"{step['papers']:>7} papers  ingest {ingest_stats['pages_per_s']} pages/s  "
+              f"ready in {step['startup']['ready_s']}s  rss {step['footprint']['server_rss_mb']} MB")
+        for row in step["search"]:
+            print(f"    c={row['concurrency']:<4} {row['throughput_rps']:>8} req/s  p50 {row.get('p50_ms')}  "
+                  f"p95 {row.get('p95_ms')}  p99 {row.get('p99_ms')} ms  errors {row['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Offline evaluation of hybrid ranking: recall@k and latency per fusion configuration.
+
+Reads labelled queries as JSON lines, {"query": "...", "relevant": [paper ids]}, runs each
+configuration against the live indexes and reports recall gained over the previous ranking
+per extra millisecond. Query embeddings are fetched once in a warm-up pass, so timings
+cover retrieval and fusion only.
+
+    python -m benchmarks.fusion queries.jsonl --top-k 10 --factors 2 5 10
+"""
+import sys
+import json
+import time
+import argparse
+import itertools
+import statistics
+from typing import Dict, List
+from database import SessionLocal
+import utils
+
+
+def legacy_hybrid_search(query: str, db, top_k: int, **_) -> List[dict]:
+    """The previous ranking: first chunk per paper, keyword BM25 / max, raw scores sorted together"""
+    semantic_results = utils.semantic_search(query, top_k * 2)
+    chunk_papers = utils.crud.get_chunk_paper_ids(db, [result['chunk_id'] for result in semantic_results])
+    keyword_results = utils.keyword_index.search(query, top_k * 2)
+    max_keyword_score = keyword_results[0][1] if keyword_results else 0.0
+
+    combined, seen = [], set()
+    for result in semantic_results:
+        paper_id = chunk_papers.get(result['chunk_id'])
+        if paper_id is not None and paper_id not in seen:
+            combined.append({'paper_id': paper_id, 'score': result['similarity_score']})
+            seen.add(paper_id)
+    for paper_id, keyword_score in keyword_results:
+        if paper_id not in seen:
+            combined.append({'paper_id': paper_id, 'score': keyword_score / max_keyword_score})
+            seen.add(paper_id)
+    combined.sort(key=lambda x: x['score'], reverse=True)
+    return combined[:top_k]
+
+
+def load_queries(path: str) -> List[dict]:
+    with open(path) as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    if not queries:
+        sys.exit(f"No labelled queries in {path}")
+    return queries
+
+
+def evaluate(db, name: str, search, queries: List[dict], top_k: int, repeats: int, **params) -> Dict:
+    recalls, timings = [], []
+    for item in queries:
+        relevant = set(item["relevant"])
+        for _ in range(repeats):
+            started = time.perf_counter()
+            results = search(item["query"], db, top_k, **params)
+            timings.append((time.perf_counter() - started) * 1000)
+        found = {result['paper_id'] for result in results}
+        recalls.append(len(found & relevant) / len(relevant) if relevant else 1.0)
+    return {
+        "config": name,
+        f"recall@{top_k}": round(statistics.mean(recalls), 4),
+        "mean_ms": round(statistics.mean(timings), 2),
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("queries", help="JSON lines of {query, relevant}")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--factors", type=int, nargs="+", default=[2, 5, 10], help="candidates per retriever, as multiples of top_k")
+    parser.add_argument("--weights", type=float, nargs="+", default=[0.5], help="semantic weights for weighted fusion")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    queries = load_queries(args.queries)
+    db = SessionLocal()
+    try:
+        for item in queries:  # warm the query embedding cache
+            utils.hybrid_search(item["query"], db, args.top_k)
+
+        results = [evaluate(db, "legacy", legacy_hybrid_search, queries, args.top_k, args.repeats)]
+        for factor, aggregation in itertools.product(args.factors, utils.fusion.CHUNK_AGGREGATIONS):
+            candidates = args.top_k * factor
+            results.append(evaluate(
+                db, f"rrf/{aggregation}/x{factor}", utils.hybrid_search, queries, args.top_k, args.repeats,
+                fusion_method="rrf", aggregation=aggregation, candidates=candidates
+            ))
+            for weight in args.weights:
+                results.append(evaluate(
+                    db, f"weighted{weight}/{aggregation}/x{factor}", utils.hybrid_search, queries, args.top_k,
+                    args.repeats, fusion_method="weighted", aggregation=aggregation, semantic_weight=weight,
+                    candidates=candidates
+                ))
+    finally:
+        db.close()
+
+    recall_key = f"recall@{args.top_k}"
+    baseline = results[0]
+    for row in results:
+        extra_ms = row["mean_ms"] - baseline["mean_ms"]
+        gained = row[recall_key] - baseline[recall_key]
+        row["recall_per_ms"] = round(gained / extra_ms, 4) if extra_ms > 0 else None
+
+    if args.json:
+        print(json.dumps({"queries": len(queries), "top_k": args.top_k, "results": results}, indent=2))
+        return
+    print(f"{len(queries)} queries, top_k={args.top_k}")
+    columns = list(results[0])
+    print("  ".join(f"{column:>24}" for column in columns))
+    for row in results:
+        print("  ".join(f"{str(row[column]):>24}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Recall versus memory for reduced FAISS vectors (Matryoshka truncation and PCA).
+
+Holds out sample vectors from the vector store as queries, takes exact full-dimension
+neighbours as ground truth and reports recall@k and flat-index memory for each reduction.
+Pick FAISS_REDUCTION / FAISS_REDUCED_DIMENSION from this, then `python init_faiss.py --reduce`.
+
+    python -m benchmarks.reduction --dims 1536 1024 512 256 --queries 500
+    python -m benchmarks.reduction --synthetic 100000   # random vectors, no stored data needed
+"""
+import sys
+import json
+import time
+import argparse
+import faiss
+import numpy as np
+from typing import Dict, List
+from config import EMBEDDING_DIMENSION, FAISS_METRIC
+from index_manager import faiss_metric, prepare_vectors, train_pca
+from vector_store import VectorStore
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int, metric: str) -> np.ndarray:
+    index = faiss.IndexFlat(vectors.shape[1], faiss_metric(metric))
+    index.add(vectors)
+    return index.search(queries, k)[1]
+
+
+def measure(name: str, dimension: int, corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray,
+            k: int, metric: str, transform=None) -> Dict:
+    reduction = "none" if dimension == corpus.shape[1] else name
+    started = time.perf_counter()
+    reduced = prepare_vectors(corpus, metric, reduction, dimension, transform)
+    reduced_queries = prepare_vectors(queries, metric, reduction, dimension, transform)
+    found = exact_neighbours(reduced, reduced_queries, k, metric)
+    elapsed = time.perf_counter() - started
+
+    recall = np.mean([len(np.intersect1d(row, expected)) / k for row, expected in zip(found, truth)])
+    bytes_per_vector = dimension * 4
+    return {
+        "reduction": reduction,
+        "dimension": dimension,
+        f"recall@{k}": round(float(recall), 4),
+        "bytes_per_vector": bytes_per_vector,
+        "vectors_per_gb": int(2 ** 30 // bytes_per_vector),
+        "memory_saving": round(corpus.shape[1] / dimension, 1),
+        "seconds": round(elapsed, 2),
+    }
+
+
+def load_vectors(synthetic: int) -> np.ndarray:
+    if synthetic:
+        rng = np.random.default_rng(0)
+        # Decaying per-dimension scale, so leading dimensions carry most of the signal
+        scale = 1.0 / np.sqrt(np.arange(1, EMBEDDING_DIMENSION + 1))
+        return (rng.standard_normal((synthetic, EMBEDDING_DIMENSION)) * scale).astype("float32")
+    vectors, _ = VectorStore().load_all()
+    if len(vectors) == 0:
+        sys.exit("The vector store is empty; pass --synthetic N to benchmark random vectors")
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dims", type=int, nargs="+", default=[1536, 1024, 512, 256, 128], help="reduced dimensions")
+    parser.add_argument("--queries", type=int, default=500, help="held-out vectors used as queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", default=FAISS_METRIC)
+    parser.add_argument("--synthetic", type=int, default=0, help="benchmark this many random vectors instead")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    vectors = load_vectors(args.synthetic)
+    rng = np.random.default_rng(1)
+    held_out = rng.choice(len(vectors), min(args.queries, len(vectors) // 10 or 1), replace=False)
+    mask = np.ones(len(vectors), dtype=bool)
+    mask[held_out] = False
+    corpus, queries = vectors[mask], vectors[held_out]
+
+    truth = exact_neighbours(prepare_vectors(corpus, args.metric), prepare_vectors(queries, args.metric), args.k, args.metric)
+    results = [measure("none", corpus.shape[1], corpus, queries, truth, args.k, args.metric)]
+    for dimension in sorted((d for d in args.dims if 0 < d < corpus.shape[1]), reverse=True):
+        results.append(measure("truncate", dimension, corpus, queries, truth, args.k, args.metric))
+        if len(corpus) >= dimension:
+            pca = train_pca(corpus, dimension)
+            results.append(measure("pca", dimension, corpus, queries, truth, args.k, args.metric, pca))
+
+    if args.json:
+        print(json.dumps({"vectors": len(corpus), "queries": len(queries), "metric": args.metric, "results": results}, indent=2))
+        return
+    print(f"{len(corpus)} vectors, {len(queries)} queries, {args.metric}")
+    columns = list(results[0])
+    print("  ".join(f"{column:>16}" for column in columns))
+    for row in results:
+        print("  ".join(f"{row[column]:>16}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Regression benchmark: search result assembly cost must not grow with corpus size.
+
+Builds synthetic corpora of increasing size in a scratch Postgres schema, then times
+utils.build_search_results for a fixed number of hits and counts the SQL statements it
+issues, next to the previous per-result project lookup.
+
+    python -m benchmarks.result_assembly --sizes 1000 10000 50000 --top-k 20
+"""
+import os
+import json
+import time
+import random
+import argparse
+import statistics
+from typing import List
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import sessionmaker
+from config import DATABASE_URL
+import crud
+import models
+import snippets
+import utils
+
+CHUNKS_PER_PAPER = 4
+PROJECTS = 50
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def legacy_build_search_results(db, query: str, ranked: List[dict]) -> list:
+    """Previous assembly: one project lookup per result"""
+    rows = crud.get_search_result_papers(db, {result['paper_id']: result['chunk_id'] for result in ranked})
+    formatted = []
+    for result in ranked:
+        paper, snippet_source = rows[result['paper_id']][:2]
+        project = crud.get_project_by_id(db, paper.project_id) if paper.project_id else None
+        formatted.append((paper.id, snippets.build_snippet(snippet_source, query)[0],
+                          project.name if project else None, project.status if project else None))
+    return formatted
+
+
+def grow_corpus(db, user_id: int, start: int, end: int, project_ids: List[int]):
+    """Insert papers [start, end) with their chunks"""
+    body = "Ayurvedic formulations were evaluated in a randomised controlled trial. " * 30
+    for batch_start in range(start, end, 1000):
+        batch_end = min(batch_start + 1000, end)
+        paper_ids = db.execute(insert(models.ResearchPaper).returning(models.ResearchPaper.id, sort_by_parameter_order=True), [
+            {
+                "title": f"Synthetic paper {i}", "filename": f"synthetic-{i}.pdf", "authors": ["A. Author"],
+                "abstract": body[:300], "category": f"category-{i % 8}", "content": body,
+                "project_id": random.choice(project_ids) if i % 3 else None, "uploaded_by": user_id,
+            }
+            for i in range(batch_start, batch_end)
+        ]).scalars().all()
+        db.execute(insert(models.PaperChunk), [
+            {"paper_id": paper_id, "ordinal": ordinal, "char_start": 0, "char_end": 500, "text": body[:500]}
+            for paper_id in paper_ids for ordinal in range(CHUNKS_PER_PAPER)
+        ])
+    db.commit()
+    db.execute(text("ANALYZE"))  # refresh planner statistics as autovacuum would
+
+
+def measure(db, counter: StatementCounter, build, top_k: int, repeats: int) -> dict:
+    Chunk = models.PaperChunk
+    timings, statements = [], []
+    for _ in range(repeats):
+        sample = db.query(Chunk.paper_id, Chunk.id).filter(Chunk.ordinal == 1) \
+            .order_by(text("random()")).limit(top_k).all()
+        ranked = [{"paper_id": paper_id, "chunk_id": chunk_id, "score": 1.0} for paper_id, chunk_id in sample]
+        db.expire_all()
+        counter.count = 0
+        started = time.perf_counter()
+        build(db, "randomised trial", ranked)
+        timings.append((time.perf_counter() - started) * 1000)
+        statements.append(counter.count)
+    return {"p50_ms": round(statistics.median(timings), 2), "statements": max(statements)}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="corpus sizes (papers)")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    schema = f"bench_assembly_{os.getpid()}"
+    admin_engine = create_engine(DATABASE_URL)
+    with admin_engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(DATABASE_URL, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        models.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        counter = StatementCounter(engine)
+        user = models.User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.add_all([models.Project(name=f"Project {i}", status="ongoing", investigatory_team=[]) for i in range(PROJECTS)])
+        db.commit()
+        project_ids = [project.id for project in db.query(models.Project).all()]
+
+        results, size = [], 0
+        for target in sorted(args.sizes):
+            grow_corpus(db, user.id, size, target, project_ids)
+            size = target
+            results.append({
+                "papers": size,
+                "joined": measure(db, counter, utils.build_search_results, args.top_k, args.repeats),
+                "legacy": measure(db, counter, legacy_build_search_results, args.top_k, args.repeats),
+            })
+        db.close()
+    finally:
+        engine.dispose()
+        with admin_engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin_engine.dispose()
+
+    if args.json:
+        print(json.dumps({"top_k": args.top_k, "results": results}, indent=2))
+        return
+    print(f"Assembling {args.top_k} results")
+    print(f"{'papers':>8}  {'joined p50 ms':>14}  {'statements':>10}  {'legacy p50 ms':>14}  {'statements':>10}")
+    for row in results:
+        print(f"{row['papers']:>8}  {row['joined']['p50_ms']:>14}  {row['joined']['statements']:>10}  "
+              f"{row['legacy']['p50_ms']:>14}  {row['legacy']['statements']:>10}")
+
+
+if __name__ == "__main__":
+    main()
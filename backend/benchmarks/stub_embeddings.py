@@ -0,0 +1,136 @@
+"""Local stand-in for the OpenRouter ``/embeddings`` endpoint, for offline benchmarks.
+
+Vectors are deterministic: each token maps to a fixed random unit vector and a text
+embeds as the normalised sum of its tokens, so texts sharing words are close and search
+results are meaningful. Optional latency and error injection (429s, exercising the
+client's retries) approximate the real API.
+
+    python -m benchmarks.stub_embeddings --port 8300 --latency 0.05
+    OPENROUTER_BASE_URL=http://127.0.0.1:8300 OPENROUTER_API_KEY=stub uvicorn main:app
+"""
+import re
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+import numpy as np
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from config import EMBEDDING_DIMENSION
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=65536)
+def token_vector(token: str, dimension: int) -> np.ndarray:
+    vector = np.random.default_rng(zlib.crc32(token.encode())).standard_normal(dimension).astype("float32")
+    return vector / np.linalg.norm(vector)
+
+
+def embed_text(text: str, dimension: int) -> np.ndarray:
+    vector = np.zeros(dimension, dtype="float32")
+    for token in TOKEN.findall(text.lower()):
+        vector += token_vector(token, dimension)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class StubEmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, dimension: int = EMBEDDING_DIMENSION, latency: float = 0.0,
+                 per_text_latency: float = 0.0, error_rate: float = 0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.dimension = dimension
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.texts = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "StubEmbeddingServer":
+        threading.Thread(target=self.serve_forever, name="stub-embeddings", daemon=True).start()
+        return self
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "texts": self.texts, "injected_errors": self.errors}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 429:
+            self.send_header("Retry-After", "0.1")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        server: StubEmbeddingServer = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/embeddings"):
+            return self._reply(404, {"error": {"message": f"unknown path {self.path}"}})
+        texts: List[str] = body.get("input") or []
+        if isinstance(texts, str):
+            texts = [texts]
+
+        with server._lock:
+            server.requests += 1
+            fail = server.error_rate and server._rng.random() < server.error_rate
+            if fail:
+                server.errors += 1
+            else:
+                server.texts += len(texts)
+        if fail:
+            return self._reply(429, {"error": {"message": "rate limited (injected)"}})
+        time.sleep(server.latency + server.per_text_latency * len(texts))
+        self._reply(200, {
+            "object": "list",
+            "model": body.get("model"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": embed_text(text, server.dimension).tolist()}
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": sum(len(text) // 4 for text in texts), "total_tokens": sum(len(text) // 4 for text in texts)},
+        })
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("--dimension", type=int, default=EMBEDDING_DIMENSION)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--per-text-latency", type=float, default=0.0, help="seconds added per input text")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args(argv)
+
+    server = StubEmbeddingServer(args.port, args.dimension, args.latency, args.per_text_latency, args.error_rate)
+    print(f"Stub embeddings ({args.dimension} dimensions) at {server.url}/embeddings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats()))
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import re
+from typing import List, NamedTuple, Optional
+from config import CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, EMBEDDING_MAX_TOKENS, CHUNK_TOKENIZER
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a length-based estimate
+    tiktoken = None
+
+# Boundaries between text units: paragraph breaks (blank lines, page breaks) and sentence ends
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*|\f\s*")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+WHITESPACE = re.compile(r"\s+")
+CHARS_PER_TOKEN = 4
+
+
+class Chunk(NamedTuple):
+    start: int  # character offsets into the source text
+    end: int
+    tokens: int
+
+
+class Unit(NamedTuple):
+    start: int
+    end: int
+    tokens: int
+    paragraph_end: bool  # last unit before a paragraph break
+
+
+_encoding = None
+_encoding_failed = tiktoken is None
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding(CHUNK_TOKENIZER)
+        except Exception as e:  # e.g. encoding file not downloadable offline
+            print(f"Tokenizer {CHUNK_TOKENIZER} unavailable ({e}); estimating token counts")
+            _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(texts: List[str]) -> List[int]:
+    """Token counts with the embedding model's tokenizer (estimated when tiktoken is missing)"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return [len(text) // CHARS_PER_TOKEN + 1 for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+
+
+def _trimmed(text: str, start: int, end: int) -> Optional[tuple]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+def _split_units(text: str) -> List[tuple]:
+    """(start, end, paragraph_end) spans of sentences, in order"""
+    spans = []
+    paragraph_start = 0
+    for paragraph in PARAGRAPH_BREAK.finditer(text + "\n\n"):
+        paragraph_end = paragraph.start()
+        sentence_start = paragraph_start
+        for sentence in SENTENCE_BREAK.finditer(text, paragraph_start, paragraph_end):
+            span = _trimmed(text, sentence_start, sentence.start())
+            if span:
+                spans.append((*span, False))
+            sentence_start = sentence.end()
+        span = _trimmed(text, sentence_start, paragraph_end)
+        if span:
+            spans.append((*span, True))
+        elif spans:
+            spans[-1] = (*spans[-1][:2], True)
+        paragraph_start = min(paragraph.end(), len(text))
+    return spans
+
+
+def _split_long_unit(text: str, unit: Unit, max_tokens: int) -> List[Unit]:
+    """Break a sentence longer than max_tokens at word boundaries"""
+    chars_per_token = (unit.end - unit.start) / max(unit.tokens, 1)
+    window = max(1, int(max_tokens * chars_per_token))
+    pieces, start = [], unit.start
+    while start < unit.end:
+        end = min(start + window, unit.end)
+        if end < unit.end:
+            space = text.rfind(" ", start + 1, end)
+            if space == -1:
+                space = max(text.rfind("\n", start + 1, end), text.rfind("\t", start + 1, end))
+            if space > start:
+                end = space
+        span = _trimmed(text, start, end)
+        if span:
+            pieces.append(span)
+        start = end
+    tokens = count_tokens([text[s:e] for s, e in pieces])
+    return [
+        Unit(s, e, t, unit.paragraph_end and i == len(pieces) - 1)
+        for i, ((s, e), t) in enumerate(zip(pieces, tokens))
+    ]
+
+
+def chunk_document(text: str, target_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                   max_tokens: int = EMBEDDING_MAX_TOKENS) -> List[Chunk]:
+    """Split text into chunks of about target_tokens on paragraph/sentence boundaries.
+
+    Sentences are packed greedily; a chunk closes early at a paragraph break once it is
+    three quarters full. Each chunk after the first starts with trailing sentences of the
+    previous one, up to overlap_tokens. Sentences longer than the target are split at words.
+    """
+    if not text or not text.strip():
+        return []
+    target_tokens = min(target_tokens, max_tokens)
+
+    spans = _split_units(text)
+    counts = count_tokens([text[start:end] for start, end, _ in spans])
+    units: List[Unit] = []
+    for (start, end, paragraph_end), tokens in zip(spans, counts):
+        unit = Unit(start, end, tokens, paragraph_end)
+        units.extend(_split_long_unit(text, unit, target_tokens) if tokens > target_tokens else [unit])
+
+    chunks: List[Chunk] = []
+    first, tokens = 0, 0  # first unit and token count of the open chunk
+    for i, unit in enumerate(units):
+        if i > first and tokens + unit.tokens > target_tokens:
+            chunks.append(Chunk(units[first].start, units[i - 1].end, tokens))
+            # Carry trailing sentences forward as overlap, never the whole previous chunk
+            previous_first, first, tokens = first, i, 0
+            while (first - 1 > previous_first and tokens + units[first - 1].tokens <= overlap_tokens
+                   and tokens + units[first - 1].tokens + unit.tokens <= target_tokens):
+                first -= 1
+                tokens += units[first].tokens
+        tokens += unit.tokens
+        # Prefer closing at a paragraph break once the chunk is mostly full (no overlap needed)
+        if unit.paragraph_end and tokens >= target_tokens * 0.75 and i + 1 < len(units):
+            chunks.append(Chunk(units[first].start, unit.end, tokens))
+            first, tokens = i + 1, 0
+    if first < len(units):
+        chunks.append(Chunk(units[first].start, units[-1].end, tokens))
+    return chunks
@@ -8,24 +8,111 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set in .env")
 
+# Connection pools, per process (each uvicorn worker has its own sync and async pool)
+DB_ASYNC_READS = os.getenv("DB_ASYNC_READS", "true").lower() in ("1", "true", "yes")  # async engine for /api/search, /api/papers, /api/projects
+# The sync pool serves writes, auth and ingestion, plus the read-heavy endpoints when DB_ASYNC_READS is off
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5 if DB_ASYNC_READS else 20))  # connections kept open
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10 if DB_ASYNC_READS else 20))  # extra connections under bursts
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", 20))  # async engine, only created with DB_ASYNC_READS
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds before a connection is replaced
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256))  # asyncpg prepared statements per connection (0 disables, e.g. behind pgbouncer)
+
 
 STORAGE_PATH = os.getenv("STORAGE_PATH", "./storage/pdfs")
-FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH", "./embeddings/faiss_index.pkl")
+FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH", "./embeddings/faiss_index.pkl")  # legacy pickle, migrated on first load
+FAISS_INDEX_DIR = os.getenv("FAISS_INDEX_DIR", "./embeddings/faiss")
+FAISS_MAX_DELTA_SEGMENTS = int(os.getenv("FAISS_MAX_DELTA_SEGMENTS", 32))
+FAISS_MAX_TOMBSTONES = int(os.getenv("FAISS_MAX_TOMBSTONES", 50000))
+
+# Index type: flat (exact), ivf_flat, ivf_pq or hnsw. ANN types are trained once
+# FAISS_TRAIN_MIN_VECTORS vectors exist and retrained when the corpus grows by
+# FAISS_RETRAIN_GROWTH; until then search stays exact.
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+FAISS_TRAIN_MIN_VECTORS = int(os.getenv("FAISS_TRAIN_MIN_VECTORS", 20000))
+FAISS_RETRAIN_GROWTH = float(os.getenv("FAISS_RETRAIN_GROWTH", 4.0))
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", 0))  # 0 = 4 * sqrt(ntotal)
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", 64))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", 32))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", 16))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", 64))
+# cosine: unit-normalised vectors in inner-product indexes; l2: raw vectors, Euclidean distance.
+# An existing index keeps its metric until `python init_faiss.py --migrate-metric`.
+FAISS_METRIC = os.getenv("FAISS_METRIC", "cosine").lower()
+# Shrink vectors before indexing: truncate (Matryoshka prefix, renormalised; suits
+# text-embedding-3 models) or pca, to FAISS_REDUCED_DIMENSION. Applied by `init_faiss.py --reduce`.
+FAISS_REDUCTION = os.getenv("FAISS_REDUCTION", "none").lower()
+FAISS_REDUCED_DIMENSION = int(os.getenv("FAISS_REDUCED_DIMENSION", 0))
+FAISS_FILTER_EXACT_MAX = int(os.getenv("FAISS_FILTER_EXACT_MAX", 20000))  # filtered sets this small skip the ANN base
+
+# Raw chunk vectors (source of truth for index rebuilds): float32, float16 or int8
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "./embeddings/vectors")
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float32").lower()
+VECTOR_STORE_MAX_SEGMENTS = int(os.getenv("VECTOR_STORE_MAX_SEGMENTS", 64))
+
+KEYWORD_INDEX_DIR = os.getenv("KEYWORD_INDEX_DIR", "./embeddings/keyword")
+KEYWORD_INDEX_MAX_LOG = int(os.getenv("KEYWORD_INDEX_MAX_LOG", 1000))
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+# Search snippets: characters shown around the densest cluster of query terms, and how much
+# of a paper without stored chunks is scanned for them
+SNIPPET_WINDOW = int(os.getenv("SNIPPET_WINDOW", 300))
+SNIPPET_SOURCE_CHARS = int(os.getenv("SNIPPET_SOURCE_CHARS", 4000))
+
+# Hybrid ranking: each retriever returns top_k * FUSION_CANDIDATE_FACTOR candidates, chunk
+# hits are aggregated per paper (max or sum) and the two lists fused with reciprocal rank
+# fusion (rrf) or a weighted sum of min-max normalised scores (weighted)
+FUSION_METHOD = os.getenv("FUSION_METHOD", "rrf").lower()
+FUSION_RRF_K = int(os.getenv("FUSION_RRF_K", 60))
+FUSION_SEMANTIC_WEIGHT = float(os.getenv("FUSION_SEMANTIC_WEIGHT", 0.5))  # keyword weight is 1 - this
+FUSION_CANDIDATE_FACTOR = int(os.getenv("FUSION_CANDIDATE_FACTOR", 5))
+CHUNK_AGGREGATION = os.getenv("CHUNK_AGGREGATION", "max").lower()
 
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
 EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", 3072))
-CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))  # characters, legacy chunker (benchmarks/chunking.py baseline)
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 100))
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 256))  # target tokens per chunk
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 32))  # trailing sentences repeated in the next chunk
+EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", 8191))  # embedding model input limit
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "cl100k_base")  # tiktoken encoding used to count tokens
+
+# Background ingestion workers
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", 3))
+INGEST_RETRY_BACKOFF = float(os.getenv("INGEST_RETRY_BACKOFF", 2.0))  # seconds, doubled per attempt
+INGEST_STALE_SECONDS = int(os.getenv("INGEST_STALE_SECONDS", 600))  # running jobs idle this long are resumed
+INGEST_BULK_BATCH = int(os.getenv("INGEST_BULK_BATCH", 50))  # papers per insert/embed batch
+INGEST_EXTRACT_PROCESSES = int(os.getenv("INGEST_EXTRACT_PROCESSES", 0))  # 0 = one per CPU
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 500))  # split PDFs this long across processes
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 128))  # pages per extraction task
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", 100))  # texts per embedding request
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-if not OPENROUTER_API_KEY:
-    raise ValueError("OPENROUTER_API_KEY is not set in .env")
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")  # checked when embeddings are requested
 
 OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY is not set in .env")
+# Embedding client: pooled connections, concurrent token-sized batches, retries on 429/5xx
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", 4))  # requests in flight
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", 8000))  # estimated tokens per request
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))  # max texts per request
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", 5))
+EMBEDDING_RETRY_BACKOFF = float(os.getenv("EMBEDDING_RETRY_BACKOFF", 1.0))  # seconds, doubled per attempt
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", 30))
+
+# Persistent embedding cache keyed by (sha256(text), model, dimension); 0 MB disables it
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embeddings/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", 1024))
+
+# In-memory search caches (entries, seconds); result entries are also dropped when the index changes
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", 3600))
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", 512))
+SEARCH_RESULT_CACHE_TTL = float(os.getenv("SEARCH_RESULT_CACHE_TTL", 300))
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")  # optional, unused by the backend
 
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 if not JWT_SECRET_KEY:
@@ -1,7 +1,12 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
 import models, schemas
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import uuid
 from passlib.context import CryptContext
+from config import SNIPPET_SOURCE_CHARS
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -33,8 +38,13 @@ def create_project(db: Session, project: schemas.ProjectCreate, user_id: int) ->
     db.refresh(db_project)
     return db_project
 
+# Read queries served by both the sync session and, for the read-heavy endpoints, the async
+# one (see the *_async functions below) are built once as select() statements
+def _projects_query(skip: int, limit: int):
+    return select(models.Project).offset(skip).limit(limit)
+
 def get_projects(db: Session, skip: int = 0, limit: int = 100) -> List[models.Project]:
-    return db.query(models.Project).offset(skip).limit(limit).all()
+    return db.execute(_projects_query(skip, limit)).scalars().all()
 
 def get_project_by_id(db: Session, project_id: int) -> models.Project:
     return db.query(models.Project).filter(models.Project.id == project_id).first()
@@ -43,13 +53,59 @@ def get_project_by_name(db: Session, name: str) -> models.Project:
     return db.query(models.Project).filter(models.Project.name == name).first()
 
 # Research Paper CRUD
-def create_research_paper(db: Session, paper: schemas.ResearchPaperCreate, user_id: int) -> models.ResearchPaper:
+def create_research_paper(db: Session, paper: schemas.ResearchPaperCreate, user_id: int,
+                          job: Optional[models.IngestJob] = None) -> models.ResearchPaper:
+    """Insert a paper, recording it on the ingest job (if any) in the same transaction"""
     db_paper = models.ResearchPaper(**paper.dict(), uploaded_by=user_id)
     db.add(db_paper)
+    if job is not None:
+        db.flush()
+        job.paper_id = db_paper.id
     db.commit()
     db.refresh(db_paper)
     return db_paper
 
+def create_research_papers_bulk(db: Session, entries: List[Tuple[schemas.ResearchPaperCreate, List[Tuple[int, int]], List[str], Optional[List[int]]]],
+                                user_id: int, jobs: Optional[List[models.IngestJob]] = None) -> List[Tuple[models.ResearchPaper, List[int]]]:
+    """Insert papers and their chunks (spans, texts, page numbers) in one transaction,
+    returning (paper, chunk_ids) per entry"""
+    db_papers = [models.ResearchPaper(**paper.dict(), uploaded_by=user_id) for paper, _, _, _ in entries]
+    db.add_all(db_papers)
+    db.flush()
+
+    rows = [
+        {
+            "paper_id": db_paper.id,
+            "ordinal": ordinal,
+            "char_start": start,
+            "char_end": end,
+            "page_number": page_numbers[ordinal] if page_numbers else None,
+            "text": text,
+        }
+        for db_paper, (_, spans, texts, page_numbers) in zip(db_papers, entries)
+        for ordinal, ((start, end), text) in enumerate(zip(spans, texts))
+    ]
+    chunk_ids = []
+    if rows:
+        result = db.execute(insert(models.PaperChunk).returning(models.PaperChunk.id, sort_by_parameter_order=True), rows)
+        chunk_ids = [row[0] for row in result]
+
+    for db_paper, job in zip(db_papers, jobs or []):
+        job.paper_id, job.stage, job.progress = db_paper.id, "embed", 0.2
+    db.commit()
+
+    created, offset = [], 0
+    for db_paper, (_, _, texts, _) in zip(db_papers, entries):
+        created.append((db_paper, chunk_ids[offset:offset + len(texts)]))
+        offset += len(texts)
+    return created
+
+def get_existing_filenames(db: Session, filenames: List[str]) -> set:
+    if not filenames:
+        return set()
+    rows = db.query(models.ResearchPaper.filename).filter(models.ResearchPaper.filename.in_(filenames)).all()
+    return {row[0] for row in rows}
+
 def get_research_paper(db: Session, paper_id: int) -> models.ResearchPaper:
     return db.query(models.ResearchPaper).filter(models.ResearchPaper.id == paper_id).first()
 
@@ -59,10 +115,238 @@ def get_research_papers_by_project(db: Session, project_id: int) -> List[models.
 def get_all_research_papers(db: Session) -> List[models.ResearchPaper]:
     return db.query(models.ResearchPaper).all()
 
+# Columns /api/papers may return; content is opt-in and the legacy chunk/embedding columns never are
+PAPER_LIST_FIELDS = (
+    "id", "title", "authors", "abstract", "journal", "publication_date", "keywords", "category",
+    "filename", "project_id", "uploaded_by", "uploaded_at", "content"
+)
+PAPER_SUMMARY_FIELDS = ("id", "title", "authors", "journal", "publication_date", "category", "project_id", "filename")
+
+def list_research_papers(db: Session, fields: List[str], limit: int, after: Optional[int] = None,
+                         category: Optional[str] = None, project_id: Optional[int] = None) -> List[dict]:
+    """One keyset page of papers ordered by id, selecting only the given columns"""
+    return [row._asdict() for row in db.execute(_paper_page_query(fields, limit, after, category, project_id))]
+
+def _paper_page_query(fields: List[str], limit: int, after: Optional[int], category: Optional[str], project_id: Optional[int]):
+    Paper = models.ResearchPaper
+    query = select(*[getattr(Paper, field).label(field) for field in fields])
+    if after is not None:
+        query = query.where(Paper.id > after)
+    if category:
+        query = query.where(Paper.category == category)
+    if project_id is not None:
+        query = query.where(Paper.project_id == project_id)
+    return query.order_by(Paper.id).limit(limit)
+
+def get_paper_facets(db: Session) -> Tuple[List[Tuple[str, int]], List[Tuple[int, str, int]]]:
+    """(category, count) and (project id, name, count) pairs, counted in SQL"""
+    Paper, Project = models.ResearchPaper, models.Project
+    categories = (
+        db.query(Paper.category, func.count(Paper.id))
+        .filter(Paper.category.isnot(None), Paper.category != "")
+        .group_by(Paper.category)
+        .order_by(Paper.category)
+        .all()
+    )
+    projects = (
+        db.query(Project.id, Project.name, func.count(Paper.id))
+        .join(Paper, Paper.project_id == Project.id)
+        .group_by(Project.id, Project.name)
+        .order_by(Project.name)
+        .all()
+    )
+    return [tuple(row) for row in categories], [tuple(row) for row in projects]
+
+def get_search_result_papers(db: Session, chunk_ids: Dict[int, Optional[int]]) -> Dict[int, tuple]:
+    """Load everything search results need for the given {paper_id: matched chunk id} in one query.
+
+    Returns {paper_id: (paper, snippet_source, page_number, project_name, project_status)} where
+    snippet_source is the matched chunk (the first chunk when no chunk id is given, the first
+    SNIPPET_SOURCE_CHARS of content for papers without chunks), so full content and the legacy
+    chunks/embeddings columns are never loaded. Projects are joined in rather than looked up per result.
+    """
+    if not chunk_ids:
+        return {}
+    return _search_result_rows(db.execute(_search_result_query(chunk_ids)))
+
+def _search_result_query(chunk_ids: Dict[int, Optional[int]]):
+    Paper, Chunk, Project = models.ResearchPaper, models.PaperChunk, models.Project
+    matched = [chunk_id for chunk_id in chunk_ids.values() if chunk_id is not None]
+    first_chunk_papers = [paper_id for paper_id, chunk_id in chunk_ids.items() if chunk_id is None]
+    snippet_source = func.coalesce(Chunk.text, func.substr(Paper.content, 1, SNIPPET_SOURCE_CHARS))
+    return (
+        select(Paper, snippet_source, Chunk.page_number, Project.name, Project.status)
+        .outerjoin(Chunk, and_(
+            Chunk.paper_id == Paper.id,
+            or_(Chunk.id.in_(matched), and_(Chunk.paper_id.in_(first_chunk_papers), Chunk.ordinal == 0))
+        ))
+        .outerjoin(Project, Project.id == Paper.project_id)
+        .options(load_only(
+            Paper.id, Paper.filename, Paper.title, Paper.authors, Paper.abstract, Paper.journal,
+            Paper.publication_date, Paper.category, Paper.project_id
+        ))
+        .where(Paper.id.in_(list(chunk_ids)))
+    )
+
+def _search_result_rows(rows) -> Dict[int, tuple]:
+    return {
+        paper.id: (paper, snippet_source or "", page_number, project_name, project_status)
+        for paper, snippet_source, page_number, project_name, project_status in rows
+    }
+
+def get_filtered_ids(db: Session, category: Optional[str] = None, project_id: Optional[int] = None,
+                     date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> Tuple[set, List[int]]:
+    """(paper ids, chunk ids) of papers matching search filters, using the indexed paper columns"""
+    paper_ids, chunk_ids = set(), []
+    for paper_id, chunk_id in db.execute(_filtered_ids_query(category, project_id, date_from, date_to)):
+        paper_ids.add(paper_id)
+        if chunk_id is not None:
+            chunk_ids.append(chunk_id)
+    return paper_ids, chunk_ids
+
+def _filtered_ids_query(category: Optional[str], project_id: Optional[int],
+                        date_from: Optional[datetime], date_to: Optional[datetime]):
+    Paper, Chunk = models.ResearchPaper, models.PaperChunk
+    query = select(Paper.id, Chunk.id).outerjoin(Chunk, Chunk.paper_id == Paper.id)
+    if category:
+        query = query.where(Paper.category == category)
+    if project_id is not None:
+        query = query.where(Paper.project_id == project_id)
+    if date_from:
+        query = query.where(Paper.publication_date >= date_from)
+    if date_to:
+        query = query.where(Paper.publication_date <= date_to)
+    return query.execution_options(yield_per=10000)
+
 def delete_research_paper(db: Session, paper_id: int) -> bool:
     paper = db.query(models.ResearchPaper).filter(models.ResearchPaper.id == paper_id).first()
     if paper:
         db.delete(paper)
         db.commit()
         return True
-    return False
\ No newline at end of file
+    return False
+
+# Paper chunk CRUD
+def create_paper_chunks(db: Session, paper_id: int, spans: List[Tuple[int, int]], texts: List[str],
+                        page_numbers: Optional[List[Optional[int]]] = None) -> List[int]:
+    """Insert a paper's chunks in one statement, returning their ids in order"""
+    if not texts:
+        return []
+    rows = [
+        {
+            "paper_id": paper_id,
+            "ordinal": ordinal,
+            "char_start": start,
+            "char_end": end,
+            "page_number": page_numbers[ordinal] if page_numbers else None,
+            "text": text,
+        }
+        for ordinal, ((start, end), text) in enumerate(zip(spans, texts))
+    ]
+    result = db.execute(insert(models.PaperChunk).returning(models.PaperChunk.id, sort_by_parameter_order=True), rows)
+    chunk_ids = [row[0] for row in result]
+    db.commit()
+    return chunk_ids
+
+def get_chunk_paper_ids(db: Session, chunk_ids: List[int]) -> Dict[int, int]:
+    """Map chunk ids to their paper ids"""
+    if not chunk_ids:
+        return {}
+    return {chunk_id: paper_id for chunk_id, paper_id in db.execute(_chunk_papers_query(chunk_ids))}
+
+def _chunk_papers_query(chunk_ids: List[int]):
+    return select(models.PaperChunk.id, models.PaperChunk.paper_id).where(models.PaperChunk.id.in_(chunk_ids))
+
+def get_paper_chunk_ids(db: Session, paper_id: int) -> List[int]:
+    rows = db.query(models.PaperChunk.id).filter(models.PaperChunk.paper_id == paper_id)
+    return [row[0] for row in rows]
+
+def delete_paper_chunks(db: Session, paper_id: int):
+    db.query(models.PaperChunk).filter(models.PaperChunk.paper_id == paper_id).delete()
+    db.commit()
+
+def get_paper_chunks(db: Session, paper_id: int) -> List[models.PaperChunk]:
+    return (
+        db.query(models.PaperChunk)
+        .filter(models.PaperChunk.paper_id == paper_id)
+        .order_by(models.PaperChunk.ordinal)
+        .all()
+    )
+
+# Ingest Job CRUD
+def create_ingest_job(db: Session, filename: str, payload: dict, user_id: int) -> models.IngestJob:
+    db_job = models.IngestJob(id=uuid.uuid4().hex, filename=filename, payload=payload, created_by=user_id)
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def create_ingest_jobs(db: Session, items: List[Tuple[str, dict]], user_id: int) -> List[str]:
+    """Queue many (filename, payload) jobs with one commit, returning their ids in order"""
+    job_ids = [uuid.uuid4().hex for _ in items]
+    db.add_all([
+        models.IngestJob(id=job_id, filename=filename, payload=payload, created_by=user_id)
+        for job_id, (filename, payload) in zip(job_ids, items)
+    ])
+    db.commit()
+    return job_ids
+
+def get_ingest_job(db: Session, job_id: str) -> models.IngestJob:
+    return db.query(models.IngestJob).filter(models.IngestJob.id == job_id).first()
+
+def get_resumable_ingest_job_ids(db: Session, stale_before: datetime) -> List[str]:
+    """Queued jobs plus running jobs whose worker stopped updating them"""
+    rows = db.query(models.IngestJob.id).filter(or_(
+        models.IngestJob.status == "queued",
+        and_(models.IngestJob.status == "running", models.IngestJob.updated_at < stale_before)
+    ))
+    return [row[0] for row in rows]
+
+def claim_ingest_job(db: Session, job_id: str, stale_before: datetime) -> bool:
+    """Atomically mark a job running; False if another worker already owns it"""
+    result = db.execute(
+        update(models.IngestJob)
+        .where(models.IngestJob.id == job_id)
+        .where(or_(
+            models.IngestJob.status == "queued",
+            and_(models.IngestJob.status == "running", models.IngestJob.updated_at < stale_before)
+        ))
+        .values(status="running", error=None, updated_at=datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def update_ingest_job(db: Session, job: models.IngestJob, **fields) -> models.IngestJob:
+    for key, value in fields.items():
+        setattr(job, key, value)
+    db.commit()
+    return job
+
+# Async read paths (AsyncSession), sharing the statements above
+async def get_projects_async(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[models.Project]:
+    return (await db.execute(_projects_query(skip, limit))).scalars().all()
+
+async def list_research_papers_async(db: AsyncSession, fields: List[str], limit: int, after: Optional[int] = None,
+                                     category: Optional[str] = None, project_id: Optional[int] = None) -> List[dict]:
+    result = await db.execute(_paper_page_query(fields, limit, after, category, project_id))
+    return [row._asdict() for row in result]
+
+async def get_search_result_papers_async(db: AsyncSession, chunk_ids: Dict[int, Optional[int]]) -> Dict[int, tuple]:
+    if not chunk_ids:
+        return {}
+    return _search_result_rows(await db.execute(_search_result_query(chunk_ids)))
+
+async def get_filtered_ids_async(db: AsyncSession, category: Optional[str] = None, project_id: Optional[int] = None,
+                                 date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> Tuple[set, List[int]]:
+    paper_ids, chunk_ids = set(), []
+    result = await db.stream(_filtered_ids_query(category, project_id, date_from, date_to))
+    async for paper_id, chunk_id in result:
+        paper_ids.add(paper_id)
+        if chunk_id is not None:
+            chunk_ids.append(chunk_id)
+    return paper_ids, chunk_ids
+
+async def get_chunk_paper_ids_async(db: AsyncSession, chunk_ids: List[int]) -> Dict[int, int]:
+    if not chunk_ids:
+        return {}
+    return {chunk_id: paper_id for chunk_id, paper_id in await db.execute(_chunk_papers_query(chunk_ids))}
@@ -1,8 +1,61 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_ASYNC_READS, DB_ASYNC_POOL_SIZE, DB_ASYNC_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_STATEMENT_CACHE_SIZE
+)
 
-engine = create_engine(DATABASE_URL)
+POOL_OPTIONS = dict(pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=True)
+
+engine = create_engine(DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+SSL_MODES = ("disable", "allow", "prefer", "require", "verify-ca", "verify-full")
+
+
+def async_database_url(url: str):
+    """DATABASE_URL for asyncpg, plus connect args for the libpq query parameters asyncpg doesn't accept.
+
+    ``options=-cname=value`` becomes server settings, ``application_name`` a server setting,
+    ``sslmode`` asyncpg's ``ssl`` and ``connect_timeout`` its ``timeout``; any other
+    parameter raises ValueError rather than failing on the first connection.
+    """
+    parsed = make_url(url)
+    settings, connect_args = {}, {}
+    for name, value in parsed.query.items():
+        if isinstance(value, tuple):
+            raise ValueError(f"DATABASE_URL parameter '{name}' is given more than once")
+        if name == "options":
+            for option in value.replace("-c ", "-c").split():
+                if option.startswith("-c") and "=" in option:
+                    setting, setting_value = option[2:].split("=", 1)
+                    settings[setting] = setting_value
+        elif name == "application_name":
+            settings[name] = value
+        elif name == "sslmode":
+            if value not in SSL_MODES:
+                raise ValueError(f"Unsupported sslmode '{value}', expected one of {SSL_MODES}")
+            connect_args["ssl"] = value
+        elif name == "connect_timeout":
+            connect_args["timeout"] = float(value)
+        else:
+            raise ValueError(f"DATABASE_URL parameter '{name}' is not supported with DB_ASYNC_READS (asyncpg)")
+    connect_args["server_settings"] = settings
+    return parsed.set(drivername="postgresql+asyncpg", query={}), connect_args
+
+
+# Async engine for the read-heavy endpoints, only when DB_ASYNC_READS is on. asyncpg
+# prepares each statement once per connection and keeps up to DB_STATEMENT_CACHE_SIZE of them.
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC_READS:
+    _async_url, _connect_args = async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(
+        _async_url, pool_size=DB_ASYNC_POOL_SIZE, max_overflow=DB_ASYNC_MAX_OVERFLOW, **POOL_OPTIONS,
+        connect_args={"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE, **_connect_args},
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
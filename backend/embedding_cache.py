@@ -0,0 +1,139 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+from config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB, EMBEDDING_MODEL, EMBEDDING_DIMENSION
+
+EVICT_FRACTION = 0.1  # share of entries dropped when the cache is full
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by (sha256(text), model, dimension).
+
+    Entries live in SQLite with a last-used timestamp; once the cache exceeds its size
+    bound the least recently used entries are evicted. Hit/miss counts are kept per
+    process and cumulatively in the database.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, model: str = EMBEDDING_MODEL,
+                 dimension: int = EMBEDDING_DIMENSION, max_mb: int = EMBEDDING_CACHE_MAX_MB):
+        self.path = path
+        self.model = model
+        self.dimension = dimension
+        self.enabled = max_mb > 0
+        self.max_entries = max_mb * 1024 * 1024 // (dimension * 4) if self.enabled else 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if self.enabled:
+            self._open()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Shared across request and ingest threads; access is serialised by _lock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                text_hash BLOB NOT NULL,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text_hash, model, dim)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0);
+        """)
+        self._conn.commit()
+
+    def get_many(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Cached vectors for texts, keyed by position in the input list"""
+        if not self.enabled or not texts:
+            return {}
+        hashes = [text_hash(t) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            unique = list(set(hashes))
+            for i in range(0, len(unique), 500):  # stay under SQLite's bound-parameter limit
+                part = unique[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND dim = ? "
+                    f"AND text_hash IN ({','.join('?' * len(part))})",
+                    [self.model, self.dimension, *part],
+                ).fetchall()
+                found.update((h, np.frombuffer(v, dtype="float32")) for h, v in rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE text_hash = ? AND model = ? AND dim = ?",
+                    [(now, h, self.model, self.dimension) for h in found],
+                )
+            hits = sum(1 for h in hashes if h in found)
+            self._count(hits, len(texts) - hits)
+            self._conn.commit()
+        return {i: found[h] for i, h in enumerate(hashes) if h in found}
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        if not self.enabled or not texts:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        now = time.time()
+        rows = [(text_hash(t), self.model, self.dimension, v.tobytes(), now) for t, v in zip(texts, vectors)]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _count(self, hits: int, misses: int):
+        self.hits += hits
+        self.misses += misses
+        self._conn.executemany(
+            "UPDATE counters SET value = value + ? WHERE name = ?", [(hits, "hits"), (misses, "misses")]
+        )
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - self.max_entries + int(self.max_entries * EVICT_FRACTION)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE (text_hash, model, dim) IN "
+            "(SELECT text_hash, model, dim FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+
+    def __len__(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Hit/miss counts for this process and since the cache was created"""
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            totals = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            "enabled": True,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals["hits"],
+            "total_misses": totals["misses"],
+            "hit_rate": totals["hits"] / lookups if lookups else None,
+        }
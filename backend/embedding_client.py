@@ -0,0 +1,165 @@
+import time
+import random
+import threading
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+import metrics
+from config import (
+    OPENROUTER_API_KEY, OPENROUTER_BASE_URL, EMBEDDING_MODEL, EMBEDDING_DIMENSION,
+    EMBEDDING_CONCURRENCY, EMBEDDING_BATCH_TOKENS, EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_RETRIES, EMBEDDING_RETRY_BACKOFF, EMBEDDING_TIMEOUT
+)
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+CHARS_PER_TOKEN = 4  # rough estimate for English text; avoids a tokenizer dependency
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def token_batches(texts: List[str], max_tokens: int, max_texts: int) -> List[Tuple[int, int]]:
+    """Split texts into (start, end) ranges under both a token and a text count budget"""
+    batches, start, tokens = [], 0, 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if i > start and (tokens + cost > max_tokens or i - start >= max_texts):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += cost
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+class EmbeddingError(RuntimeError):
+    """Raised when some batches still fail after retries; ``failures`` lists (start, end, reason)"""
+
+    def __init__(self, failures: List[Tuple[int, int, str]], total: int):
+        self.failures = failures
+        failed = sum(end - start for start, end, _ in failures)
+        super().__init__(f"Failed to embed {failed}/{total} texts: {failures[0][2]}")
+
+
+class EmbeddingClient:
+    """OpenAI-compatible ``/embeddings`` client.
+
+    Requests share a pooled ``requests.Session``; batches are sized by estimated tokens and
+    sent concurrently, and 429/5xx/connection errors are retried with exponential backoff.
+    A call that fits in one batch (e.g. a search query) is sent from the calling thread, so
+    it never queues behind a bulk ingestion's batches on the shared pool. Point ``base_url``
+    at a local stub server to exercise it offline.
+    """
+
+    def __init__(self, base_url: str = OPENROUTER_BASE_URL, api_key: Optional[str] = OPENROUTER_API_KEY,
+                 model: str = EMBEDDING_MODEL, dimension: int = EMBEDDING_DIMENSION,
+                 concurrency: int = EMBEDDING_CONCURRENCY, batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+                 batch_size: int = EMBEDDING_BATCH_SIZE, max_retries: int = EMBEDDING_MAX_RETRIES,
+                 backoff: float = EMBEDDING_RETRY_BACKOFF, timeout: float = EMBEDDING_TIMEOUT):
+        self.url = f"{base_url.rstrip('/')}/embeddings"
+        self.api_key = api_key
+        self.model = model
+        self.dimension = dimension
+        self.concurrency = max(1, concurrency)
+        self.batch_tokens = batch_tokens
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed")
+
+    @property
+    def session(self) -> requests.Session:
+        # One keep-alive session per thread; requests.Session is not documented as thread-safe
+        if not hasattr(self._local, "session"):
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "http://localhost:3000",  # Required by OpenRouter
+                "X-Title": "Research Repository"  # Required by OpenRouter
+            })
+            self._local.session = session
+        return self._local.session
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * 2 ** attempt * (0.5 + random.random() / 2)
+
+    def _post(self, batch: List[str]) -> np.ndarray:
+        """Embed one batch, retrying transient failures"""
+        last_error = ""
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self.session.post(
+                    self.url, json={"model": self.model, "input": batch}, timeout=self.timeout
+                )
+                metrics.embedding_requests.inc(status=response.status_code)
+                if response.status_code == 200:
+                    data = sorted(response.json()["data"], key=lambda item: item.get("index", 0))
+                    vectors = np.array([item["embedding"] for item in data], dtype="float32")
+                    if vectors.shape != (len(batch), self.dimension):
+                        raise EmbeddingError([(0, len(batch), f"unexpected response shape {vectors.shape}")], len(batch))
+                    return vectors
+                last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in RETRY_STATUS:
+                    break
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = f"{type(e).__name__}: {e}"
+                metrics.embedding_requests.inc(status=type(e).__name__)
+            if attempt < self.max_retries:
+                metrics.embedding_retries.inc()
+                delay = self._retry_delay(attempt, response)
+                print(f"Embedding request failed ({last_error}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+        raise EmbeddingError([(0, len(batch), last_error)], len(batch))
+
+    def embed(self, texts: List[str], batch_size: Optional[int] = None,
+              progress: Optional[Callable[[float], None]] = None) -> np.ndarray:
+        """Embed texts as a (len(texts), dimension) float32 array; raises EmbeddingError on failure"""
+        if not self.api_key:
+            raise ValueError("OpenRouter API key not configured")
+        out = np.zeros((len(texts), self.dimension), dtype="float32")
+        if not texts:
+            return out
+
+        metrics.embedding_texts.inc(len(texts))
+        batches = token_batches(texts, self.batch_tokens, batch_size or self.batch_size)
+        if len(batches) == 1:
+            try:
+                out[:] = self._post(texts)
+            except EmbeddingError:
+                raise
+            except Exception as e:
+                raise EmbeddingError([(0, len(texts), str(e))], len(texts))
+            if progress:
+                progress(1.0)
+            return out
+        futures = {self._executor.submit(self._post, texts[start:end]): (start, end) for start, end in batches}
+        failures, done = [], 0
+        for future in as_completed(futures):
+            start, end = futures[future]
+            try:
+                out[start:end] = future.result()
+            except Exception as e:
+                reason = e.failures[0][2] if isinstance(e, EmbeddingError) else str(e)
+                failures.append((start, end, reason))
+            done += end - start
+            if progress:
+                progress(done / len(texts))
+
+        if failures:
+            raise EmbeddingError(sorted(failures), len(texts))
+        return out
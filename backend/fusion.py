@@ -0,0 +1,109 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+FUSION_METHODS = ("rrf", "weighted")
+CHUNK_AGGREGATIONS = ("max", "sum")
+
+
+def aggregate_chunks(paper_ids: np.ndarray, chunk_ids: np.ndarray, scores: np.ndarray,
+                     mode: str = "max") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Collapse chunk hits to one score per paper.
+
+    Returns (papers, scores, best_chunk_ids) with scores the max or sum over each paper's
+    chunks and best_chunk_ids its highest-scoring chunk (used for the snippet).
+    """
+    if len(paper_ids) == 0:
+        empty = np.zeros(0, dtype="int64")
+        return empty, np.zeros(0, dtype="float64"), empty
+    papers, inverse = np.unique(paper_ids, return_inverse=True)
+    if mode == "sum":
+        paper_scores = np.bincount(inverse, weights=scores, minlength=len(papers))
+    else:
+        paper_scores = np.full(len(papers), -np.inf)
+        np.maximum.at(paper_scores, inverse, scores)
+
+    # Best chunk per paper: order by (paper, score desc) and take each paper's first row
+    order = np.lexsort((-scores, inverse))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = inverse[order][1:] != inverse[order][:-1]
+    best_chunks = chunk_ids[order][first]
+    return papers, paper_scores, best_chunks
+
+
+def ranks(scores: np.ndarray) -> np.ndarray:
+    """1-based descending rank of each score"""
+    result = np.empty(len(scores), dtype="int64")
+    result[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return result
+
+
+def min_max(scores: np.ndarray) -> np.ndarray:
+    """Scale scores to [0, 1]; a constant list maps to 1"""
+    if len(scores) == 0:
+        return scores
+    low, high = scores.min(), scores.max()
+    if high <= low:
+        return np.ones(len(scores))
+    return (scores - low) / (high - low)
+
+
+def fuse(lists: Sequence[Tuple[np.ndarray, np.ndarray]], method: str = "rrf",
+         weights: Optional[Sequence[float]] = None, rrf_k: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse (ids, scores) lists from several retrievers into (ids, fused scores), best first.
+
+    rrf sums weight / (rrf_k + rank) per list; weighted sums weight * min-max normalised
+    score. Ids missing from a list contribute nothing for it.
+    """
+    lists = [(np.asarray(ids, dtype="int64"), np.asarray(scores, dtype="float64")) for ids, scores in lists]
+    weights = list(weights) if weights is not None else [1.0] * len(lists)
+    non_empty = [ids for ids, _ in lists if len(ids)]
+    if not non_empty:
+        return np.zeros(0, dtype="int64"), np.zeros(0, dtype="float64")
+
+    all_ids = np.unique(np.concatenate(non_empty))
+    fused = np.zeros(len(all_ids))
+    for (ids, scores), weight in zip(lists, weights):
+        if len(ids) == 0:
+            continue
+        contribution = 1.0 / (rrf_k + ranks(scores)) if method == "rrf" else min_max(scores)
+        np.add.at(fused, np.searchsorted(all_ids, ids), weight * contribution)
+
+    order = np.argsort(-fused, kind="stable")
+    return all_ids[order], fused[order]
+
+
+def fuse_results(semantic_hits: List[Dict], chunk_papers: Dict[int, int], keyword_hits: List[Tuple[int, float]],
+                 top_k: int, method: str = "rrf", aggregation: str = "max",
+                 semantic_weight: float = 0.5, rrf_k: int = 60) -> List[Dict]:
+    """Rank papers from chunk-level semantic hits and paper-level keyword hits.
+
+    Returns hybrid_search result dicts: paper_id, fused score, type (semantic, keyword or both)
+    and the best matching chunk_id (None for keyword-only papers).
+    """
+    hits = [(chunk_papers[hit['chunk_id']], hit['chunk_id'], hit['similarity_score'])
+            for hit in semantic_hits if hit['chunk_id'] in chunk_papers]
+    hit_array = np.array(hits, dtype="float64").reshape(-1, 3)
+    semantic_papers, semantic_scores, best_chunks = aggregate_chunks(
+        hit_array[:, 0].astype("int64"), hit_array[:, 1].astype("int64"), hit_array[:, 2], aggregation
+    )
+    keyword_papers = np.array([paper_id for paper_id, _ in keyword_hits], dtype="int64")
+    keyword_scores = np.array([score for _, score in keyword_hits], dtype="float64")
+
+    paper_ids, scores = fuse(
+        [(semantic_papers, semantic_scores), (keyword_papers, keyword_scores)],
+        method=method, weights=(semantic_weight, 1.0 - semantic_weight), rrf_k=rrf_k
+    )
+    best_chunk = dict(zip(semantic_papers.tolist(), best_chunks.tolist()))
+    keyword_set = set(keyword_papers.tolist())
+
+    results = []
+    for paper_id, score in zip(paper_ids[:top_k].tolist(), scores[:top_k].tolist()):
+        in_semantic = paper_id in best_chunk
+        in_keyword = paper_id in keyword_set
+        results.append({
+            'paper_id': paper_id,
+            'score': score,
+            'type': 'both' if in_semantic and in_keyword else 'semantic' if in_semantic else 'keyword',
+            'chunk_id': best_chunk.get(paper_id)  # None: snippet comes from the paper's first chunk
+        })
+    return results
@@ -0,0 +1,743 @@
+import os
+import json
+import math
+import pickle
+import threading
+import faiss
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+from interprocess import SharedLock, file_stamp
+from config import (
+    FAISS_INDEX_DIR, FAISS_INDEX_PATH, EMBEDDING_DIMENSION,
+    FAISS_MAX_DELTA_SEGMENTS, FAISS_MAX_TOMBSTONES,
+    FAISS_INDEX_TYPE, FAISS_TRAIN_MIN_VECTORS, FAISS_RETRAIN_GROWTH,
+    FAISS_NLIST, FAISS_PQ_M, FAISS_HNSW_M, FAISS_NPROBE, FAISS_EF_SEARCH, FAISS_FILTER_EXACT_MAX,
+    FAISS_METRIC, FAISS_REDUCTION, FAISS_REDUCED_DIMENSION
+)
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "index.lock"
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+METRICS = ("l2", "cosine")
+REDUCTIONS = ("none", "truncate", "pca")
+NORMALIZE_BATCH = 65536  # rows normalised per step, bounding temporaries for large rebuilds
+PCA_TRAIN_SAMPLE = 32768  # vectors sampled to fit the PCA matrix
+# IO_FLAG_MMAP maps only IVF inverted lists; flat and HNSW storage is still read into each
+# process's heap. IO_FLAG_MMAP_IFC (faiss >= 1.11) maps the storage itself, so workers share
+# the base's pages through the page cache. Bases read this way are immutable.
+MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+def choose_nlist(ntotal: int) -> int:
+    """Number of IVF lists for a corpus of ntotal vectors (FAISS_NLIST overrides)"""
+    if FAISS_NLIST > 0:
+        return FAISS_NLIST
+    return int(min(65536, max(16, 4 * math.sqrt(max(ntotal, 1)))))
+
+
+def choose_pq_m(dimension: int) -> int:
+    """Largest number of PQ sub-quantizers <= FAISS_PQ_M that divides the dimension"""
+    m = min(FAISS_PQ_M, dimension)
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def index_description(index_type: str, dimension: int, ntotal: int) -> str:
+    """faiss.index_factory string for an index type sized for ntotal vectors"""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{choose_nlist(ntotal)},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{choose_nlist(ntotal)},PQ{choose_pq_m(dimension)}"
+    if index_type == "hnsw":
+        return f"HNSW{FAISS_HNSW_M}"
+    raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {INDEX_TYPES}")
+
+
+def faiss_metric(metric: str) -> int:
+    """FAISS metric constant; cosine is inner product over unit-length vectors"""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown FAISS metric '{metric}', expected one of {METRICS}")
+    return faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+
+def build_index(index_type: str, dimension: int, ntotal: int = 0, metric: str = "l2"):
+    """Create an empty (possibly untrained) ID-mapped index"""
+    return faiss.IndexIDMap2(faiss.index_factory(
+        dimension, index_description(index_type, dimension, ntotal), faiss_metric(metric)
+    ))
+
+
+def reduced_dimension(reduction: str, dimension: int, target: int) -> int:
+    """Index dimension for a reduction of dimension-wide embeddings to target dimensions"""
+    if reduction not in REDUCTIONS:
+        raise ValueError(f"Unknown FAISS reduction '{reduction}', expected one of {REDUCTIONS}")
+    if reduction == "none":
+        return dimension
+    if not 0 < target < dimension:
+        raise ValueError(f"Reduced dimension must be between 1 and {dimension - 1}, got {target}")
+    return target
+
+
+def train_pca(vectors: np.ndarray, dimension: int):
+    """Fit a faiss PCAMatrix projecting vectors down to dimension on a sample of them"""
+    if len(vectors) < dimension:
+        raise ValueError(f"PCA to {dimension} dimensions needs at least {dimension} vectors, got {len(vectors)}")
+    rng = np.random.default_rng(0)
+    sample = vectors[np.sort(rng.choice(len(vectors), min(len(vectors), PCA_TRAIN_SAMPLE), replace=False))]
+    pca = faiss.PCAMatrix(vectors.shape[1], dimension)
+    pca.train(np.ascontiguousarray(sample, dtype="float32"))
+    return pca
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalised float32 copy of vectors, in NORMALIZE_BATCH-row steps (zero rows stay zero)"""
+    vectors = np.array(vectors, dtype="float32", order="C")
+    for start in range(0, len(vectors), NORMALIZE_BATCH):
+        block = vectors[start:start + NORMALIZE_BATCH]
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        np.divide(block, norms, out=block, where=norms > 0)
+    return vectors
+
+
+def prepare_vectors(vectors: np.ndarray, metric: str, reduction: str = "none", dimension: int = 0,
+                    transform=None) -> np.ndarray:
+    """Reduce float32 embeddings to dimension (truncate renormalises), then normalise for cosine"""
+    if reduction == "truncate":
+        return normalize_rows(vectors[:, :dimension])
+    if reduction == "pca":
+        vectors = transform.apply(vectors)
+    if metric == "cosine":
+        return normalize_rows(vectors)
+    return vectors
+
+
+class FaissIndexManager:
+    """ID-mapped FAISS index persisted as a base file plus append-only delta segments.
+
+    Layout of ``index_dir``:
+      manifest.json          - current generation, base file, delta segments, tombstone file
+      base-<gen>.index       - compacted index, written with faiss.write_index and mmapped on load
+      delta-<seq>.index      - vectors added since the last compaction (one file per add)
+      tombstones-<gen>.bin   - int64 ids removed since the last compaction (append-only)
+
+    The base may be a trained ANN index (``FAISS_INDEX_TYPE``); deltas are always flat.
+    Rebuilds run in a background thread and swap the new base in under the lock, replaying
+    any deltas and tombstones written while they ran. A removed id only has to be masked
+    out of the base until the next rebuild, so ids must not be re-added once removed: a
+    reload replays every delta before every tombstone, which would mask the new vector
+    too. Chunk ids are never reused, and callers skip ids already indexed (``contains``).
+
+    Several processes (uvicorn workers, the ingest CLI) can share one index directory. The
+    base is mmapped, so its pages are shared through the OS page cache. Writers serialise on
+    ``index.lock`` and refresh before mutating. Readers stat the manifest and tombstone file
+    before each search and, when another process changed them, load only the new delta
+    segments and tombstones, or the whole manifest after a rebuild (``refresh``).
+
+    With the cosine metric every index is inner product and vectors are normalised on the
+    way in, both when added and when searched; distances are reported as 1 - cosine so they
+    still sort ascending. The metric an index was built with is kept in the manifest and
+    only changes through rebuild_from_source(metric=...).
+
+    Embeddings can also be reduced before indexing (``FAISS_REDUCTION``): Matryoshka prefix
+    truncation (renormalised) or a PCA matrix fitted at rebuild time and stored next to the
+    base. ``dimension`` is always the embedding width; ``index_dimension`` what the index holds.
+    """
+
+    def __init__(self, index_dir: str = FAISS_INDEX_DIR, dimension: int = EMBEDDING_DIMENSION,
+                 index_type: str = FAISS_INDEX_TYPE, metric: str = FAISS_METRIC,
+                 reduction: str = FAISS_REDUCTION, reduced_to: int = FAISS_REDUCED_DIMENSION):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {INDEX_TYPES}")
+        faiss_metric(metric)
+        index_dimension = reduced_dimension(reduction, dimension, reduced_to)
+        self.index_dir = index_dir
+        self.dimension = dimension
+        self.index_type = index_type
+        self.configured_metric = metric
+        self.metric = metric  # replaced by the manifest's metric for existing indexes
+        self.configured_reduction = (reduction, index_dimension)
+        # Like the metric, an existing index keeps the reduction it was built with. A new
+        # PCA index stays unreduced until rebuild_from_source has vectors to fit it on.
+        self.reduction = reduction if reduction != "pca" else "none"
+        self.index_dimension = index_dimension if reduction != "pca" else dimension
+        self.transform = None
+        self.transform_file: Optional[str] = None
+        # Optional callable returning (vectors, ids) for every indexed chunk; used to retrain
+        # from the original vectors instead of reconstructing them from a lossy base.
+        self.vector_source: Optional[Callable[[], Tuple[np.ndarray, np.ndarray]]] = None
+        # Optional callable returning vectors for given ids (zero rows when missing); used for
+        # exact search over small filtered id sets that an ANN base could miss.
+        self.vector_lookup: Optional[Callable[[np.ndarray], np.ndarray]] = None
+        # Optional callable run after picking up another process's changes (e.g. to drop cached results)
+        self.on_change: Optional[Callable[[], None]] = None
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+        self._writer = SharedLock(self._path(LOCK_NAME))
+        self._manifest_stamp = None
+        self._tombstone_offset = 0  # bytes of the tombstone file already applied
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self.generation = 0
+        self.base_file: Optional[str] = None
+        self.base_type = "flat"
+        self.trained_ntotal = 0
+        self.delta_files: List[str] = []
+        self.tombstone_file = "tombstones-000000.bin"
+        self.base = self._new_flat()
+        self.delta = self._new_flat()
+        self.tombstones = set()
+        self._tombstone_array = None
+        self._next_delta_seq = 1
+        with self._writer:
+            self.load()
+
+    # ------------------------------------------------------------------ helpers
+    def _new_flat(self):
+        return build_index("flat", self.index_dimension, metric=self.metric)
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        """Embeddings as stored in / queried against the index: reduced, then normalised for cosine"""
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Embedding dimension mismatch: expected {self.dimension}, got {vectors.shape[1]}")
+        return prepare_vectors(vectors, self.metric, self.reduction, self.index_dimension, self.transform)
+
+    def _to_distances(self, part: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Turn inner-product scores into ascending cosine distances"""
+        if self.metric != "cosine":
+            return part
+        scores, ids = part
+        return np.where(ids == -1, np.inf, 1.0 - scores).astype("float32"), ids
+
+    def similarities(self, distances: np.ndarray) -> np.ndarray:
+        """Similarity scores for distances returned by search"""
+        if self.metric == "cosine":
+            return 1.0 - distances
+        return 1.0 / (1.0 + distances)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _write_manifest(self):
+        manifest = {
+            "generation": self.generation,
+            "dimension": self.dimension,
+            "metric": self.metric,
+            "reduction": self.reduction,
+            "index_dimension": self.index_dimension,
+            "transform": self.transform_file,
+            "index_type": self.base_type,
+            "trained_ntotal": self.trained_ntotal,
+            "base": self.base_file,
+            "deltas": self.delta_files,
+            "tombstones": self.tombstone_file,
+            "next_delta_seq": self._next_delta_seq,
+        }
+        tmp_path = self._path(MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._path(MANIFEST_NAME))
+        self._manifest_stamp = file_stamp(self._path(MANIFEST_NAME))
+
+    def _set_tombstones(self, tombstones: set):
+        self.tombstones = tombstones
+        self._tombstone_array = np.fromiter(tombstones, dtype="int64") if tombstones else None
+
+    @property
+    def ntotal(self) -> int:
+        return self.base.ntotal + self.delta.ntotal - len(self.tombstones)
+
+    @property
+    def d(self) -> int:
+        return self.dimension
+
+    @property
+    def rebuilding(self) -> bool:
+        return self._rebuild_thread is not None and self._rebuild_thread.is_alive()
+
+    # ------------------------------------------------------------ persistence
+    def load(self):
+        """Load the manifest, mmap the base and replay delta segments and tombstones"""
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            manifest_path = self._path(MANIFEST_NAME)
+            if not os.path.exists(manifest_path):
+                self._migrate_legacy_pickle()
+                return
+
+            self._manifest_stamp = file_stamp(manifest_path)
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+            if manifest.get("dimension") != self.dimension:
+                print(f"Dimension mismatch: expected {self.dimension}, got {manifest.get('dimension')}. Creating new index.")
+                self._write_manifest()
+                return
+
+            self.metric = manifest.get("metric", "l2")
+            if self.metric != self.configured_metric:
+                print(f"FAISS index uses the {self.metric} metric but FAISS_METRIC is {self.configured_metric}; "
+                      f"run `python init_faiss.py --migrate-metric` to rebuild it.")
+            self.reduction = manifest.get("reduction", "none")
+            self.index_dimension = manifest.get("index_dimension", self.dimension)
+            self.transform_file = manifest.get("transform")
+            self.transform = faiss.read_VectorTransform(self._path(self.transform_file)) if self.transform_file else None
+            if (self.reduction, self.index_dimension) != self.configured_reduction:
+                print(f"FAISS index uses reduction {self.reduction}/{self.index_dimension} but FAISS_REDUCTION is "
+                      f"{self.configured_reduction[0]}/{self.configured_reduction[1]}; "
+                      f"run `python init_faiss.py --reduce` to rebuild it.")
+            self.generation = manifest["generation"]
+            self.base_file = manifest.get("base")
+            self.base_type = manifest.get("index_type", "flat")
+            self.trained_ntotal = manifest.get("trained_ntotal", 0)
+            self.delta_files = manifest.get("deltas", [])
+            self.tombstone_file = manifest.get("tombstones", f"tombstones-{self.generation:06d}.bin")
+            self._next_delta_seq = manifest.get("next_delta_seq", len(self.delta_files) + 1)
+
+            if self.base_file:
+                self.base = faiss.read_index(self._path(self.base_file), MMAP_FLAG)
+            else:
+                self.base = self._new_flat()
+
+            self.delta = self._load_deltas(self.delta_files)
+            removed = self._read_tombstones(self.tombstone_file)
+            self._tombstone_offset = removed.nbytes
+            if len(removed):
+                self.delta.remove_ids(faiss.IDSelectorBatch(removed))
+            self._set_tombstones(self._ids_in_base(self.base, removed))
+
+            print(f"Loaded {self.base_type} FAISS index generation {self.generation} with {self.ntotal} vectors")
+
+    def _changed_on_disk(self) -> bool:
+        return (file_stamp(self._path(MANIFEST_NAME)) != self._manifest_stamp
+                or os.path.exists(self._path(self.tombstone_file))
+                and os.path.getsize(self._path(self.tombstone_file)) != self._tombstone_offset)
+
+    def refresh(self) -> bool:
+        """Pick up changes another process made to the index directory; True if there were any.
+
+        New delta segments and tombstones are applied incrementally; a new generation (a
+        rebuild elsewhere) reloads the manifest and re-mmaps the new base.
+        """
+        if not self._changed_on_disk():
+            return False
+        # Hold the writer lock so a concurrent rebuild cannot delete files mid-read
+        with self._lock, self._writer:
+            if not self._changed_on_disk():
+                return False
+            stamp = file_stamp(self._path(MANIFEST_NAME))
+            with open(self._path(MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+            deltas = manifest.get("deltas", [])
+            if (manifest["generation"] != self.generation or manifest.get("base") != self.base_file
+                    or deltas[:len(self.delta_files)] != self.delta_files):
+                self.load()
+            else:
+                for name in deltas[len(self.delta_files):]:
+                    vectors, ids = self._extract(faiss.read_index(self._path(name)))
+                    self.delta.add_with_ids(vectors, ids)
+                self.delta_files = list(deltas)
+                self._next_delta_seq = manifest.get("next_delta_seq", self._next_delta_seq)
+                self._manifest_stamp = stamp
+
+                removed = self._read_tombstones(self.tombstone_file, self._tombstone_offset)
+                self._tombstone_offset += removed.nbytes
+                if len(removed):
+                    self.delta.remove_ids(faiss.IDSelectorBatch(removed))
+                    self._set_tombstones(self.tombstones | self._ids_in_base(self.base, removed))
+        if self.on_change is not None:
+            self.on_change()
+        return True
+
+    def _migrate_legacy_pickle(self):
+        """Import a pre-manifest pickled index once, then persist it in the new layout"""
+        if os.path.exists(FAISS_INDEX_PATH):
+            try:
+                with open(FAISS_INDEX_PATH, "rb") as f:
+                    legacy = pickle.load(f)
+                if legacy.d == self.dimension and legacy.ntotal > 0 and hasattr(legacy, "id_map"):
+                    vectors, ids = self._extract(legacy)
+                    self.delta.add_with_ids(self._prepare(vectors), ids)
+                    print(f"Migrated {legacy.ntotal} vectors from {FAISS_INDEX_PATH}")
+                    self._write_manifest()
+                    self._do_rebuild(retrain=None)
+                    return
+            except Exception as e:
+                print(f"Error loading legacy FAISS index: {e}. Creating new index.")
+        self._write_manifest()
+        print(f"Created new FAISS index with dimension {self.index_dimension}")
+
+    def _load_deltas(self, names: List[str]):
+        delta = self._new_flat()
+        for name in names:
+            vectors, ids = self._extract(faiss.read_index(self._path(name)))
+            delta.add_with_ids(vectors, ids)
+        return delta
+
+    def _read_tombstones(self, name: str, offset: int = 0) -> np.ndarray:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype="int64")
+        return np.fromfile(path, dtype="int64", offset=offset)
+
+    @staticmethod
+    def _extract(index) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (vectors, ids) held by an ID-mapped index; lossy for PQ-encoded indexes"""
+        ids = faiss.vector_to_array(index.id_map).astype("int64")
+        if len(ids) == 0:
+            return np.zeros((0, index.d), dtype="float32"), ids
+        inner = faiss.downcast_index(index.index)
+        ivf = faiss.try_extract_index_ivf(inner)
+        if ivf is not None:
+            ivf.make_direct_map()
+        return inner.reconstruct_n(0, index.ntotal), ids
+
+    @staticmethod
+    def _ids_in_base(base, ids: np.ndarray) -> set:
+        if base.ntotal == 0 or len(ids) == 0:
+            return set()
+        base_ids = faiss.vector_to_array(base.id_map)
+        return set(int(i) for i in ids[np.isin(ids, base_ids)])
+
+    def contains(self, ids) -> np.ndarray:
+        """Boolean mask of the ids currently indexed"""
+        ids = np.ascontiguousarray(ids, dtype="int64")
+        self.refresh()
+        with self._lock:
+            found = np.isin(ids, faiss.vector_to_array(self.delta.id_map))
+            if self.base.ntotal:
+                in_base = np.isin(ids, faiss.vector_to_array(self.base.id_map))
+                if self._tombstone_array is not None:
+                    in_base &= ~np.isin(ids, self._tombstone_array)
+                found |= in_base
+        return found
+
+    # ------------------------------------------------------------ mutations
+    def add_with_ids(self, vectors: np.ndarray, ids: np.ndarray):
+        """Add vectors and persist them as a new delta segment"""
+        ids = np.ascontiguousarray(ids, dtype="int64")
+
+        with self._lock, self._writer:
+            self.refresh()
+            vectors = self._prepare(vectors)
+            segment = self._new_flat()
+            segment.add_with_ids(vectors, ids)
+            name = f"delta-{self._next_delta_seq:06d}.index"
+            faiss.write_index(segment, self._path(name))
+
+            self.delta.add_with_ids(vectors, ids)
+            self.delta_files.append(name)
+            self._next_delta_seq += 1
+            self._write_manifest()
+        self._maybe_rebuild()
+
+    def remove_ids(self, ids) -> int:
+        """Remove vectors by id; returns the number of vectors dropped"""
+        ids = np.ascontiguousarray(ids, dtype="int64")
+        if len(ids) == 0:
+            return 0
+
+        with self._lock, self._writer:
+            self.refresh()
+            removed = int(self.delta.remove_ids(faiss.IDSelectorBatch(ids)))
+            in_base = self._ids_in_base(self.base, ids) - self.tombstones
+            removed += len(in_base)
+            if removed == 0:
+                return 0
+
+            with open(self._path(self.tombstone_file), "ab") as f:
+                ids.tofile(f)
+            self._tombstone_offset += ids.nbytes
+            self._set_tombstones(self.tombstones | in_base)
+        self._maybe_rebuild()
+        return removed
+
+    # ------------------------------------------------------------ rebuilds
+    def needs_training(self) -> bool:
+        """True when the base should be (re)trained as the configured ANN type"""
+        if self.index_type == "flat":
+            return self.base_type != "flat"
+        if self.ntotal < FAISS_TRAIN_MIN_VECTORS:
+            return False
+        if self.base_type != self.index_type:
+            return True
+        return self.ntotal > self.trained_ntotal * FAISS_RETRAIN_GROWTH
+
+    def _maybe_rebuild(self):
+        if self.rebuilding:
+            return
+        if (len(self.delta_files) > FAISS_MAX_DELTA_SEGMENTS
+                or len(self.tombstones) > FAISS_MAX_TOMBSTONES
+                or self.needs_training()):
+            self.rebuild()
+
+    def rebuild(self, retrain: Optional[bool] = None) -> Optional[threading.Thread]:
+        """Start a background rebuild unless one is already running"""
+        with self._lock:
+            if self.rebuilding:
+                return self._rebuild_thread
+            self._rebuild_thread = threading.Thread(target=self._rebuild, args=(retrain,), daemon=True)
+            self._rebuild_thread.start()
+            return self._rebuild_thread
+
+    def compact(self, retrain: Optional[bool] = None):
+        """Merge base, deltas and tombstones into a new base file, blocking until done"""
+        thread = self.rebuild(retrain)
+        if thread is not None:
+            thread.join()
+
+    def _rebuild(self, retrain: Optional[bool]):
+        try:
+            self._do_rebuild(retrain)
+        except Exception as e:
+            print(f"Error rebuilding FAISS index: {e}")
+
+    def _do_rebuild(self, retrain: Optional[bool]):
+        # Snapshot the state being folded; adds and removes keep landing in new files meanwhile
+        with self._lock, self._writer:
+            self.refresh()
+            if retrain is None:
+                retrain = self.needs_training()
+            base, base_file, base_type = self.base, self.base_file, self.base_type
+            snapshot_deltas = list(self.delta_files)
+            delta_vectors, delta_ids = self._extract(self.delta)
+            tombstone_file = self.tombstone_file
+            tombstone_path = self._path(tombstone_file)
+            tombstone_offset = os.path.getsize(tombstone_path) if os.path.exists(tombstone_path) else 0
+            tombstones = set(self.tombstones)
+            generation = self.generation + 1
+
+        carried = set()
+        if retrain:
+            target_type = self.index_type
+            vectors, ids = self._snapshot_vectors(base, delta_vectors, delta_ids, tombstones)
+            merged = self._train(target_type, vectors, ids)
+            trained_ntotal = len(ids)
+        else:
+            # Incremental merge: keep the trained quantizer, fold deltas and tombstones into it
+            target_type, trained_ntotal = base_type, self.trained_ntotal
+            merged = faiss.read_index(self._path(base_file)) if base_file else self._new_flat()
+            inner = faiss.downcast_index(merged.index)
+            if tombstones and isinstance(inner, faiss.IndexFlat):
+                merged.remove_ids(faiss.IDSelectorBatch(np.fromiter(tombstones, dtype="int64")))
+            elif tombstones and faiss.try_extract_index_ivf(inner) is not None:
+                # IndexIDMap2.remove_ids compacts id_map but leaves the IVF's labels (positions
+                # in id_map) as they were, shifting every later id; refill the trained index instead
+                vectors, ids = self._snapshot_vectors(base, delta_vectors, delta_ids, tombstones)
+                merged.reset()
+                delta_vectors, delta_ids = vectors, ids
+            elif tombstones:
+                carried = tombstones  # HNSW cannot remove; keep masking them
+            if len(delta_ids):
+                merged.add_with_ids(delta_vectors, delta_ids)
+
+        new_base_file = f"base-{generation:06d}.index"
+        tmp_path = self._path(f"{new_base_file}.{os.getpid()}.tmp")
+        faiss.write_index(merged, tmp_path)
+        del merged
+
+        with self._lock, self._writer:
+            self.refresh()
+            if self.generation != generation - 1:
+                # Another process swapped in its own rebuild first; ours is already stale
+                os.remove(tmp_path)
+                return
+            os.replace(tmp_path, self._path(new_base_file))
+            new_deltas = self.delta_files[len(snapshot_deltas):]
+            late_tombstones = self._read_tombstones(tombstone_file, tombstone_offset)
+            new_tombstone_file = f"tombstones-{generation:06d}.bin"
+            pending = np.concatenate([np.fromiter(carried, dtype="int64"), late_tombstones])
+            with open(self._path(new_tombstone_file), "wb") as f:
+                pending.tofile(f)
+
+            new_base = faiss.read_index(self._path(new_base_file), MMAP_FLAG)
+            new_delta = self._load_deltas(new_deltas)
+            if len(late_tombstones):
+                new_delta.remove_ids(faiss.IDSelectorBatch(late_tombstones))
+
+            old_files = [base_file, tombstone_file] + snapshot_deltas
+            self.generation = generation
+            self.base, self.base_file, self.base_type = new_base, new_base_file, target_type
+            self.trained_ntotal = trained_ntotal
+            self.delta, self.delta_files = new_delta, new_deltas
+            self.tombstone_file = new_tombstone_file
+            self._tombstone_offset = pending.nbytes
+            self._set_tombstones(self._ids_in_base(new_base, pending))
+            self._write_manifest()
+
+            for name in old_files:
+                if name and os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            print(f"Rebuilt {target_type} FAISS index generation {self.generation} with {self.ntotal} vectors")
+
+    def _train(self, index_type: str, vectors: np.ndarray, ids: np.ndarray):
+        """Build an index of index_type holding already prepared vectors, training it on a sample if needed"""
+        index = build_index(index_type, self.index_dimension, len(ids), self.metric)
+        if not index.is_trained:
+            rng = np.random.default_rng(0)
+            sample_size = min(len(ids), max(choose_nlist(len(ids)) * 256, 65536))
+            index.train(vectors[rng.choice(len(ids), sample_size, replace=False)])
+        index.add_with_ids(vectors, ids)
+        return index
+
+    def rebuild_from_source(self, metric: Optional[str] = None, reduction: Optional[str] = None,
+                            reduced_to: int = 0):
+        """Replace the whole index with every vector from vector_source, blocking adds meanwhile.
+
+        Passing a metric switches the index to it (e.g. migrating an L2 index to cosine);
+        passing a reduction re-reduces every vector to reduced_to dimensions, refitting PCA.
+        """
+        if self.vector_source is None:
+            raise ValueError("No vector source configured")
+        if metric is not None:
+            faiss_metric(metric)
+        if reduction is not None:
+            index_dimension = reduced_dimension(reduction, self.dimension, reduced_to)
+        # Let a running background rebuild finish first; its swap needs the lock
+        if self._rebuild_thread is not None:
+            self._rebuild_thread.join()
+        with self._lock, self._writer:
+            self.refresh()
+            if metric is not None:
+                self.metric = metric
+            vectors, ids = self.vector_source()
+            old_files = [self.base_file, self.tombstone_file] + self.delta_files
+            self.generation += 1
+            if reduction is not None:
+                old_files.append(self.transform_file)
+                self.transform, self.transform_file = None, None
+                if reduction == "pca":
+                    self.transform = train_pca(vectors, index_dimension)
+                    self.transform_file = f"pca-{self.generation:06d}.bin"
+                    faiss.write_VectorTransform(self.transform, self._path(self.transform_file))
+                self.reduction, self.index_dimension = reduction, index_dimension
+
+            target_type = self.index_type if len(ids) >= FAISS_TRAIN_MIN_VECTORS else "flat"
+            rebuilt = self._train(target_type, self._prepare(vectors), ids)
+            self.base_file = f"base-{self.generation:06d}.index"
+            self.tombstone_file = f"tombstones-{self.generation:06d}.bin"
+            faiss.write_index(rebuilt, self._path(self.base_file))
+            self.base = faiss.read_index(self._path(self.base_file), MMAP_FLAG)
+            self.base_type = target_type
+            self.trained_ntotal = len(ids) if target_type != "flat" else 0
+            self.delta, self.delta_files = self._new_flat(), []
+            self._tombstone_offset = 0
+            self._set_tombstones(set())
+            self._write_manifest()
+
+            for name in old_files:
+                if name and os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            print(f"Rebuilt {target_type} {self.metric} FAISS index from source with {self.ntotal} vectors "
+                  f"of dimension {self.index_dimension}")
+
+    def _snapshot_vectors(self, base, delta_vectors, delta_ids, tombstones) -> Tuple[np.ndarray, np.ndarray]:
+        """All live (prepared) vectors of a snapshot, preferring the original vectors from vector_source"""
+        live_ids = np.concatenate([faiss.vector_to_array(base.id_map).astype("int64"), delta_ids])
+        if tombstones:
+            live_ids = live_ids[~np.isin(live_ids, np.fromiter(tombstones, dtype="int64"))]
+
+        if self.vector_source is not None:
+            vectors, ids = self.vector_source()
+            keep = np.isin(ids, live_ids)
+            return self._prepare(vectors[keep]), ids[keep]
+
+        base_vectors, base_ids = self._extract(base) if base.ntotal else (delta_vectors[:0], delta_ids[:0])
+        vectors = np.vstack([base_vectors, delta_vectors])
+        ids = np.concatenate([base_ids, delta_ids])
+        keep = np.isin(ids, live_ids)
+        return np.ascontiguousarray(vectors[keep]), ids[keep]
+
+    # ------------------------------------------------------------ queries
+    def _search_params(self, base, selector, nprobe: Optional[int], ef_search: Optional[int],
+                       selectivity: float = 1.0):
+        # A selector admitting only a fraction of the base needs proportionally wider probing
+        # for the ANN search to still reach k admitted vectors.
+        inner = faiss.downcast_index(base.index)
+        ivf = faiss.try_extract_index_ivf(inner)
+        if ivf is not None:
+            params = faiss.SearchParametersIVF()
+            params.nprobe = min(ivf.nlist, math.ceil((nprobe or FAISS_NPROBE) / selectivity))
+        elif isinstance(inner, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW()
+            params.efSearch = min(max(base.ntotal, 1), math.ceil((ef_search or FAISS_EF_SEARCH) / selectivity))
+        elif selector is None:
+            return None
+        else:
+            params = faiss.SearchParameters()
+        if selector is not None:
+            params.sel = selector
+        return params
+
+    def _exact_search(self, query_vectors: np.ndarray, k: int, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force search over just the given ids"""
+        vectors = self.vector_lookup(ids)
+        present = vectors.any(axis=1)
+        if not present.any():
+            n = query_vectors.shape[0]
+            return np.full((n, k), np.inf, dtype="float32"), np.full((n, k), -1, dtype="int64")
+        vectors, ids = self._prepare(vectors[present]), ids[present]
+        index = faiss.IndexFlat(self.index_dimension, faiss_metric(self.metric))
+        index.add(vectors)
+        distances, rows = index.search(query_vectors, k)
+        return self._to_distances((distances, np.where(rows >= 0, ids[np.maximum(rows, 0)], -1)))
+
+    def search(self, query_vectors: np.ndarray, k: int, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None, allowed_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Search base and delta, returning (distances, ids) merged by distance.
+
+        ``allowed_ids`` restricts results to those ids via FAISS ID selectors; small sets on an
+        ANN base are searched exactly, since probing/graph search could miss them entirely.
+        """
+        self.refresh()
+        query_vectors = self._prepare(query_vectors)
+        n = query_vectors.shape[0]
+        if allowed_ids is not None:
+            allowed_ids = np.unique(np.asarray(allowed_ids, dtype="int64"))
+            if len(allowed_ids) == 0:
+                return np.full((n, k), np.inf, dtype="float32"), np.full((n, k), -1, dtype="int64")
+
+        # The delta is mutable and small, so search it under the lock; the base is
+        # immutable once swapped in and is searched outside it.
+        parts = []
+        with self._lock:
+            base, tombstone_array = self.base, self._tombstone_array
+            if (allowed_ids is not None and self.vector_lookup is not None and self.base_type != "flat"
+                    and len(allowed_ids) <= FAISS_FILTER_EXACT_MAX):
+                base = None
+            elif self.delta.ntotal:
+                params = None
+                if allowed_ids is not None:
+                    params = faiss.SearchParameters()
+                    params.sel = faiss.IDSelectorBatch(allowed_ids)
+                parts.append(self._to_distances(self.delta.search(query_vectors, k, params=params)))
+
+        if base is None:
+            if tombstone_array is not None:
+                allowed_ids = np.setdiff1d(allowed_ids, tombstone_array)
+            return self._exact_search(query_vectors, k, allowed_ids)
+
+        if base.ntotal:
+            selector, selectivity = None, 1.0
+            if allowed_ids is not None:
+                live = allowed_ids if tombstone_array is None else np.setdiff1d(allowed_ids, tombstone_array)
+                selector = faiss.IDSelectorBatch(live)
+                selectivity = min(1.0, max(len(live), 1) / base.ntotal)
+            elif tombstone_array is not None:
+                batch = faiss.IDSelectorBatch(tombstone_array)
+                selector = faiss.IDSelectorNot(batch)
+            params = self._search_params(base, selector, nprobe, ef_search, selectivity)
+            parts.append(self._to_distances(base.search(query_vectors, k, params=params)))
+
+        if not parts:
+            return np.full((n, k), np.inf, dtype="float32"), np.full((n, k), -1, dtype="int64")
+        if len(parts) == 1:
+            return parts[0]
+
+        distances = np.hstack([p[0] for p in parts])
+        ids = np.hstack([p[1] for p in parts])
+        distances[ids == -1] = np.inf
+        order = np.argsort(distances, axis=1)[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(ids, order, axis=1)
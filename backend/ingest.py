@@ -0,0 +1,137 @@
+import os
+import sys
+import shutil
+import tarfile
+import zipfile
+import argparse
+from typing import List
+from config import STORAGE_PATH, INGEST_BULK_BATCH, INGEST_EXTRACT_PROCESSES
+
+# Bulk ingestion of PDF files, directories and archives (zip/tar). Heavy imports (database,
+# indexes) stay inside functions: extraction workers re-import this module when spawned.
+#   python ingest.py papers/ more.zip --user admin --category Ayurveda
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2")
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def storage_name(filename: str) -> str:
+    """Basename inside STORAGE_PATH, suffixed if another file already has the name"""
+    name = os.path.basename(filename)
+    stem, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while os.path.exists(os.path.join(STORAGE_PATH, candidate)):
+        candidate = f"{stem}-{n}{ext}"
+        n += 1
+    return candidate
+
+
+def expand_archive(archive_path: str) -> List[str]:
+    """Copy the PDFs inside an archive into STORAGE_PATH, returning their stored filenames"""
+    os.makedirs(STORAGE_PATH, exist_ok=True)
+    stored = []
+    # Members are written by basename only, so archive paths cannot escape STORAGE_PATH
+    if archive_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                if member.is_dir() or not member.filename.lower().endswith(".pdf"):
+                    continue
+                name = storage_name(member.filename)
+                with archive.open(member) as src, open(os.path.join(STORAGE_PATH, name), "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                stored.append(name)
+    else:
+        with tarfile.open(archive_path) as archive:
+            for member in archive:
+                if not member.isfile() or not member.name.lower().endswith(".pdf"):
+                    continue
+                name = storage_name(member.name)
+                with archive.extractfile(member) as src, open(os.path.join(STORAGE_PATH, name), "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                stored.append(name)
+    return stored
+
+
+def collect_pdfs(paths: List[str], skip: set = frozenset()) -> List[str]:
+    """Store PDFs from files, directories and archives; returns filenames relative to STORAGE_PATH"""
+    os.makedirs(STORAGE_PATH, exist_ok=True)
+    storage_root = os.path.abspath(STORAGE_PATH)
+    stored = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, f) for root, _, names in os.walk(path) for f in names)
+            stored.extend(collect_pdfs([f for f in files if f.lower().endswith(".pdf") or is_archive(f)], skip))
+        elif is_archive(path):
+            stored.extend(expand_archive(path))
+        elif path.lower().endswith(".pdf"):
+            if os.path.basename(path) in skip:
+                continue
+            if os.path.dirname(os.path.abspath(path)) == storage_root:
+                stored.append(os.path.basename(path))
+            else:
+                name = storage_name(path)
+                shutil.copyfile(path, os.path.join(STORAGE_PATH, name))
+                stored.append(name)
+        else:
+            print(f"Skipping {path}: not a PDF or supported archive")
+    return stored
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Bulk-ingest PDFs, directories and archives")
+    parser.add_argument("paths", nargs="+", help="PDF files, directories or .zip/.tar archives")
+    parser.add_argument("--user", required=True, help="username recorded as the uploader")
+    parser.add_argument("--category", default=None)
+    parser.add_argument("--project-id", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BULK_BATCH, help="papers per insert/embed batch")
+    parser.add_argument("--workers", type=int, default=INGEST_EXTRACT_PROCESSES, help="extraction processes (0 = CPUs)")
+    parser.add_argument("--reingest", action="store_true", help="ingest files whose filename is already stored")
+    args = parser.parse_args(argv)
+
+    import crud
+    import jobs
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        user = crud.get_user_by_username(db, args.user)
+        if not user:
+            sys.exit(f"Unknown user '{args.user}'")
+
+        skip = set()
+        if not args.reingest:
+            names = [os.path.basename(p) for p in args.paths if p.lower().endswith(".pdf")]
+            for path in args.paths:
+                if os.path.isdir(path):
+                    names.extend(f for _, _, files in os.walk(path) for f in files if f.lower().endswith(".pdf"))
+            skip = crud.get_existing_filenames(db, names)
+        filenames = collect_pdfs(args.paths, skip)
+        if skip:
+            print(f"Skipping {len(skip)} already ingested files")
+        if not filenames:
+            print("Nothing to ingest.")
+            return
+
+        payload = {"title": None, "category": args.category, "project_id": args.project_id}
+        job_ids = crud.create_ingest_jobs(db, [(name, payload) for name in filenames], user.id)
+    finally:
+        db.close()
+
+    print(f"Ingesting {len(job_ids)} papers...")
+    jobs.run_bulk(job_ids, batch_size=args.batch_size, workers=args.workers)
+
+    db = SessionLocal()
+    try:
+        statuses = [crud.get_ingest_job(db, job_id) for job_id in job_ids]
+        failed = [job for job in statuses if job.status != "completed"]
+    finally:
+        db.close()
+    for job in failed:
+        print(f"  {job.filename}: {job.error} (retry with POST /api/jobs/{job.id}/retry)")
+    print(f"Ingested {len(job_ids) - len(failed)}/{len(job_ids)} papers.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,34 @@
-import faiss
-import pickle
-import os
+import sys
+from config import FAISS_INDEX_DIR, FAISS_METRIC, FAISS_REDUCTION, FAISS_REDUCED_DIMENSION
+from utils import faiss_index as index, vector_store, migrate_json_embeddings, migrate_json_chunks
 
-os.makedirs("embeddings", exist_ok=True)
+# Creates the index directory (or migrates the legacy pickle) on first run.
+#   --migrate-embeddings  move embeddings from the legacy JSON column into the vector store
+#   --migrate-chunks      move legacy JSON chunk arrays into paper_chunks (implies --rebuild)
+#   --rebuild             rebuild the whole index from the vector store (no embedding API calls)
+#   --migrate-metric      rebuild the index from the vector store with FAISS_METRIC (e.g. l2 -> cosine)
+#   --reduce              rebuild the index from the vector store with FAISS_REDUCTION / FAISS_REDUCED_DIMENSION
+#                         (see `python -m benchmarks.reduction` for recall vs. memory first)
+#   --retrain             retrain the base as FAISS_INDEX_TYPE from the vector store
+#   --compact             fold delta segments and tombstones into a new base file
+if "--migrate-embeddings" in sys.argv:
+    migrate_json_embeddings()
+    vector_store.compact()
 
-# dimension of your embeddings
-d = 1536  
+if "--migrate-chunks" in sys.argv:
+    migrate_json_chunks()
 
-index = faiss.IndexFlatL2(d)  # or whatever index type you use
-with open("embeddings/faiss_index.pkl", "wb") as f:
-    pickle.dump(index, f)
+if "--migrate-metric" in sys.argv or "--reduce" in sys.argv:
+    index.rebuild_from_source(
+        metric=FAISS_METRIC if "--migrate-metric" in sys.argv else None,
+        reduction=FAISS_REDUCTION if "--reduce" in sys.argv else None,
+        reduced_to=FAISS_REDUCED_DIMENSION
+    )
+elif "--rebuild" in sys.argv or "--migrate-chunks" in sys.argv:
+    index.rebuild_from_source()
+elif "--retrain" in sys.argv:
+    index.compact(retrain=True)
+elif "--compact" in sys.argv:
+    index.compact()
 
-print("FAISS index initialized.")
+print(f"FAISS index initialized at {FAISS_INDEX_DIR} ({index.base_type}, {index.metric}, dimension {index.index_dimension}, {index.ntotal} vectors).")
@@ -0,0 +1,54 @@
+import os
+import threading
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: locking only covers the threads of one process
+    fcntl = None
+
+
+class SharedLock:
+    """Re-entrant lock held across this process's threads and, through flock on ``path``,
+    across every process (uvicorn worker, ingest CLI) writing the same on-disk index"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, "a")
+                if fcntl is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+
+def file_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    """(inode, mtime_ns, size) of path, or None if missing; changes whenever the file is
+    replaced or appended to, so comparing stamps is a one-syscall change check"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
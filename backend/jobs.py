@@ -0,0 +1,205 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+import crud
+import models
+import utils
+import pdf_extract
+import search_cache
+import metrics
+from database import SessionLocal
+from typing import List, Optional
+from config import (
+    STORAGE_PATH, INGEST_WORKERS, INGEST_MAX_RETRIES, INGEST_RETRY_BACKOFF, INGEST_STALE_SECONDS,
+    INGEST_BULK_BATCH, INGEST_EXTRACT_PROCESSES, INGEST_EMBED_BATCH_SIZE,
+    PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES
+)
+
+# Ingestion runs as ordered stages; a job's ``stage`` is the next stage to run, so a
+# failed job resumes from the stage that failed. Each stage is idempotent.
+STAGES = ("extract", "chunk", "embed", "index")
+STAGE_PROGRESS = {"extract": (0.0, 0.1), "chunk": (0.1, 0.2), "embed": (0.2, 0.9), "index": (0.9, 1.0)}
+
+executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+
+
+def _stale_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=INGEST_STALE_SECONDS)
+
+
+def _extract(db: Session, job: models.IngestJob, progress):
+    # The paper and job.paper_id commit together, so a retry reuses the paper rather than
+    # inserting it again; re-indexing its keywords is idempotent
+    if job.paper_id is not None:
+        db_paper = crud.get_research_paper(db, job.paper_id)
+    else:
+        # Large PDFs are extracted in page ranges across processes
+        text_content = pdf_extract.pdf_to_text(
+            os.path.join(STORAGE_PATH, job.filename), workers=INGEST_EXTRACT_PROCESSES,
+            pages_per_task=PDF_PAGES_PER_TASK, parallel_min_pages=PDF_PARALLEL_MIN_PAGES
+        )
+        paper_data = utils.paper_create_from_text(job.filename, text_content, job.payload)
+        db_paper = crud.create_research_paper(db, paper_data, job.created_by, job=job)
+    utils.keyword_index.add_document(
+        db_paper.id, utils.paper_keyword_text(db_paper.title, db_paper.abstract, db_paper.content)
+    )
+
+
+def _chunk(db: Session, job: models.IngestJob, progress):
+    paper = crud.get_research_paper(db, job.paper_id)
+    # A retried stage replaces the chunks, so drop vectors stored under the old chunk ids
+    if utils.remove_paper_from_index(db, paper.id):
+        search_cache.bump_index_generation()
+    utils.chunk_paper(db, paper.id, paper.content or "")
+
+
+def _embed(db: Session, job: models.IngestJob, progress):
+    utils.embed_paper_chunks(db, job.paper_id, progress=progress)
+
+
+def _index(db: Session, job: models.IngestJob, progress):
+    utils.index_paper_chunks(db, job.paper_id)
+
+
+STAGE_HANDLERS = {"extract": _extract, "chunk": _chunk, "embed": _embed, "index": _index}
+
+
+def run_job(job_id: str):
+    """Run a job's remaining stages, retrying each with exponential backoff"""
+    db = SessionLocal()
+    try:
+        if not crud.claim_ingest_job(db, job_id, _stale_before()):
+            return
+        job = crud.get_ingest_job(db, job_id)
+
+        for stage in STAGES[STAGES.index(job.stage):]:
+            low, high = STAGE_PROGRESS[stage]
+            crud.update_ingest_job(db, job, stage=stage, progress=low)
+
+            def progress(fraction: float, low=low, high=high):
+                crud.update_ingest_job(db, job, progress=low + (high - low) * fraction)
+
+            for attempt in range(1, INGEST_MAX_RETRIES + 1):
+                try:
+                    crud.update_ingest_job(db, job, attempts=job.attempts + 1)
+                    with metrics.span(f"ingest.{stage}"):
+                        STAGE_HANDLERS[stage](db, job, progress)
+                    break
+                except Exception as e:
+                    db.rollback()
+                    print(f"Ingest job {job_id} stage {stage} attempt {attempt} failed: {e}")
+                    if attempt == INGEST_MAX_RETRIES:
+                        crud.update_ingest_job(db, job, status="failed", error=f"{stage}: {e}")
+                        return
+                    time.sleep(INGEST_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+        crud.update_ingest_job(db, job, status="completed", stage="done", progress=1.0)
+    except Exception as e:
+        print(f"Ingest job {job_id} crashed: {e}")
+    finally:
+        db.close()
+
+
+def submit_job(job_id: str):
+    executor.submit(run_job, job_id)
+
+
+def _ingest_batch(db: Session, batch: list):
+    """Insert, embed and index a batch of (job, text) in bulk; failed jobs stay retryable"""
+    jobs_in_batch = [job for job, _ in batch]
+    stage = "extract"
+    try:
+        entries = []
+        for job, text in batch:
+            paper_data = utils.paper_create_from_text(job.filename, text, job.payload)
+            spans = utils.chunk_spans(text)
+            page_numbers = utils.page_numbers_for_offsets(text, [start for start, _ in spans])
+            entries.append((paper_data, spans, [text[start:end] for start, end in spans], page_numbers))
+
+        # Papers, chunks and job links are written in one transaction
+        with metrics.span("ingest.insert"):
+            created = crud.create_research_papers_bulk(db, entries, jobs_in_batch[0].created_by, jobs=jobs_in_batch)
+            for (paper, _), (paper_data, _, _, _) in zip(created, entries):
+                utils.keyword_index.add_document(
+                    paper.id, utils.paper_keyword_text(paper_data.title, paper_data.abstract, paper_data.content)
+                )
+
+        stage = "embed"
+        chunk_ids = np.array([cid for _, ids in created for cid in ids], dtype="int64")
+        if len(chunk_ids):
+            texts = [text for _, _, chunk_texts, _ in entries for text in chunk_texts]
+            with metrics.span("ingest.embed"):
+                embeddings = utils.get_embeddings_openrouter(texts, batch_size=INGEST_EMBED_BATCH_SIZE)
+                utils.vector_store.add(chunk_ids, embeddings)
+            metrics.chunks_embedded.inc(len(chunk_ids))
+            stage = "index"
+            with metrics.span("ingest.index"):
+                utils.faiss_index.add_with_ids(embeddings, chunk_ids)
+            metrics.chunks_indexed.inc(len(chunk_ids))
+
+        for job in jobs_in_batch:
+            job.status, job.stage, job.progress = "completed", "done", 1.0
+        db.commit()
+        search_cache.bump_index_generation()
+        print(f"Ingested batch of {len(batch)} papers ({len(chunk_ids)} chunks)")
+    except Exception as e:
+        db.rollback()
+        print(f"Bulk ingest batch failed at {stage}: {e}")
+        for job in jobs_in_batch:
+            job.status, job.stage, job.error = "failed", stage, f"{stage}: {e}"
+        db.commit()
+
+
+def run_bulk(job_ids: List[str], batch_size: int = INGEST_BULK_BATCH, workers: Optional[int] = None):
+    """Ingest many queued jobs: parallel text extraction, then batched inserts and embeddings"""
+    db = SessionLocal()
+    try:
+        claimed = [crud.get_ingest_job(db, job_id) for job_id in job_ids
+                   if crud.claim_ingest_job(db, job_id, _stale_before())]
+        paths = [os.path.join(STORAGE_PATH, job.filename) for job in claimed]
+
+        batch = []
+        results = pdf_extract.extract_texts(paths, workers or INGEST_EXTRACT_PROCESSES)
+        for job, (_, text, error) in zip(claimed, results):
+            if error is not None:
+                crud.update_ingest_job(db, job, status="failed", stage="extract", error=f"extract: {error}")
+                continue
+            # Extraction ran in pool processes, whose own counters never reach /metrics
+            metrics.pdf_pages.inc(text.count(pdf_extract.PAGE_BREAK) + 1)
+            batch.append((job, text))
+            if len(batch) >= batch_size:
+                _ingest_batch(db, batch)
+                batch = []
+        if batch:
+            _ingest_batch(db, batch)
+    except Exception as e:
+        print(f"Bulk ingest crashed: {e}")
+    finally:
+        db.close()
+
+
+def submit_bulk(job_ids: List[str]):
+    executor.submit(run_bulk, job_ids)
+
+
+def retry_job(db: Session, job: models.IngestJob) -> models.IngestJob:
+    """Requeue a failed job; it resumes from the stage that failed"""
+    crud.update_ingest_job(db, job, status="queued", error=None)
+    submit_job(job.id)
+    return job
+
+
+def resume_pending_jobs():
+    """Resubmit queued jobs and jobs orphaned by a previous process"""
+    db = SessionLocal()
+    try:
+        job_ids = crud.get_resumable_ingest_job_ids(db, _stale_before())
+    finally:
+        db.close()
+    for job_id in job_ids:
+        submit_job(job_id)
+    if job_ids:
+        print(f"Resumed {len(job_ids)} ingest jobs")
@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import math
+import heapq
+import pickle
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from interprocess import SharedLock, file_stamp
+from config import KEYWORD_INDEX_DIR, KEYWORD_INDEX_MAX_LOG, BM25_K1, BM25_B
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+SNAPSHOT_NAME = "snapshot.pkl"
+LOG_NAME = "log.jsonl"
+LOCK_NAME = "index.lock"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, skipping terms of two characters or fewer"""
+    if not text:
+        return []
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 2]
+
+
+class KeywordIndex:
+    """Inverted index with term frequencies and BM25 scoring.
+
+    State is a pickled snapshot plus an append-only JSON-lines log of add/remove
+    operations; the log is folded into a new snapshot after KEYWORD_INDEX_MAX_LOG entries.
+    Processes sharing the directory serialise writes on ``index.lock``; searches first replay
+    log entries other processes appended, or reload after they wrote a new snapshot.
+    """
+
+    def __init__(self, index_dir: str = KEYWORD_INDEX_DIR):
+        self.index_dir = index_dir
+        self._lock = threading.RLock()
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        self._log_entries = 0
+        self._log_offset = 0  # bytes of the log already applied
+        self._snapshot_stamp = None
+        # Optional callable run after picking up another process's changes
+        self.on_change = None
+        os.makedirs(index_dir, exist_ok=True)
+        self._writer = SharedLock(self._path(LOCK_NAME))
+        with self._writer:
+            self.load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.doc_lengths)
+
+    # ------------------------------------------------------------ persistence
+    def load(self):
+        """Load the snapshot and replay the operation log"""
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            self.postings, self.doc_lengths, self.total_length = {}, {}, 0
+            self._log_entries, self._log_offset = 0, 0
+            snapshot_path = self._path(SNAPSHOT_NAME)
+            self._snapshot_stamp = file_stamp(snapshot_path)
+            if os.path.exists(snapshot_path):
+                try:
+                    with open(snapshot_path, "rb") as f:
+                        self.postings, self.doc_lengths = pickle.load(f)
+                    self.total_length = sum(self.doc_lengths.values())
+                except Exception as e:
+                    print(f"Error loading keyword index snapshot: {e}. Starting empty.")
+            self._replay_log()
+
+    def _replay_log(self):
+        """Apply complete log lines past _log_offset"""
+        log_path = self._path(LOG_NAME)
+        if not os.path.exists(log_path):
+            return
+        with open(log_path, "rb") as f:
+            f.seek(self._log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial write; picked up on the next replay
+                self._log_offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write from a crashed process
+                if entry["op"] == "add":
+                    self._apply_add(entry["id"], entry["tf"])
+                else:
+                    self._apply_remove(entry["id"], entry.get("terms"))
+                self._log_entries += 1
+
+    def _log_size(self) -> int:
+        stamp = file_stamp(self._path(LOG_NAME))
+        return stamp[2] if stamp else 0
+
+    def refresh(self) -> bool:
+        """Apply changes another process made to the index; True if there were any"""
+        if file_stamp(self._path(SNAPSHOT_NAME)) == self._snapshot_stamp and self._log_size() == self._log_offset:
+            return False
+        with self._lock, self._writer:
+            if file_stamp(self._path(SNAPSHOT_NAME)) != self._snapshot_stamp or self._log_size() < self._log_offset:
+                self.load()
+            elif self._log_size() != self._log_offset:
+                self._replay_log()
+            else:
+                return False
+        if self.on_change is not None:
+            self.on_change()
+        return True
+
+    def _append_log(self, entry: dict):
+        with open(self._path(LOG_NAME), "ab") as f:
+            f.write((json.dumps(entry) + "\n").encode())
+            self._log_offset = f.tell()
+        self._log_entries += 1
+        if self._log_entries >= KEYWORD_INDEX_MAX_LOG:
+            self.compact()
+
+    def compact(self):
+        """Write a fresh snapshot and truncate the operation log"""
+        with self._lock, self._writer:
+            self.refresh()
+            tmp_path = self._path(SNAPSHOT_NAME + ".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump((self.postings, self.doc_lengths), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(SNAPSHOT_NAME))
+            open(self._path(LOG_NAME), "w").close()
+            self._snapshot_stamp = file_stamp(self._path(SNAPSHOT_NAME))
+            self._log_entries, self._log_offset = 0, 0
+
+    # ------------------------------------------------------------ mutations
+    def _apply_add(self, doc_id: int, term_freqs: Dict[str, int]):
+        if doc_id in self.doc_lengths:
+            self._apply_remove(doc_id)
+        for term, tf in term_freqs.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(term_freqs.values())
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def _apply_remove(self, doc_id: int, terms: Iterable[str] = None) -> List[str]:
+        """Drop doc_id from the postings of terms (all terms if None); returns the terms it was in"""
+        if doc_id not in self.doc_lengths:
+            return []
+        removed = []
+        for term in list(terms if terms is not None else self.postings):
+            docs = self.postings.get(term)
+            if docs and docs.pop(doc_id, None) is not None:
+                removed.append(term)
+                if not docs:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        return removed
+
+    def add_document(self, doc_id: int, text: str):
+        """Index (or re-index) a document"""
+        term_freqs = dict(Counter(tokenize(text)))
+        with self._lock, self._writer:
+            self.refresh()
+            self._apply_add(doc_id, term_freqs)
+            self._append_log({"op": "add", "id": doc_id, "tf": term_freqs})
+
+    def remove_document(self, doc_id: int, text: str = None):
+        """Drop a document; passing its text limits the update to its own postings"""
+        with self._lock, self._writer:
+            self.refresh()
+            if doc_id not in self.doc_lengths:
+                return
+            terms = self._apply_remove(doc_id, set(tokenize(text)) if text is not None else None)
+            # Logged so other processes replaying the remove skip the vocabulary scan
+            self._append_log({"op": "remove", "id": doc_id, "terms": terms})
+
+    # ------------------------------------------------------------ queries
+    def search(self, query: str, top_k: int = 10, allowed: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        """BM25-ranked (doc_id, score) pairs for the query terms, optionally only among allowed ids"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        self.refresh()
+        with self._lock:
+            n_docs = len(self.doc_lengths)
+            if n_docs == 0:
+                return []
+            avg_length = self.total_length / n_docs
+            scores: Dict[int, float] = {}
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                if allowed is not None:
+                    # Intersect from the smaller side
+                    if len(allowed) < len(docs):
+                        docs = {doc_id: docs[doc_id] for doc_id in allowed if doc_id in docs}
+                    else:
+                        docs = {doc_id: tf for doc_id, tf in docs.items() if doc_id in allowed}
+                for doc_id, tf in docs.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda x: x[1])
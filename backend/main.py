@@ -1,6 +1,7 @@
 from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, status, Form
 from sqlalchemy.orm import Session
-from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import shutil
 import os
@@ -10,16 +11,50 @@ import schemas
 import crud
 import auth
 import utils
-from database import SessionLocal, engine
-from config import STORAGE_PATH
+import jobs
+import ingest
+import search_cache
+import metrics
+import warmup
+from database import SessionLocal, AsyncSessionLocal, engine
+from config import STORAGE_PATH, DB_ASYNC_READS
+from fusion import FUSION_METHODS, CHUNK_AGGREGATIONS
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 import time
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 import json
+import tempfile
+from contextlib import asynccontextmanager
 
-models.Base.metadata.create_all(bind=engine)
-app = FastAPI(title="Research Repository")
+def init_database():
+    models.Base.metadata.create_all(bind=engine)
+    # create_all only creates indexes along with new tables
+    for index in models.ResearchPaper.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+def warm_keyword_index():
+    if utils.keyword_index.doc_count == 0:
+        utils.rebuild_keyword_index()
+
+# Loaded in the background after startup so the worker answers health checks at once;
+# a request that needs an index before then loads it on demand.
+WARMUP_STEPS = [
+    ("database", init_database),
+    ("keyword_index", warm_keyword_index),
+    ("vector_store", utils.vector_store.get),
+    ("faiss_index", utils.faiss_index.get),
+    ("embedding_cache", utils.embedding_cache.get),
+    ("ingest_jobs", jobs.resume_pending_jobs),
+]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup.start(WARMUP_STEPS)
+    yield
+
+app = FastAPI(title="Research Repository", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,6 +74,12 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("No async engine: DB_ASYNC_READS is off")
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     token = credentials.credentials
     payload = auth.verify_token(token)
@@ -62,6 +103,25 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         )
     return user
 
+@metrics.gauge("research_warmup_ready", "1 once indexes are loaded, else 0")
+def _warmup_ready():
+    return int(warmup.is_ready())
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Stage timings, counters and index sizes of this worker in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/health")
+def health():
+    """Liveness: the worker is up (indexes may still be loading)"""
+    return {"status": "ok"}
+
+@app.get("/api/ready")
+def readiness():
+    """Warm-up progress; 503 until every index is loaded so load balancers hold traffic"""
+    return JSONResponse(warmup.status(), status_code=200 if warmup.is_ready() else 503)
+
 # Authentication endpoints
 @app.post("/api/auth/register")
 def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -104,14 +164,16 @@ def create_project(
     
     return crud.create_project(db=db, project=project, user_id=current_user.id)
 
-@app.get("/api/projects", response_model=List[schemas.Project])
 def get_projects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     projects = crud.get_projects(db, skip=skip, limit=limit)
     return projects
 
+async def get_projects_async(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await crud.get_projects_async(db, skip=skip, limit=limit)
+
 # Research paper endpoints (protected)
 @app.post("/api/upload")
-async def upload_research_paper(
+def upload_research_paper(
     file: UploadFile = File(...),
     title: str = Form(...),
     authors: str = Form(...),
@@ -124,6 +186,7 @@ async def upload_research_paper(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
+    """Save the PDF and queue it for background ingestion; poll /api/jobs/{job_id} for status"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to upload papers")
 
@@ -133,13 +196,11 @@ async def upload_research_paper(
     try:
         # Save file
         os.makedirs(STORAGE_PATH, exist_ok=True)
-        file_location = os.path.join(STORAGE_PATH, file.filename)
+        filename = ingest.storage_name(file.filename)
+        file_location = os.path.join(STORAGE_PATH, filename)
         with open(file_location, "wb") as f:
             shutil.copyfileobj(file.file, f)
 
-        # Extract text for search indexing
-        text_content = utils.pdf_to_text(file_location)
-
         # Parse JSON arrays from form data
         try:
             authors_list = json.loads(authors) if authors else []
@@ -162,120 +223,269 @@ async def upload_research_paper(
                 except:
                     pub_date = None
 
-        # Create paper record
-        paper_data = schemas.ResearchPaperCreate(
-            filename=file.filename,
-            title=title,
-            authors=authors_list,
-            abstract=abstract,
-            journal=journal,
-            publication_date=pub_date,
-            keywords=keywords_list,
-            category=category,
-            content=text_content,
-            project_id=project_id  # <-- query param used here
-        )
+        # Paper metadata is stored with the job; extraction creates the paper record
+        payload = {
+            "title": title,
+            "authors": authors_list,
+            "abstract": abstract,
+            "journal": journal,
+            "publication_date": pub_date.isoformat() if pub_date else None,
+            "keywords": keywords_list,
+            "category": category,
+            "project_id": project_id  # <-- query param used here
+        }
+        job = crud.create_ingest_job(db, filename, payload, current_user.id)
+        jobs.submit_job(job.id)
+
+        return {
+            "message": "Research paper queued for processing",
+            "job_id": job.id,
+            "title": title,
+            "status": job.status
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+@app.post("/api/upload/bulk")
+def upload_research_papers_bulk(
+    files: List[UploadFile] = File(...),
+    category: str = Form(None),
+    project_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Queue many PDFs (or zip/tar archives of PDFs) for batched ingestion; metadata is read from each PDF"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to upload papers")
+
+    for file in files:
+        if not (file.filename.lower().endswith('.pdf') or ingest.is_archive(file.filename)):
+            raise HTTPException(status_code=400, detail=f"Unsupported file type: {file.filename}")
 
-        db_paper = crud.create_research_paper(db, paper_data, current_user.id)
+    try:
+        os.makedirs(STORAGE_PATH, exist_ok=True)
+        filenames = []
+        for file in files:
+            if ingest.is_archive(file.filename):
+                suffix = next(s for s in ingest.ARCHIVE_SUFFIXES if file.filename.lower().endswith(s))
+                with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+                    shutil.copyfileobj(file.file, tmp)
+                    tmp.flush()
+                    filenames.extend(ingest.expand_archive(tmp.name))
+            else:
+                filename = ingest.storage_name(file.filename)
+                with open(os.path.join(STORAGE_PATH, filename), "wb") as f:
+                    shutil.copyfileobj(file.file, f)
+                filenames.append(filename)
+
+        if not filenames:
+            raise HTTPException(status_code=400, detail="No PDF files found in upload")
 
-        # Add to search index
-        chunks, embeddings = utils.add_paper_to_index(text_content, db_paper.id)
-        db_paper.chunks = chunks
-        db_paper.embeddings = embeddings
-        db.commit()
+        payload = {"title": None, "category": category, "project_id": project_id}
+        job_ids = crud.create_ingest_jobs(db, [(name, payload) for name in filenames], current_user.id)
+        jobs.submit_bulk(job_ids)
 
         return {
-            "message": "Research paper uploaded successfully",
-            "paper_id": db_paper.id,
-            "title": db_paper.title,
-            "chunks_processed": len(chunks)
+            "message": f"{len(job_ids)} research papers queued for processing",
+            "job_ids": job_ids,
+            "count": len(job_ids)
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk upload failed: {str(e)}")
+
+@app.get("/api/jobs/{job_id}", response_model=schemas.IngestJob)
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Ingestion job status and progress"""
+    job = crud.get_ingest_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs/{job_id}/retry", response_model=schemas.IngestJob)
+def retry_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Resume a failed ingestion job from the stage that failed"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to retry jobs")
+
+    job = crud.get_ingest_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "failed":
+        raise HTTPException(status_code=400, detail=f"Job is {job.status}, only failed jobs can be retried")
+    return jobs.retry_job(db, job)
 
 
 # Public search endpoints (no authentication required)
-@app.get("/api/search")
-def search_papers(query: str, top_k: int = 10, db: Session = Depends(get_db)):
-    """Search papers using hybrid search"""
-    start_time = time.time()
-    
-    if not query.strip():
-        return schemas.SearchResponse(
-            query=query,
-            results=[],
-            total_count=0,
-            search_time=0.0
-        )
-    
-    try:
-        # Get all papers for hybrid search
-        all_papers = crud.get_all_research_papers(db)
-        
-        if not all_papers:
-            return schemas.SearchResponse(
-                query=query,
-                results=[],
-                total_count=0,
-                search_time=0.0
-            )
-        
-        # Perform hybrid search
-        search_results = utils.hybrid_search(query, all_papers, top_k)
-        
-        # Format results
-        formatted_results = []
-        for result in search_results:
-            paper = result['paper']
-            chunk_index = result['chunk_index']
-            
-            # Get relevant snippet
-            snippet = utils.get_relevant_snippet(
-                paper.chunks[chunk_index] if paper.chunks and chunk_index < len(paper.chunks) else paper.content,
-                query
-            )
-            
-            # Get project info
-            project_name = None
-            project_status = None
-            if paper.project_id:
-                project = crud.get_project_by_id(db, paper.project_id)
-                project_name = project.name if project else None
-                project_status = project.status if project else None
-            
-            formatted_results.append(schemas.SearchResult(
-                id=paper.id,
-                title=paper.title or paper.filename,
-                authors=paper.authors or [],
-                abstract=paper.abstract or "",
-                journal=paper.journal,
-                publication_date=paper.publication_date,
-                category=paper.category,
-                snippet=snippet,
-                similarity_score=result['score'],
-                filename=paper.filename,
-                project_name=project_name,
-                project_status=project_status  
-            ))
-        
-        search_time = time.time() - start_time
-        
+@app.get("/api/stats/embedding-cache")
+def embedding_cache_stats(current_user: models.User = Depends(get_current_user)):
+    """Embedding cache size and hit/miss counters (Admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return utils.embedding_cache.stats()
+
+class SearchRequest:
+    """/api/search parameters, validated and resolved to hybrid_search arguments"""
+
+    def __init__(
+        self,
+        query: str,
+        top_k: int = 10,
+        nprobe: Optional[int] = None,  # IVF lists probed (defaults to FAISS_NPROBE)
+        ef_search: Optional[int] = None,  # HNSW search depth (defaults to FAISS_EF_SEARCH)
+        category: Optional[str] = None,
+        project_id: Optional[int] = None,
+        date_from: Optional[date] = None,  # publication date range, inclusive
+        date_to: Optional[date] = None,
+        fusion: Optional[str] = None,  # rrf | weighted (defaults to FUSION_METHOD)
+        aggregation: Optional[str] = None,  # per-paper chunk scores: max | sum (defaults to CHUNK_AGGREGATION)
+        semantic_weight: Optional[float] = Query(None, ge=0.0, le=1.0),  # keyword weight is 1 - this
+        candidates: Optional[int] = Query(None, ge=1, le=1000),  # hits taken from each retriever before fusion
+        debug: bool = False,  # include per-stage timings in the response
+    ):
+        if fusion is not None and fusion not in FUSION_METHODS:
+            raise HTTPException(status_code=400, detail=f"fusion must be one of: {', '.join(FUSION_METHODS)}")
+        if aggregation is not None and aggregation not in CHUNK_AGGREGATIONS:
+            raise HTTPException(status_code=400, detail=f"aggregation must be one of: {', '.join(CHUNK_AGGREGATIONS)}")
+        self.start_time = time.time()
+        self.query = query
+        self.top_k = top_k
+        self.debug = debug
+        filters = {
+            "category": category or None,
+            "project_id": project_id,
+            "date_from": datetime.combine(date_from, datetime.min.time()) if date_from else None,
+            "date_to": datetime.combine(date_to, datetime.max.time()) if date_to else None,
+        }
+        ranking = {"fusion_method": fusion, "aggregation": aggregation, "semantic_weight": semantic_weight, "candidates": candidates}
+        self.options = {"nprobe": nprobe, "ef_search": ef_search, "filters": filters, **ranking}
+        self._key_params = {"top_k": top_k, "nprobe": nprobe, "ef_search": ef_search, **filters, **ranking}
+        self.cache_key = None
+
+    def cached(self) -> Optional[List[schemas.SearchResult]]:
+        """Results of an identical search against the unchanged index, answered from memory"""
+        if not self.query.strip():
+            return []
+        # Changes written by other workers bump the generation only once picked up, so
+        # refresh before keying the lookup rather than at the start of the search itself
+        utils.refresh_indexes()
+        self.cache_key = search_cache.result_key(self.query, **self._key_params)
+        cached_results = search_cache.search_results.get(self.cache_key)
+        metrics.record_cache("search_results", hits=int(cached_results is not None), misses=int(cached_results is None))
+        if cached_results is not None:
+            metrics.searches.inc(outcome="cached")
+        return cached_results
+
+    def store(self, results: List[schemas.SearchResult]):
+        search_cache.search_results.put(self.cache_key, results)
+        metrics.searches.inc(outcome="computed")
+
+    def response(self, results: List[schemas.SearchResult], stages: dict) -> schemas.SearchResponse:
         return schemas.SearchResponse(
-            query=query,
-            results=formatted_results,
-            total_count=len(formatted_results),
-            search_time=search_time
+            query=self.query,
+            results=results,
+            total_count=len(results),
+            search_time=time.time() - self.start_time if self.query.strip() else 0.0,
+            stages={stage: round(ms, 3) for stage, ms in stages.items()} if self.debug else None
         )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
-@app.get("/api/papers")
-def get_all_papers(db: Session = Depends(get_db)):
-    """Get all research papers"""
-    papers = crud.get_all_research_papers(db)
-    return papers
+def search_papers(search: SearchRequest = Depends(), db: Session = Depends(get_db)):
+    """Search papers using hybrid search, optionally filtered by category, project and publication date"""
+    with metrics.stage_breakdown() as stages, metrics.span("search"):
+        results = search.cached()
+        if results is None:
+            try:
+                # Rank candidate ids from the indexes, then load just those rows
+                ranked = utils.hybrid_search(search.query, db, search.top_k, **search.options)
+                results = utils.build_search_results(db, search.query, ranked)
+            except Exception as e:
+                metrics.searches.inc(outcome="error")
+                raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+            search.store(results)
+    return search.response(results, stages)
+
+async def search_papers_async(search: SearchRequest = Depends(), db: AsyncSession = Depends(get_async_db)):
+    """search_papers on the async engine"""
+    with metrics.stage_breakdown() as stages, metrics.span("search"):
+        results = await run_in_threadpool(search.cached)  # may take the index writer locks
+        if results is None:
+            try:
+                ranked = await utils.hybrid_search_async(search.query, db, search.top_k, **search.options)
+                results = await utils.build_search_results_async(db, search.query, ranked)
+            except Exception as e:
+                metrics.searches.inc(outcome="error")
+                raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+            search.store(results)
+    return search.response(results, stages)
+
+def paper_list_fields(fields: Optional[str] = None) -> List[str]:
+    """Columns selected by /api/papers: comma-separated names, defaulting to a summary projection"""
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else list(crud.PAPER_SUMMARY_FIELDS)
+    unknown = [field for field in selected if field not in crud.PAPER_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in selected:
+        selected.insert(0, "id")  # needed for the cursor
+    return selected
+
+def paper_page(items: List[dict], limit: int) -> schemas.PaperPage:
+    # One extra row was fetched to learn whether another page exists
+    next_cursor = items[limit - 1]["id"] if len(items) > limit else None
+    return schemas.PaperPage(items=items[:limit], next_cursor=next_cursor)
+
+def get_all_papers(
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[int] = None,  # id of the last paper on the previous page
+    selected: List[str] = Depends(paper_list_fields),
+    category: Optional[str] = None,
+    project_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """List research papers one keyset page at a time"""
+    items = crud.list_research_papers(db, selected, limit + 1, after=after, category=category, project_id=project_id)
+    return paper_page(items, limit)
+
+async def get_all_papers_async(
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[int] = None,
+    selected: List[str] = Depends(paper_list_fields),
+    category: Optional[str] = None,
+    project_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """get_all_papers on the async engine"""
+    items = await crud.list_research_papers_async(db, selected, limit + 1, after=after, category=category, project_id=project_id)
+    return paper_page(items, limit)
+
+# The read-heavy endpoints run on the async engine, so waiting on Postgres holds neither a
+# threadpool thread nor (between statements) a pooled connection. DB_ASYNC_READS=false
+# serves them from the sync engine instead, e.g. to compare the two under load.
+for path, sync_endpoint, async_endpoint, response_model in (
+    ("/api/projects", get_projects, get_projects_async, List[schemas.Project]),
+    ("/api/search", search_papers, search_papers_async, None),
+    ("/api/papers", get_all_papers, get_all_papers_async, schemas.PaperPage),
+):
+    app.add_api_route(path, async_endpoint if DB_ASYNC_READS else sync_endpoint, methods=["GET"], response_model=response_model)
+
+@app.get("/api/papers/facets", response_model=schemas.PaperFacets)
+def get_paper_facets(db: Session = Depends(get_db)):
+    """Category and project counts for filter dropdowns"""
+    categories, projects = crud.get_paper_facets(db)
+    return schemas.PaperFacets(
+        categories=[schemas.CategoryFacet(value=value, count=count) for value, count in categories],
+        projects=[schemas.ProjectFacet(id=project_id, name=name, count=count) for project_id, name, count in projects]
+    )
 
 @app.get("/api/papers/{paper_id}")
 def get_paper(paper_id: int, db: Session = Depends(get_db)):
@@ -295,9 +505,16 @@ def delete_paper(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to delete papers")
     
-    success = crud.delete_research_paper(db, paper_id)
-    if not success:
+    paper = crud.get_research_paper(db, paper_id)
+    if not paper:
         raise HTTPException(status_code=404, detail="Paper not found")
+
+    utils.remove_paper_from_index(db, paper.id)
+    utils.keyword_index.remove_document(
+        paper.id, utils.paper_keyword_text(paper.title, paper.abstract, paper.content)
+    )
+    crud.delete_research_paper(db, paper_id)
+    search_cache.bump_index_generation()
     return {"message": "Paper deleted successfully"}
 
 @app.get("/api/download/{paper_id}")
@@ -333,4 +550,6 @@ def read_root():
 @app.get("/api/documents/search")
 def search_documents(query: str, top_k: int = 10, db: Session = Depends(get_db)):
     """Alternative search endpoint for compatibility"""
-    return search_papers(query, top_k, db)
\ No newline at end of file
+    # Called directly, so Query(...) defaults must be overridden with plain values
+    search = SearchRequest(query=query, top_k=top_k, semantic_weight=None, candidates=None)
+    return search_papers(search, db=db)
\ No newline at end of file
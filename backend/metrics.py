@@ -0,0 +1,177 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# In-process counters, gauges and histograms rendered in the Prometheus text format at
+# /metrics. Kept free of app imports (pdf_extract's process-pool workers import it); values
+# are per process, so scrape each uvicorn worker or aggregate with sum() in queries.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(_Metric):
+    """Monotonic count, optionally split by labels"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Current value read from ``source`` at scrape time; a None reading is omitted"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, source: Callable[[], Optional[float]]):
+        super().__init__(name, documentation)
+        self.source = source
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.source()
+        except Exception as e:
+            print(f"Metric {self.name} unavailable: {e}")
+            return []
+        return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, optionally split by labels"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', repr(bound)),))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+_registry: List[_Metric] = []
+
+stage_seconds = Histogram("research_stage_seconds", "Time spent per pipeline stage (search, embedding, extraction, indexing)")
+cache_lookups = Counter("research_cache_lookups_total", "Cache lookups by cache and result (hit / miss)")
+embedding_texts = Counter("research_embedding_texts_total", "Texts sent to the embeddings API")
+embedding_requests = Counter("research_embedding_requests_total", "Embeddings API requests by outcome (HTTP status or error)")
+embedding_retries = Counter("research_embedding_retries_total", "Embeddings API requests retried after a transient failure")
+chunks_embedded = Counter("research_chunks_embedded_total", "Paper chunks embedded and stored")
+chunks_indexed = Counter("research_chunks_indexed_total", "Paper chunks added to the FAISS index")
+pdf_pages = Counter("research_pdf_pages_extracted_total", "PDF pages extracted to text")
+searches = Counter("research_searches_total", "Search requests by outcome (cached, computed, error)")
+
+# Stage timings of the current request, when a caller asked for a breakdown
+_breakdown: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("stage_breakdown", default=None)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block into research_stage_seconds{stage=...} and the request's breakdown"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, stage=stage)
+        breakdown = _breakdown.get()
+        if breakdown is not None:
+            breakdown[stage] = breakdown.get(stage, 0.0) + elapsed * 1000
+
+
+@contextmanager
+def stage_breakdown() -> Iterator[Dict[str, float]]:
+    """Collect milliseconds per stage for spans entered in this context (same thread)"""
+    breakdown: Dict[str, float] = {}
+    token = _breakdown.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        _breakdown.reset(token)
+
+
+def record_cache(cache: str, hits: int, misses: int):
+    if hits:
+        cache_lookups.inc(hits, cache=cache, result="hit")
+    if misses:
+        cache_lookups.inc(misses, cache=cache, result="miss")
+
+
+def gauge(name: str, documentation: str) -> Callable[[Callable[[], Optional[float]]], Callable[[], Optional[float]]]:
+    """Decorator registering a function as a gauge's source"""
+    def register(source):
+        Gauge(name, documentation, source)
+        return source
+    return register
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
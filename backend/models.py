@@ -1,6 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, ARRAY, JSON
+from sqlalchemy import Column, Integer, BigInteger, Float, String, DateTime, Text, Boolean, ForeignKey, ARRAY, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql import func
 import datetime
 
 Base = declarative_base()
@@ -42,8 +41,43 @@ class ResearchPaper(Base):
     keywords = Column(ARRAY(String))
     category = Column(String)  # clinical, research_fundamental, etc.
     content = Column(Text)  # Full text content
-    chunks = Column(JSON)  # Store text chunks
-    embeddings = Column(JSON)  # Store embeddings
+    chunks = Column(JSON)  # Legacy; text chunks now live in paper_chunks
+    embeddings = Column(JSON)  # Legacy; chunk vectors now live in the binary vector store
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
     uploaded_by = Column(Integer, ForeignKey("users.id"))
-    uploaded_at = Column(DateTime, default=datetime.datetime.utcnow)
\ No newline at end of file
+    uploaded_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    # Search filters prefilter papers on these columns
+    __table_args__ = (
+        Index("ix_research_papers_category", "category"),
+        Index("ix_research_papers_project_id", "project_id"),
+        Index("ix_research_papers_publication_date", "publication_date"),
+    )
+
+class PaperChunk(Base):
+    __tablename__ = "paper_chunks"
+    __table_args__ = (Index("ix_paper_chunks_paper_ordinal", "paper_id", "ordinal"),)
+
+    id = Column(BigInteger, primary_key=True, index=True)  # also the FAISS vector id
+    paper_id = Column(Integer, ForeignKey("research_papers.id", ondelete="CASCADE"), nullable=False)
+    ordinal = Column(Integer, nullable=False)  # position of the chunk within the paper
+    char_start = Column(Integer)  # offsets into ResearchPaper.content
+    char_end = Column(Integer)
+    page_number = Column(Integer, nullable=True)
+    text = Column(Text)
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String, primary_key=True, index=True)  # uuid4 hex
+    filename = Column(String)
+    status = Column(String, default="queued", index=True)  # queued, running, completed, failed
+    stage = Column(String, default="extract")  # extract, chunk, embed, index, done
+    progress = Column(Float, default=0.0)
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    payload = Column(JSON)  # paper metadata submitted with the upload
+    paper_id = Column(Integer, ForeignKey("research_papers.id", ondelete="SET NULL"), nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
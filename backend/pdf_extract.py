@@ -0,0 +1,107 @@
+import os
+import bisect
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+import metrics
+
+# Kept free of app imports so process-pool workers start without loading indexes; PyMuPDF
+# (fitz) is imported where PDFs are opened, so importing this module stays cheap.
+
+# Pages are separated by a form feed in stored paper content, so page numbers can be
+# recovered from character offsets later (see page_numbers_for_offsets).
+PAGE_BREAK = "\f"
+
+
+def iter_pages(pdf_path: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (page_number, text) for pages [start, end), numbered from 1"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path)
+    try:
+        for index in range(start, doc.page_count if end is None else min(end, doc.page_count)):
+            yield index + 1, doc[index].get_text()
+    finally:
+        doc.close()
+
+
+def page_count(pdf_path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def _extract_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    return list(iter_pages(pdf_path, start, end))
+
+
+def _spawn_pool(workers: Optional[int]) -> ProcessPoolExecutor:
+    # spawn rather than fork: the parent may hold FAISS/OpenMP and DB pool threads
+    return ProcessPoolExecutor(max_workers=workers or None, mp_context=multiprocessing.get_context("spawn"))
+
+
+def stream_pages(pdf_path: str, workers: Optional[int] = None, pages_per_task: int = 128,
+                 parallel_min_pages: int = 500, max_pending: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (page_number, text) in page order. PDFs of at least ``parallel_min_pages`` pages are
+    extracted in page ranges across a process pool (smaller ones don't repay process start-up);
+    at most ``max_pending`` ranges are in flight, which bounds memory use."""
+    total = page_count(pdf_path)
+    if total < parallel_min_pages or workers == 1:
+        yield from iter_pages(pdf_path)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    ranges = deque((start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task))
+    with _spawn_pool(workers) as pool:
+        pending = deque()
+        while ranges or pending:
+            while ranges and len(pending) < max_pending:
+                pending.append(pool.submit(_extract_range, pdf_path, *ranges.popleft()))
+            yield from pending.popleft().result()
+
+
+def join_pages(pages: Iterator[Tuple[int, str]]) -> str:
+    """Concatenate page texts (each newline-terminated) separated by PAGE_BREAK"""
+    return PAGE_BREAK.join(text + "\n" for _, text in pages)
+
+
+def page_numbers_for_offsets(text: str, offsets: List[int]) -> List[int]:
+    """Page number containing each character offset (text without page breaks is one page)"""
+    breaks = []
+    pos = text.find(PAGE_BREAK)
+    while pos != -1:
+        breaks.append(pos)
+        pos = text.find(PAGE_BREAK, pos + 1)
+    return [bisect.bisect_right(breaks, offset) + 1 for offset in offsets]
+
+
+def pdf_to_text(pdf_path: str, workers: Optional[int] = 1, pages_per_task: int = 128,
+                parallel_min_pages: int = 500) -> str:
+    """Extract text from PDF"""
+    try:
+        with metrics.span("pdf_extract"):
+            text = join_pages(stream_pages(pdf_path, workers=workers, pages_per_task=pages_per_task,
+                                           parallel_min_pages=parallel_min_pages))
+        metrics.pdf_pages.inc(text.count(PAGE_BREAK) + 1)
+        return text
+    except Exception as e:
+        print(f"Error reading PDF: {e}")
+        raise
+
+
+def _extract_one(pdf_path: str) -> Tuple[str, Optional[str], Optional[str]]:
+    try:
+        return pdf_path, pdf_to_text(pdf_path), None
+    except Exception as e:
+        return pdf_path, None, str(e)
+
+
+def extract_texts(pdf_paths: List[str], workers: Optional[int] = None) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """Extract many PDFs across a process pool, yielding (path, text, error) in input order"""
+    if not pdf_paths:
+        return
+    with _spawn_pool(workers) as pool:
+        yield from pool.map(_extract_one, pdf_paths, chunksize=4)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
 # Authentication Schemas
@@ -70,6 +70,40 @@ class ResearchPaper(ResearchPaperBase):
     class Config:
         from_attributes = True
 
+# Paper Listing Schemas
+class PaperPage(BaseModel):
+    items: List[Dict[str, Any]]  # selected fields of each paper
+    next_cursor: Optional[int] = None  # pass as ``after`` to fetch the next page
+
+class CategoryFacet(BaseModel):
+    value: str
+    count: int
+
+class ProjectFacet(BaseModel):
+    id: int
+    name: str
+    count: int
+
+class PaperFacets(BaseModel):
+    categories: List[CategoryFacet]
+    projects: List[ProjectFacet]
+
+# Ingest Job Schemas
+class IngestJob(BaseModel):
+    id: str
+    filename: str
+    status: str  # queued, running, completed, failed
+    stage: str  # extract, chunk, embed, index, done
+    progress: float
+    attempts: int
+    error: Optional[str] = None
+    paper_id: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Search Schemas
 class SearchResult(BaseModel):
     id: int
@@ -80,8 +114,10 @@ class SearchResult(BaseModel):
     publication_date: Optional[datetime]
     category: Optional[str]
     snippet: str
+    highlights: List[Tuple[int, int]] = []  # (start, end) offsets of query terms in snippet
     similarity_score: float
     filename: str
+    page_number: Optional[int] = None  # page of the matched chunk, for deep links
     project_name: Optional[str] = None
     project_status: Optional[str] = None 
 
@@ -89,4 +125,5 @@ class SearchResponse(BaseModel):
     query: str
     results: List[SearchResult]
     total_count: int
-    search_time: float
\ No newline at end of file
+    search_time: float
+    stages: Optional[Dict[str, float]] = None  # milliseconds per stage, when requested with debug=true
\ No newline at end of file
@@ -0,0 +1,77 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from config import (
+    QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL, SEARCH_RESULT_CACHE_SIZE, SEARCH_RESULT_CACHE_TTL
+)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+# Query text -> embedding, so repeated queries skip the embeddings API
+query_embeddings = TTLCache(QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL)
+
+# (generation, normalised query, params) -> formatted results. Any change to the indexes
+# bumps the generation, so entries written before it can no longer be looked up.
+search_results = TTLCache(SEARCH_RESULT_CACHE_SIZE, SEARCH_RESULT_CACHE_TTL)
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def index_generation() -> int:
+    return _generation
+
+
+def bump_index_generation():
+    """Invalidate cached search results after papers are indexed or removed"""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+    search_results.clear()
+
+
+def result_key(query: str, **params) -> tuple:
+    return (_generation, normalize_query(query), tuple(sorted(params.items())))
@@ -0,0 +1,70 @@
+import re
+from collections import Counter
+from typing import List, Tuple
+from keyword_index import tokenize
+from config import SNIPPET_WINDOW
+
+Span = Tuple[int, int]
+
+
+def term_pattern(query: str):
+    """Case-insensitive pattern matching words that start with a query term, or None"""
+    terms = sorted(set(tokenize(query)), key=len, reverse=True)
+    if not terms:
+        return None
+    return re.compile(r"\b(" + "|".join(map(re.escape, terms)) + r")[a-z0-9]*", re.IGNORECASE)
+
+
+def densest_window(matches: List[Tuple[int, int, str]], window: int) -> Tuple[int, int]:
+    """Indexes [first, last] of the run of matches within `window` characters covering the
+    most distinct terms (then the most matches), found in one two-pointer pass"""
+    counts: Counter = Counter()
+    best, best_score = (0, 0), (0, 0)
+    first = 0
+    for last, (_, end, term) in enumerate(matches):
+        counts[term] += 1
+        # A single match longer than the window still forms a run of its own
+        while first < last and end - matches[first][0] > window:
+            left_term = matches[first][2]
+            counts[left_term] -= 1
+            if not counts[left_term]:
+                del counts[left_term]
+            first += 1
+        score = (len(counts), last - first + 1)
+        if score > best_score:
+            best, best_score = (first, last), score
+    return best
+
+
+def build_snippet(text: str, query: str, window: int = SNIPPET_WINDOW) -> Tuple[str, List[Span]]:
+    """Snippet of about `window` characters around the densest cluster of query terms.
+
+    Returns (snippet, highlights) with highlights as (start, end) offsets into the snippet.
+    `text` is a matched chunk (bounded by the chunker), so the scan is too.
+    """
+    if not text:
+        return "", []
+    pattern = term_pattern(query or "")
+    matches = [(m.start(), m.end(), m.group(1).lower()) for m in pattern.finditer(text)] if pattern else []
+    if not matches:
+        return (text[:window] + "...", []) if len(text) > window else (text, [])
+
+    first, last = densest_window(matches, window)
+    # Centre the cluster in the window, then widen to whole words
+    cluster_start, cluster_end = matches[first][0], matches[last][1]
+    cluster_end = min(cluster_end, cluster_start + window)  # a match longer than the window is cut
+    start = max(0, cluster_start - (window - (cluster_end - cluster_start)) // 2)
+    end = min(len(text), start + window)
+    start = max(0, min(start, end - window))
+    if start > 0:
+        space = text.find(" ", start, cluster_start)
+        start = space + 1 if space != -1 else start
+    if end < len(text):
+        space = text.rfind(" ", cluster_end, end)
+        end = space if space != -1 else end
+
+    prefix = "..." if start > 0 else ""
+    snippet = prefix + text[start:end] + ("..." if end < len(text) else "")
+    offset = len(prefix) - start
+    highlights = [(max(s, start) + offset, min(e, end) + offset) for s, e, _ in matches if s < end and e > start]
+    return snippet, highlights
@@ -0,0 +1,77 @@
+import threading
+import time
+import types
+import numpy as np
+import pytest
+from benchmarks.stub_embeddings import StubEmbeddingServer, embed_text
+from embedding_client import EmbeddingClient, EmbeddingError
+
+DIMENSION = 8
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**options):
+        server = StubEmbeddingServer(dimension=DIMENSION, **options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_client(server, **options):
+    options = {"dimension": DIMENSION, "concurrency": 2, "batch_size": 4, "max_retries": 3, "backoff": 0.01, **options}
+    return EmbeddingClient(base_url=server.url, api_key="stub", **options)
+
+
+def texts(count):
+    return [f"triphala churna trial {i}" for i in range(count)]
+
+
+def test_embeds_in_input_order_across_batches(stub):
+    server = stub()
+    vectors = make_client(server).embed(texts(10))
+    assert server.requests == 3  # batches of 4, 4 and 2
+    assert np.allclose(vectors, [embed_text(text, DIMENSION) for text in texts(10)])
+
+
+def test_rate_limited_batches_are_retried(stub):
+    server = stub(error_rate=0.5)
+    vectors = make_client(server, concurrency=1, max_retries=8).embed(texts(20))
+    assert server.errors > 0
+    assert server.requests == 5 + server.errors
+    assert np.allclose(vectors, [embed_text(text, DIMENSION) for text in texts(20)])
+
+
+def test_failures_raise_instead_of_returning_zero_vectors(stub):
+    server = stub(error_rate=1.0)
+    with pytest.raises(EmbeddingError) as error:
+        make_client(server, max_retries=2).embed(texts(6))
+    assert error.value.failures == [(0, 4, error.value.failures[0][2]), (4, 6, error.value.failures[1][2])]
+    assert "429" in error.value.failures[0][2]
+    assert server.requests == 2 * 3  # each batch tried 1 + max_retries times
+
+
+def test_retry_after_header_sets_the_delay():
+    client = EmbeddingClient(base_url="http://127.0.0.1:9", api_key="stub", backoff=1.0)
+    assert client._retry_delay(0, types.SimpleNamespace(headers={"Retry-After": "0.25"})) == 0.25
+    assert 2.0 <= client._retry_delay(2, types.SimpleNamespace(headers={})) <= 4.0  # backoff * 2^2, jittered
+    assert 0.5 <= client._retry_delay(0, None) <= 1.0
+
+
+def test_query_does_not_wait_behind_bulk_batches(stub):
+    server = stub(latency=0.2)
+    client = make_client(server, concurrency=1, batch_size=1)
+    bulk = threading.Thread(target=client.embed, args=(texts(10),))  # ~2s of queued batches
+    bulk.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    client.embed(["ashwagandha"])
+    elapsed = time.perf_counter() - started
+    bulk.join()
+    assert elapsed < 1.0
@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+import index_manager
+from index_manager import FaissIndexManager, INDEX_TYPES
+
+DIMENSION = 16
+
+
+def make_manager(path, **options):
+    options = {"dimension": DIMENSION, "index_type": "flat", "metric": "l2", "reduction": "none", **options}
+    return FaissIndexManager(str(path), **options)
+
+
+def vectors_for(ids):
+    """Deterministic, well-separated vectors per id"""
+    return np.stack([np.random.default_rng(int(i)).standard_normal(DIMENSION) for i in ids]).astype("float32")
+
+
+def nearest(index, ids):
+    """Top hit of a self-query for each id"""
+    return index.search(vectors_for(ids), 1)[1][:, 0].tolist()
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return tmp_path / "faiss"
+
+
+def test_adds_and_removes_reach_other_processes(index_dir):
+    writer, reader = make_manager(index_dir), make_manager(index_dir)
+    writer.add_with_ids(vectors_for(range(100)), np.arange(100))
+    writer.add_with_ids(vectors_for(range(100, 150)), np.arange(100, 150))
+    assert reader.refresh()
+    assert reader.ntotal == 150
+    assert nearest(reader, [5, 120]) == [5, 120]
+
+    assert writer.remove_ids(np.arange(10)) == 10
+    assert reader.refresh()
+    assert reader.ntotal == 140
+    assert not set(reader.search(vectors_for(range(10)), 5)[1].ravel()) & set(range(10))
+    assert not reader.refresh()
+
+
+def test_compaction_is_picked_up_and_survives_reload(index_dir):
+    writer, reader = make_manager(index_dir), make_manager(index_dir)
+    writer.add_with_ids(vectors_for(range(200)), np.arange(200))
+    writer.compact()
+    writer.remove_ids(np.arange(20))  # tombstones against the new base
+    writer.add_with_ids(vectors_for(range(200, 220)), np.arange(200, 220))
+    writer.compact()
+    assert writer.generation == 2 and writer.delta_files == [] and writer.tombstones == set()
+
+    assert reader.refresh()
+    reloaded = make_manager(index_dir)
+    for index in (writer, reader, reloaded):
+        assert index.ntotal == 200
+        assert nearest(index, [20, 150, 219]) == [20, 150, 219]
+        assert not set(index.search(vectors_for(range(20)), 5)[1].ravel()) & set(range(20))
+
+
+def test_reload_replays_deltas_and_tombstones(index_dir):
+    writer = make_manager(index_dir)
+    writer.add_with_ids(vectors_for(range(50)), np.arange(50))
+    writer.compact()
+    writer.add_with_ids(vectors_for(range(50, 80)), np.arange(50, 80))
+    writer.remove_ids(np.array([3, 60]))  # one in the base, one in a delta
+
+    reloaded = make_manager(index_dir)
+    assert reloaded.ntotal == writer.ntotal == 78
+    assert nearest(reloaded, [4, 61]) == [4, 61]
+    assert not {3, 60} & set(reloaded.search(vectors_for([3, 60]), 5)[1].ravel())
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_search_after_delete_and_compaction(index_dir, monkeypatch, index_type):
+    monkeypatch.setattr(index_manager, "FAISS_TRAIN_MIN_VECTORS", 500)
+    monkeypatch.setattr(index_manager, "FAISS_NLIST", 8)
+    monkeypatch.setattr(index_manager, "FAISS_PQ_M", 2)  # keeps PQ training quick
+    index = make_manager(index_dir, index_type=index_type)
+    index.add_with_ids(vectors_for(range(1000)), np.arange(1000))
+    index.compact()
+    assert index.base_type == index_type
+
+    index.remove_ids(np.arange(1, 11))
+    index.compact()
+    assert index.ntotal == 990
+    for current in (index, make_manager(index_dir, index_type=index_type)):
+        hits = current.search(vectors_for([0, 11, 501, 999]), 1, nprobe=8, ef_search=256)[1][:, 0]
+        assert hits.tolist() == [0, 11, 501, 999]
+        assert not set(current.search(vectors_for(range(1, 11)), 5, nprobe=8)[1].ravel()) & set(range(1, 11))
+
+
+def test_filtered_search_with_no_stored_vectors(index_dir, monkeypatch):
+    monkeypatch.setattr(index_manager, "FAISS_TRAIN_MIN_VECTORS", 500)
+    index = make_manager(index_dir, index_type="hnsw")
+    index.add_with_ids(vectors_for(range(600)), np.arange(600))
+    index.compact()
+    index.vector_lookup = lambda ids: np.zeros((len(ids), DIMENSION), dtype="float32")
+    distances, ids = index.search(vectors_for([1, 2]), 3, allowed_ids=np.array([1, 2, 3]))
+    assert ids.tolist() == [[-1] * 3] * 2
+    assert np.isinf(distances).all()
+
+
+@pytest.mark.skipif(not hasattr(index_manager.faiss, "IO_FLAG_MMAP_IFC"), reason="needs faiss >= 1.11")
+def test_base_is_mapped_rather_than_copied_into_each_process(index_dir):
+    import os
+    import subprocess
+    import sys
+
+    if not os.path.exists("/proc/self/status"):
+        pytest.skip("reads RssAnon from /proc")
+    writer = make_manager(index_dir, dimension=256)
+    rng = np.random.default_rng(0)
+    for start in range(0, 100_000, 20_000):
+        writer.add_with_ids(rng.standard_normal((20_000, 256)).astype("float32"), np.arange(start, start + 20_000))
+    writer.compact()
+    base_mb = os.path.getsize(index_dir / writer.base_file) / 2 ** 20
+
+    # A fresh process, so heap freed by the writer above cannot hide a copy
+    script = f"""
+import numpy as np
+from index_manager import FaissIndexManager
+def anon_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("RssAnon")) / 1024
+before = anon_mb()
+index = FaissIndexManager({str(index_dir)!r}, dimension=256, index_type="flat", metric="l2", reduction="none")
+index.search(np.ones((1, 256), dtype="float32"), 5)
+print(anon_mb() - before)
+"""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", script], cwd=backend, capture_output=True, text=True, check=True)
+    growth_mb = float(output.stdout.strip().splitlines()[-1])
+    assert base_mb > 90
+    assert growth_mb < base_mb / 4
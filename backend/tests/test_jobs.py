@@ -0,0 +1,84 @@
+import types
+import pytest
+import crud
+import jobs
+import utils
+
+
+def test_rechunk_drops_old_vectors_first(monkeypatch):
+    calls = []
+    paper = types.SimpleNamespace(id=7, content="Triphala churna.")
+    monkeypatch.setattr(crud, "get_research_paper", lambda db, paper_id: paper)
+    monkeypatch.setattr(utils, "remove_paper_from_index", lambda db, paper_id: calls.append(("remove", paper_id)) or 0)
+    monkeypatch.setattr(utils, "chunk_paper", lambda db, paper_id, text: calls.append(("chunk", paper_id)) or [])
+
+    jobs._chunk(None, types.SimpleNamespace(paper_id=7), progress=None)
+
+    assert calls == [("remove", 7), ("chunk", 7)]
+
+
+def test_index_stage_can_rerun_without_masking_its_vectors(tmp_path, monkeypatch):
+    import numpy as np
+    from index_manager import FaissIndexManager
+    from vector_store import VectorStore
+
+    def make_index():
+        return FaissIndexManager(str(tmp_path / "faiss"), dimension=8, index_type="flat", metric="l2", reduction="none")
+
+    store = VectorStore(str(tmp_path / "vectors"), dimension=8)
+    vectors = np.random.default_rng(0).standard_normal((5, 8)).astype("float32")
+    store.add(np.arange(5), vectors)
+    monkeypatch.setattr(utils, "vector_store", store)
+    monkeypatch.setattr(utils, "faiss_index", make_index())
+    monkeypatch.setattr(crud, "get_paper_chunk_ids", lambda db, paper_id: list(range(5)))
+
+    assert utils.index_paper_chunks(None, 7) == 5
+    assert utils.index_paper_chunks(None, 7) == 0  # retried stage
+
+    reloaded = make_index()  # another worker, or this one after a restart
+    assert reloaded.ntotal == 5
+    assert reloaded.search(vectors, 1)[1][:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+class RecordingSession:
+    """Stand-in session that assigns ids on flush and snapshots the job at each commit"""
+
+    def __init__(self, job):
+        self.job, self.added, self.commits = job, [], []
+
+    def add(self, row):
+        self.added.append(row)
+
+    def flush(self):
+        for row in self.added:
+            row.id = row.id or len(self.added)
+
+    def commit(self):
+        self.flush()
+        self.commits.append((len(self.added), self.job.paper_id))
+
+    def refresh(self, row):
+        pass
+
+
+def test_extract_retry_reuses_the_paper(monkeypatch):
+    job = types.SimpleNamespace(paper_id=None, filename="paper.pdf", payload={"title": "Triphala"}, created_by=1)
+    db = RecordingSession(job)
+    monkeypatch.setattr(jobs.pdf_extract, "pdf_to_text", lambda path, **options: "Triphala churna.")
+    monkeypatch.setattr(crud, "get_research_paper", lambda session, paper_id: db.added[paper_id - 1])
+    indexed = []
+
+    def add_document(doc_id, text):
+        indexed.append(doc_id)
+        if len(indexed) == 1:
+            raise OSError("keyword index unavailable")
+
+    monkeypatch.setattr(utils.keyword_index, "add_document", add_document)
+
+    with pytest.raises(OSError):
+        jobs._extract(db, job, progress=None)
+    assert db.commits == [(1, 1)]  # the paper and job.paper_id committed together
+
+    jobs._extract(db, job, progress=None)  # retried stage
+    assert len(db.added) == 1
+    assert indexed == [1, 1]
@@ -0,0 +1,21 @@
+import json
+from keyword_index import KeywordIndex, LOG_NAME, tokenize
+
+
+def test_remove_is_replayed_from_logged_terms(tmp_path):
+    writer = KeywordIndex(str(tmp_path))
+    reader = KeywordIndex(str(tmp_path))
+    writer.add_document(1, "ashwagandha rasayana trial")
+    writer.add_document(2, "statin trial")
+    assert reader.refresh()
+
+    writer.remove_document(1)
+    with open(tmp_path / LOG_NAME) as f:
+        remove = [json.loads(line) for line in f][-1]
+    assert remove["op"] == "remove"
+    assert sorted(remove["terms"]) == sorted(set(tokenize("ashwagandha rasayana trial")))
+
+    assert reader.refresh()
+    assert reader.postings == writer.postings
+    assert reader.doc_lengths == {2: writer.doc_lengths[2]}
+    assert [doc_id for doc_id, _ in reader.search("trial")] == [2]
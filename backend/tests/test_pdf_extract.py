@@ -0,0 +1,11 @@
+from pdf_extract import PAGE_BREAK, page_numbers_for_offsets
+
+
+def test_page_numbers_for_offsets():
+    text = PAGE_BREAK.join(["first page\n", "second page\n", "third page\n"])
+    offsets = [0, text.index("second"), text.index("third"), len(text) - 1]
+    assert page_numbers_for_offsets(text, offsets) == [1, 2, 3, 3]
+
+
+def test_single_page_text_is_page_one():
+    assert page_numbers_for_offsets("one page only\n", [0, 5]) == [1, 1]
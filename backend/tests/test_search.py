@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+import main
+import utils
+import search_cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    def hybrid_search(query, db, top_k, **options):
+        calls.append({"query": query, "top_k": top_k, **options})
+        return []
+
+    async def hybrid_search_async(query, db, top_k, **options):
+        return hybrid_search(query, db, top_k, **options)
+
+    async def build_search_results_async(db, query, ranked):
+        return []
+
+    monkeypatch.setattr(utils, "hybrid_search", hybrid_search)
+    monkeypatch.setattr(utils, "hybrid_search_async", hybrid_search_async)
+    monkeypatch.setattr(utils, "build_search_results", lambda db, query, ranked: [])
+    monkeypatch.setattr(utils, "build_search_results_async", build_search_results_async)
+    main.app.dependency_overrides[main.get_db] = lambda: None
+    main.app.dependency_overrides[main.get_async_db] = lambda: None
+    search_cache.search_results.clear()
+    yield TestClient(main.app), calls
+    main.app.dependency_overrides.clear()
+
+
+def test_documents_search(client):
+    client, calls = client
+    response = client.get("/api/documents/search", params={"query": "ashwagandha dosage", "top_k": 5})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["query"] == "ashwagandha dosage"
+    assert body["results"] == []
+    assert calls[0]["query"] == "ashwagandha dosage"
+    assert calls[0]["top_k"] == 5
+    assert calls[0]["semantic_weight"] is None
+    assert calls[0]["candidates"] is None
+
+
+def test_cached_results_follow_other_workers_changes(client, monkeypatch):
+    client, calls = client
+    client.get("/api/search", params={"query": "statin"})
+    client.get("/api/search", params={"query": "statin"})
+    assert len(calls) == 1
+
+    # Another worker changed the index: the refresh before the lookup bumps the generation
+    monkeypatch.setattr(utils, "refresh_indexes", search_cache.bump_index_generation)
+    client.get("/api/search", params={"query": "statin"})
+    assert len(calls) == 2
@@ -0,0 +1,16 @@
+from snippets import build_snippet
+
+
+def test_snippet_centres_the_densest_cluster():
+    text = "Background on statins. " + "filler words here. " * 40 + "Statin therapy lowered cholesterol in the statin group."
+    snippet, highlights = build_snippet(text, "statin cholesterol", window=80)
+    assert "cholesterol" in snippet
+    assert [snippet[s:e].lower() for s, e in highlights] == ["statin", "cholesterol", "statin"]
+
+
+def test_match_longer_than_the_window():
+    snippet, highlights = build_snippet("intro " + "acgt" * 100 + " end", "acgt", window=300)
+    assert snippet.startswith("...acgt")
+    assert len(highlights) == 1
+    start, end = highlights[0]
+    assert snippet[start:end] == "acgt" * 75
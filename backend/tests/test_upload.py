@@ -0,0 +1,53 @@
+import os
+import types
+import pytest
+from fastapi.testclient import TestClient
+import main
+import crud
+import jobs
+from config import STORAGE_PATH
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    queued = []
+
+    def create_ingest_jobs(db, items, user_id):
+        queued.extend(name for name, _ in items)
+        return [f"job-{i}" for i in range(len(items))]
+
+    def create_ingest_job(db, filename, payload, user_id):
+        queued.append(filename)
+        return types.SimpleNamespace(id=f"job-{len(queued)}", status="queued")
+
+    monkeypatch.setattr(crud, "create_ingest_jobs", create_ingest_jobs)
+    monkeypatch.setattr(crud, "create_ingest_job", create_ingest_job)
+    monkeypatch.setattr(jobs, "submit_job", lambda job_id: None)
+    monkeypatch.setattr(jobs, "submit_bulk", lambda job_ids: None)
+    main.app.dependency_overrides[main.get_db] = lambda: None
+    main.app.dependency_overrides[main.get_current_user] = lambda: types.SimpleNamespace(id=1, is_admin=True)
+    yield queued
+    main.app.dependency_overrides.clear()
+
+
+def test_bulk_upload_keeps_same_named_pdfs_apart(queued):
+    client = TestClient(main.app)
+    for content in (b"%PDF-first", b"%PDF-second"):
+        response = client.post("/api/upload/bulk", files=[("files", ("paper.pdf", content, "application/pdf"))])
+        assert response.status_code == 200
+
+    assert len(set(queued)) == 2
+    stored = [open(os.path.join(STORAGE_PATH, name), "rb").read() for name in queued]
+    assert stored == [b"%PDF-first", b"%PDF-second"]
+
+
+def test_upload_keeps_same_named_pdfs_apart(queued):
+    client = TestClient(main.app)
+    form = {"title": "Rasayana", "authors": "[]", "category": "ayurveda"}
+    for content in (b"%PDF-first", b"%PDF-second"):
+        response = client.post("/api/upload", data=form, files={"file": ("single.pdf", content, "application/pdf")})
+        assert response.status_code == 200
+
+    assert len(set(queued)) == 2
+    stored = [open(os.path.join(STORAGE_PATH, name), "rb").read() for name in queued]
+    assert stored == [b"%PDF-first", b"%PDF-second"]
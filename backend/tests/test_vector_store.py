@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from vector_store import VectorStore
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_add_compact_and_rekey_keep_lookups(tmp_path, dtype):
+    rng = np.random.default_rng(0)
+    store = VectorStore(str(tmp_path), dimension=8, dtype=dtype)
+    vectors = rng.standard_normal((30, 8)).astype("float32")
+    for start in (20, 0, 10):  # segments arrive out of id order
+        store.add(np.arange(start, start + 10)[::-1], vectors[start:start + 10][::-1])
+    assert np.array_equal(store._ids[store._order], np.sort(store._ids))
+    expected = store.get(np.arange(30))
+
+    store.remove([3, 17])
+    store.compact()
+    assert store.segments and len(store.segments) == 1
+    assert len(store) == 28
+    assert not store.get([3, 17]).any()
+    keep = [i for i in range(30) if i not in (3, 17)]
+    assert np.array_equal(store.get(keep), expected[keep])
+
+    store.rekey([0, 29], [100, 129])
+    assert np.array_equal(store.get([100, 129]), expected[[0, 29]])
+    assert 0 not in store and 100 in store
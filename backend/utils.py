@@ -1,127 +1,135 @@
 import os
-import fitz  # PyMuPDF
-import faiss
+import asyncio
 import numpy as np
-import pickle
 import re
-import requests
-import json
-from typing import List, Dict, Any, Optional
-from config import STORAGE_PATH, FAISS_INDEX_PATH, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, OPENROUTER_API_KEY, OPENROUTER_BASE_URL, EMBEDDING_DIMENSION
-
-# Load or initialize FAISS index
-def initialize_faiss_index(dimension: int = EMBEDDING_DIMENSION):
-    """Initialize or load FAISS index with proper dimension"""
-    if os.path.exists(FAISS_INDEX_PATH):
-        try:
-            with open(FAISS_INDEX_PATH, "rb") as f:
-                index = pickle.load(f)
-            # Verify dimension matches
-            if index.d == dimension:
-                return index
-            else:
-                print(f"Dimension mismatch: expected {dimension}, got {index.d}. Creating new index.")
-        except Exception as e:
-            print(f"Error loading FAISS index: {e}. Creating new index.")
-    
-    # Create new index
-    index = faiss.IndexFlatL2(dimension)
-    print(f"Created new FAISS index with dimension {dimension}")
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
+import crud
+import schemas
+from pdf_extract import page_numbers_for_offsets
+from embedding_client import EmbeddingClient
+from embedding_cache import EmbeddingCache
+import search_cache
+import metrics
+import fusion
+import snippets
+from warmup import Lazy
+from chunker import chunk_document
+from config import (
+    FUSION_METHOD, FUSION_RRF_K, FUSION_SEMANTIC_WEIGHT, FUSION_CANDIDATE_FACTOR, CHUNK_AGGREGATION
+)
+
+# FAISS ids are paper_chunks primary keys. Before the chunk table existed they were
+# paper_id * LEGACY_CHUNK_ID_STRIDE + chunk_index; see migrate_json_chunks.
+LEGACY_CHUNK_ID_STRIDE = 10000
+
+# Indexes and caches are loaded on first use, or ahead of time by main's warm-up, so
+# importing this module stays fast. faiss itself is only imported when the index loads.
+def _load_faiss_index():
+    from index_manager import FaissIndexManager
+
+    index = FaissIndexManager()
+    index.vector_source = load_indexed_vectors
+    index.vector_lookup = vector_store.get
+    # Another worker indexing or removing papers invalidates this worker's cached results too
+    index.on_change = search_cache.bump_index_generation
     return index
 
-# Initialize FAISS index
-faiss_index = initialize_faiss_index()
+def _load_keyword_index():
+    from keyword_index import KeywordIndex
 
-def pdf_to_text(pdf_path: str) -> str:
-    """Extract text from PDF"""
-    text = ""
-    try:
-        doc = fitz.open(pdf_path)
-        for page in doc:
-            text += page.get_text() + "\n"
-        doc.close()
-    except Exception as e:
-        print(f"Error reading PDF: {e}")
-        raise
-    return text
+    index = KeywordIndex()
+    index.on_change = search_cache.bump_index_generation
+    return index
 
-def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
-    """Split text into overlapping chunks"""
-    if not text or len(text.strip()) == 0:
-        return []
-        
-    chunks = []
-    start = 0
-    text_length = len(text)
-    
-    while start < text_length:
-        end = min(start + size, text_length)
-        chunk = text[start:end].strip()
-        
-        if chunk:  # Only add non-empty chunks
-            chunks.append(chunk)
-            
-        start += size - overlap
-        
-        # Break if we're not making progress
-        if start >= text_length or (chunks and start <= chunks[-1].start):
-            break
-            
-    return chunks
+def _load_vector_store():
+    from vector_store import VectorStore
 
-def get_embeddings_openrouter(texts: List[str]) -> List[List[float]]:
-    """Get embeddings using OpenRouter API"""
-    if not OPENROUTER_API_KEY:
-        raise ValueError("OpenRouter API key not configured")
-    
+    return VectorStore()
+
+# Pooled embeddings API client and the on-disk cache checked before it
+embedding_client = EmbeddingClient()
+embedding_cache = Lazy("embedding_cache", EmbeddingCache)
+
+# FAISS index and the raw vector store it is rebuilt from
+faiss_index = Lazy("faiss_index", _load_faiss_index)
+vector_store = Lazy("vector_store", _load_vector_store)
+
+# BM25 keyword index
+keyword_index = Lazy("keyword_index", _load_keyword_index)
+
+def refresh_indexes():
+    """Apply other workers' index changes, bumping the result cache generation if there were any"""
+    # An index this worker has not loaded yet has no results cached against it
+    for index in (faiss_index, keyword_index):
+        if index.loaded:
+            index.refresh()
+
+# Index sizes for /metrics, reported once each index is loaded
+@metrics.gauge("research_faiss_index_vectors", "Vectors in the FAISS index")
+def _faiss_index_vectors():
+    return faiss_index.ntotal if faiss_index.loaded else None
+
+@metrics.gauge("research_vector_store_vectors", "Chunk vectors in the vector store")
+def _vector_store_vectors():
+    return len(vector_store) if vector_store.loaded else None
+
+@metrics.gauge("research_vector_store_bytes", "Size of the stored chunk vectors")
+def _vector_store_bytes():
+    return vector_store.nbytes if vector_store.loaded else None
+
+@metrics.gauge("research_keyword_index_documents", "Papers in the keyword index")
+def _keyword_index_documents():
+    return keyword_index.doc_count if keyword_index.loaded else None
+
+def paper_keyword_text(title: Optional[str], abstract: Optional[str], content: Optional[str]) -> str:
+    """Text indexed for keyword search"""
+    return f"{title or ''} {abstract or ''} {content or ''}"
+
+def legacy_vector_ids(paper_id: int, chunk_count: int) -> np.ndarray:
+    """Pre-chunk-table FAISS ids for the chunks of a paper"""
+    return np.arange(chunk_count, dtype="int64") + paper_id * LEGACY_CHUNK_ID_STRIDE
+
+def chunk_text(text: str) -> List[str]:
+    """Split text into overlapping chunks on paragraph/sentence boundaries"""
+    return [text[start:end] for start, end in chunk_spans(text)]
+
+def chunk_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) character offsets of token-sized chunks (see chunker.chunk_document)"""
+    return [(chunk.start, chunk.end) for chunk in chunk_document(text)]
+
+def get_embeddings_openrouter(texts: List[str], batch_size: Optional[int] = None,
+                              progress: Optional[Callable[[float], None]] = None) -> np.ndarray:
+    """Get embeddings using OpenRouter API (raises EmbeddingError instead of returning zero vectors)"""
     if not texts:
-        return []
-    
-    embeddings = []
-    
-    # Process in batches to avoid rate limits
-    batch_size = 10  # Adjust based on API limits
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        
-        try:
-            response = requests.post(
-                f"{OPENROUTER_BASE_URL}/embeddings",
-                headers={
-                    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": "http://localhost:3000",  # Required by OpenRouter
-                    "X-Title": "Research Repository"  # Required by OpenRouter
-                },
-                json={
-                    "model": EMBEDDING_MODEL,
-                    "input": batch
-                },
-                timeout=30  # 30 second timeout
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                batch_embeddings = [item['embedding'] for item in data['data']]
-                embeddings.extend(batch_embeddings)
-                print(f"Successfully processed batch {i//batch_size + 1}")
-            else:
-                print(f"OpenRouter API error: {response.status_code} - {response.text}")
-                # Fallback: return zero vectors
-                fallback_embedding = [0.0] * EMBEDDING_DIMENSION
-                embeddings.extend([fallback_embedding] * len(batch))
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Request error: {e}")
-            # Fallback: return zero vectors
-            fallback_embedding = [0.0] * EMBEDDING_DIMENSION
-            embeddings.extend([fallback_embedding] * len(batch))
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-            fallback_embedding = [0.0] * EMBEDDING_DIMENSION
-            embeddings.extend([fallback_embedding] * len(batch))
-    
-    return embeddings
+        return np.zeros((0, embedding_client.dimension), dtype="float32")
+    cached = embedding_cache.get_many(texts)
+    if embedding_cache.enabled:
+        metrics.record_cache("embeddings", hits=len(cached), misses=len(texts) - len(cached))
+    if len(cached) == len(texts):
+        return np.array([cached[i] for i in range(len(texts))], dtype="float32")
+
+    # Embed each distinct uncached text once
+    missing = list(dict.fromkeys(text for i, text in enumerate(texts) if i not in cached))
+    fresh = embedding_client.embed(missing, batch_size=batch_size, progress=progress)
+    embedding_cache.put_many(missing, fresh)
+
+    rows = dict(zip(missing, fresh))
+    return np.array([cached[i] if i in cached else rows[text] for i, text in enumerate(texts)], dtype="float32")
+
+def paper_create_from_text(filename: str, text: str, metadata: Dict[str, Any]) -> "schemas.ResearchPaperCreate":
+    """Build a paper record from upload metadata, filling blanks from the extracted text"""
+    fields = dict(metadata)
+    if not fields.get("title"):
+        extracted = extract_paper_metadata(text)
+        fields["title"] = extracted["title"] or os.path.splitext(os.path.basename(filename))[0]
+        for key in ("authors", "abstract", "journal", "keywords"):
+            fields[key] = fields.get(key) or extracted[key]
+        if not fields.get("publication_date") and extracted["publication_date"]:
+            fields["publication_date"] = f"{extracted['publication_date']}-01-01T00:00:00"
+    return schemas.ResearchPaperCreate(filename=filename, content=text, **fields)
 
 def extract_paper_metadata(text: str) -> Dict[str, Any]:
     """Extract metadata from research paper text with improved accuracy"""
@@ -234,69 +242,174 @@ def extract_paper_metadata(text: str) -> Dict[str, Any]:
     
     return metadata
 
-def add_paper_to_index(text: str, paper_id: int) -> tuple:
-    """Add paper text to FAISS index"""
+def chunk_paper(db: Session, paper_id: int, text: str) -> List[int]:
+    """Split a paper into chunks stored in paper_chunks, replacing any previous chunks"""
+    crud.delete_paper_chunks(db, paper_id)
+    spans = chunk_spans(text)
+    page_numbers = page_numbers_for_offsets(text, [start for start, _ in spans])
+    chunk_ids = crud.create_paper_chunks(db, paper_id, spans, [text[start:end] for start, end in spans], page_numbers)
+    print(f"Created {len(chunk_ids)} chunks for paper {paper_id}")
+    return chunk_ids
+
+def embed_paper_chunks(db: Session, paper_id: int, progress: Optional[Callable[[float], None]] = None) -> int:
+    """Embed a paper's chunks that have no stored vector yet and add them to the vector store"""
+    chunks = [chunk for chunk in crud.get_paper_chunks(db, paper_id) if chunk.id not in vector_store]
+    if not chunks:
+        return 0
+
+    embedding_array = get_embeddings_openrouter([chunk.text for chunk in chunks], progress=progress)
+    vector_store.add(np.array([chunk.id for chunk in chunks], dtype="int64"), embedding_array)
+    metrics.chunks_embedded.inc(len(chunks))
+    return len(chunks)
+
+def index_paper_chunks(db: Session, paper_id: int) -> int:
+    """Add a paper's stored chunk vectors to the FAISS index (idempotent)"""
+    ids = np.array(crud.get_paper_chunk_ids(db, paper_id), dtype="int64")
+    # Skip chunks an earlier attempt already indexed; removing and re-adding them would
+    # leave them masked by their own tombstones once the index is reloaded
+    ids = ids[~faiss_index.contains(ids)]
+    if len(ids) == 0:
+        return 0
+    vectors = vector_store.get(ids)
+    faiss_index.add_with_ids(vectors, ids)
+    search_cache.bump_index_generation()
+    metrics.chunks_indexed.inc(len(ids))
+    print(f"Successfully added paper {paper_id} to FAISS index with {len(ids)} chunks")
+    return len(ids)
+
+def load_indexed_vectors() -> tuple:
+    """Load (vectors, ids) for every stored chunk vector"""
+    return vector_store.load_all()
+
+def migrate_json_embeddings() -> int:
+    """Move embeddings still held in the legacy JSON column into the vector store"""
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
     try:
-        chunks = chunk_text(text)
-        print(f"Created {len(chunks)} chunks for paper {paper_id}")
-        
-        if not chunks:
-            return [], []
-        
-        embeddings = get_embeddings_openrouter(chunks)
-        
-        if embeddings and len(embeddings) == len(chunks):
-            # Convert to numpy array
-            embedding_array = np.array(embeddings).astype("float32")
-            
-            # Verify dimension
-            if embedding_array.shape[1] != faiss_index.d:
-                print(f"Embedding dimension mismatch: expected {faiss_index.d}, got {embedding_array.shape[1]}")
-                return chunks, []
-            
-            # Create IDs: paper_id * 10000 + chunk_index (allows up to 10k chunks per paper)
-            ids = np.array([paper_id * 10000 + i for i in range(len(chunks))])
-            
-            # Add to FAISS index
-            faiss_index.add_with_ids(embedding_array, ids)
-            
-            # Save updated index
-            os.makedirs(os.path.dirname(FAISS_INDEX_PATH), exist_ok=True)
-            with open(FAISS_INDEX_PATH, "wb") as f:
-                pickle.dump(faiss_index, f)
-            
-            print(f"Successfully added paper {paper_id} to FAISS index with {len(chunks)} chunks")
-            return chunks, embeddings
-        else:
-            print(f"Failed to get embeddings for paper {paper_id}")
-            return chunks, []
-            
+        paper_ids = [
+            row[0] for row in
+            db.query(models.ResearchPaper.id).filter(models.ResearchPaper.embeddings.isnot(None)).all()
+        ]
+        migrated = 0
+        for paper_id in paper_ids:
+            paper = db.query(models.ResearchPaper).filter(models.ResearchPaper.id == paper_id).first()
+            if paper.embeddings:
+                ids = legacy_vector_ids(paper.id, len(paper.embeddings))
+                if ids[0] not in vector_store:
+                    vector_store.add(ids, np.array(paper.embeddings, dtype="float32"))
+                    migrated += len(ids)
+            paper.embeddings = None
+            db.commit()
+        print(f"Migrated {migrated} chunk embeddings from {len(paper_ids)} papers to the vector store")
+        return migrated
+    finally:
+        db.close()
+
+def migrate_json_chunks() -> int:
+    """Copy legacy JSON chunk arrays into paper_chunks and re-key their stored vectors.
+
+    Run after migrate_json_embeddings and before new uploads; rebuild the FAISS index afterwards.
+    """
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
+    try:
+        migrated_papers = db.query(models.PaperChunk.paper_id).distinct()
+        paper_ids = [
+            row[0] for row in
+            db.query(models.ResearchPaper.id)
+            .filter(models.ResearchPaper.chunks.isnot(None), models.ResearchPaper.id.notin_(migrated_papers))
+            .all()
+        ]
+        migrated = 0
+        old_ids, new_ids = [], []
+        for paper_id in paper_ids:
+            paper = db.query(models.ResearchPaper).filter(models.ResearchPaper.id == paper_id).first()
+            chunks = paper.chunks or []
+            content = paper.content or ""
+            spans, position = [], 0
+            for chunk in chunks:
+                start = content.find(chunk, position)
+                if start == -1:
+                    spans.append((None, None))
+                else:
+                    spans.append((start, start + len(chunk)))
+                    position = start + 1
+            chunk_ids = crud.create_paper_chunks(db, paper.id, spans, chunks)
+            old_ids.extend(legacy_vector_ids(paper.id, len(chunks)).tolist())
+            new_ids.extend(chunk_ids)
+
+            paper.chunks = None
+            db.commit()
+            migrated += len(chunks)
+        # Re-key all vectors at once so new chunk ids can't clash with legacy ids
+        vector_store.rekey(old_ids, new_ids)
+        print(f"Migrated {migrated} chunks from {len(paper_ids)} papers to paper_chunks")
+        return migrated
+    finally:
+        db.close()
+
+def rebuild_keyword_index():
+    """Re-index every stored paper for keyword search"""
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            models.ResearchPaper.id, models.ResearchPaper.title,
+            models.ResearchPaper.abstract, models.ResearchPaper.content
+        ).yield_per(100)
+        count = 0
+        for paper_id, title, abstract, content in rows:
+            keyword_index.add_document(paper_id, paper_keyword_text(title, abstract, content))
+            count += 1
+        keyword_index.compact()
+        print(f"Rebuilt keyword index with {count} papers")
+    finally:
+        db.close()
+
+def remove_paper_from_index(db: Session, paper_id: int) -> int:
+    """Drop a paper's chunk vectors from the vector store and FAISS index"""
+    try:
+        ids = np.array(crud.get_paper_chunk_ids(db, paper_id), dtype="int64")
+        vector_store.remove(ids)
+        removed = faiss_index.remove_ids(ids)
+        print(f"Removed {removed} vectors for paper {paper_id} from FAISS index")
+        return removed
     except Exception as e:
-        print(f"Error adding paper to index: {e}")
-        return [], []
+        print(f"Error removing paper from index: {e}")
+        return 0
 
-def semantic_search(query: str, top_k: int = 10) -> List[Dict[str, Any]]:
-    """Perform semantic search using FAISS and OpenRouter embeddings"""
+def semantic_search(query: str, top_k: int = 10, nprobe: Optional[int] = None,
+                    ef_search: Optional[int] = None, allowed_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """Perform semantic search using FAISS and OpenRouter embeddings, optionally only over allowed chunk ids"""
     try:
-        # Get query embedding
-        query_embedding = get_embeddings_openrouter([query])
-        if not query_embedding:
-            return []
-        
-        query_vector = np.array([query_embedding[0]]).astype("float32")
+        # Get query embedding (repeated queries are served from memory)
+        query_vector = search_cache.query_embeddings.get(query)
+        metrics.record_cache("query_embeddings", hits=int(query_vector is not None), misses=int(query_vector is None))
+        if query_vector is None:
+            with metrics.span("search.query_embedding"):
+                query_vector = get_embeddings_openrouter([query])
+            search_cache.query_embeddings.put(query, query_vector)
         
         # Search in FAISS
-        distances, indices = faiss_index.search(query_vector, top_k)
+        with metrics.span("search.faiss"):
+            distances, indices = faiss_index.search(
+                query_vector, top_k, nprobe=nprobe, ef_search=ef_search,
+                allowed_ids=None if allowed_ids is None else np.array(allowed_ids, dtype="int64")
+            )
         
+        similarities = faiss_index.similarities(distances[0])
         results = []
-        for i, (distance, idx) in enumerate(zip(distances[0], indices[0])):
+        for distance, similarity, idx in zip(distances[0], similarities, indices[0]):
             if idx != -1:
-                paper_id = idx // 10000
-                chunk_index = idx % 10000
                 results.append({
-                    'paper_id': int(paper_id),
-                    'chunk_index': int(chunk_index),
-                    'similarity_score': float(1 / (1 + distance)),  # Convert distance to similarity
+                    'chunk_id': int(idx),
+                    'similarity_score': float(similarity),  # cosine, or 1/(1+L2) for L2 indexes
                     'distance': float(distance)
                 })
         
@@ -306,89 +419,115 @@ def semantic_search(query: str, top_k: int = 10) -> List[Dict[str, Any]]:
         print(f"Error in semantic search: {e}")
         return []
 
-def hybrid_search(query: str, papers: List, top_k: int = 10) -> List[Dict[str, Any]]:
-    """Combine semantic and keyword search"""
-    # Semantic search
-    semantic_results = semantic_search(query, top_k * 2)
-    
-    # Keyword search
-    keyword_results = []
-    query_terms = set(term.lower() for term in query.split() if len(term) > 2)
-    
-    if query_terms:
-        for paper in papers:
-            content = f"{paper.title or ''} {paper.abstract or ''} {paper.content or ''}".lower()
-            matches = sum(1 for term in query_terms if term in content)
-            if matches > 0:
-                keyword_results.append({
-                    'paper_id': paper.id,
-                    'keyword_matches': matches,
-                    'content': content
-                })
-    
-    # Combine and rank results
-    combined_results = []
-    seen_papers = set()
-    
-    # Add semantic results first
-    for result in semantic_results:
-        if result['paper_id'] not in seen_papers:
-            paper = next((p for p in papers if p.id == result['paper_id']), None)
-            if paper:
-                combined_results.append({
-                    'paper': paper,
-                    'score': result['similarity_score'],
-                    'type': 'semantic',
-                    'chunk_index': result['chunk_index']
-                })
-                seen_papers.add(paper.id)
-    
-    # Add keyword results
-    for result in keyword_results:
-        if result['paper_id'] not in seen_papers:
-            paper = next((p for p in papers if p.id == result['paper_id']), None)
-            if paper:
-                combined_results.append({
-                    'paper': paper,
-                    'score': result['keyword_matches'] / len(query_terms),
-                    'type': 'keyword',
-                    'chunk_index': 0
-                })
-                seen_papers.add(paper.id)
-    
-    # Sort by score and return top_k
-    combined_results.sort(key=lambda x: x['score'], reverse=True)
-    return combined_results[:top_k]
-
-def get_relevant_snippet(content: str, query: str, max_length: int = 300) -> str:
-    """Extract a relevant snippet showing query terms"""
-    if not content or not query:
-        return content[:max_length] + "..." if len(content) > max_length else content
-    
-    content_lower = content.lower()
-    query_terms = [term for term in query.lower().split() if len(term) > 2]
-    
-    if not query_terms:
-        return content[:max_length] + "..." if len(content) > max_length else content
+def hybrid_search(query: str, db: Session, top_k: int = 10, nprobe: Optional[int] = None,
+                  ef_search: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+                  fusion_method: Optional[str] = None, aggregation: Optional[str] = None,
+                  semantic_weight: Optional[float] = None, candidates: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Combine semantic and keyword search into ranked paper ids (rows are loaded by the caller).
+
+    filters (category, project_id, date_from, date_to) are resolved to paper and chunk ids in
+    SQL first and enforced inside both retrievers, so filtered searches still fill top_k.
+    Both retrievers return `candidates` hits (top_k * FUSION_CANDIDATE_FACTOR by default);
+    chunk hits are aggregated per paper and the lists fused as in fusion.fuse_results.
+    """
+    allowed_papers, allowed_chunks = None, None
+    if filters and any(value is not None for value in filters.values()):
+        with metrics.span("search.filters"):
+            allowed_papers, allowed_chunks = crud.get_filtered_ids(db, **filters)
+        if not allowed_papers:
+            return []
+    candidates = candidates or top_k * FUSION_CANDIDATE_FACTOR
+
+    # Semantic search, resolving matched chunks to their papers
+    semantic_results = semantic_search(query, candidates, nprobe=nprobe, ef_search=ef_search, allowed_ids=allowed_chunks)
+    with metrics.span("search.chunk_papers"):
+        chunk_papers = crud.get_chunk_paper_ids(db, [result['chunk_id'] for result in semantic_results])
     
-    # Find the best match position
-    best_position = -1
-    for term in query_terms:
-        pos = content_lower.find(term)
-        if pos != -1 and (best_position == -1 or pos < best_position):
-            best_position = pos
+    # Keyword search (BM25 over the inverted index)
+    keyword_results = keyword_search(query, candidates, allowed_papers)
     
-    if best_position != -1:
-        start = max(0, best_position - 100)
-        end = min(len(content), best_position + 200)
-        snippet = content[start:end]
-        
-        if start > 0:
-            snippet = "..." + snippet
-        if end < len(content):
-            snippet = snippet + "..."
-        
-        return snippet
-    
-    # Fallback to beginning
-    return content[:max_length] + "..." if len(content) > max_length else content
\ No newline at end of file
+    return fuse_search_results(
+        semantic_results, chunk_papers, keyword_results, top_k, fusion_method, aggregation, semantic_weight
+    )
+
+async def hybrid_search_async(query: str, db: AsyncSession, top_k: int = 10, nprobe: Optional[int] = None,
+                              ef_search: Optional[int] = None, filters: Optional[Dict[str, Any]] = None,
+                              fusion_method: Optional[str] = None, aggregation: Optional[str] = None,
+                              semantic_weight: Optional[float] = None, candidates: Optional[int] = None) -> List[Dict[str, Any]]:
+    """hybrid_search over an AsyncSession. The blocking retrievers (embeddings call + FAISS,
+    BM25) run on the threadpool side by side while the event loop serves other requests."""
+    allowed_papers, allowed_chunks = None, None
+    if filters and any(value is not None for value in filters.values()):
+        with metrics.span("search.filters"):
+            allowed_papers, allowed_chunks = await crud.get_filtered_ids_async(db, **filters)
+        if not allowed_papers:
+            return []
+    candidates = candidates or top_k * FUSION_CANDIDATE_FACTOR
+
+    semantic_results, keyword_results = await asyncio.gather(
+        run_in_threadpool(semantic_search, query, candidates, nprobe=nprobe, ef_search=ef_search, allowed_ids=allowed_chunks),
+        run_in_threadpool(keyword_search, query, candidates, allowed_papers),
+    )
+    with metrics.span("search.chunk_papers"):
+        chunk_papers = await crud.get_chunk_paper_ids_async(db, [result['chunk_id'] for result in semantic_results])
+
+    return fuse_search_results(
+        semantic_results, chunk_papers, keyword_results, top_k, fusion_method, aggregation, semantic_weight
+    )
+
+def keyword_search(query: str, candidates: int, allowed_papers: Optional[set] = None) -> List[Tuple[int, float]]:
+    with metrics.span("search.keyword"):
+        return keyword_index.search(query, candidates, allowed=allowed_papers)
+
+def fuse_search_results(semantic_results: List[Dict[str, Any]], chunk_papers: Dict[int, int],
+                        keyword_results: List[Tuple[int, float]], top_k: int, fusion_method: Optional[str] = None,
+                        aggregation: Optional[str] = None, semantic_weight: Optional[float] = None) -> List[Dict[str, Any]]:
+    """fusion.fuse_results with the configured defaults for unset ranking options"""
+    with metrics.span("search.fusion"):
+        return fusion.fuse_results(
+            semantic_results, chunk_papers, keyword_results, top_k,
+            method=fusion_method or FUSION_METHOD,
+            aggregation=aggregation or CHUNK_AGGREGATION,
+            semantic_weight=FUSION_SEMANTIC_WEIGHT if semantic_weight is None else semantic_weight,
+            rrf_k=FUSION_RRF_K
+        )
+
+def build_search_results(db: Session, query: str, ranked: List[Dict[str, Any]]) -> List[schemas.SearchResult]:
+    """Format ranked hits with one joined query for papers, matched chunks and projects"""
+    with metrics.span("search.result_rows"):
+        rows = crud.get_search_result_papers(db, {result['paper_id']: result['chunk_id'] for result in ranked})
+    with metrics.span("search.snippets"):
+        return _format_results(query, ranked, rows)
+
+async def build_search_results_async(db: AsyncSession, query: str, ranked: List[Dict[str, Any]]) -> List[schemas.SearchResult]:
+    """build_search_results over an AsyncSession"""
+    with metrics.span("search.result_rows"):
+        rows = await crud.get_search_result_papers_async(db, {result['paper_id']: result['chunk_id'] for result in ranked})
+    with metrics.span("search.snippets"):
+        return _format_results(query, ranked, rows)
+
+def _format_results(query: str, ranked: List[Dict[str, Any]], rows: Dict[int, tuple]) -> List[schemas.SearchResult]:
+    formatted_results = []
+    for result in ranked:
+        row = rows.get(result['paper_id'])
+        if row is None:
+            continue
+        paper, snippet_source, page_number, project_name, project_status = row
+        snippet, highlights = snippets.build_snippet(snippet_source, query)
+        formatted_results.append(schemas.SearchResult(
+            id=paper.id,
+            title=paper.title or paper.filename,
+            authors=paper.authors or [],
+            abstract=paper.abstract or "",
+            journal=paper.journal,
+            publication_date=paper.publication_date,
+            category=paper.category,
+            snippet=snippet,
+            highlights=highlights,
+            similarity_score=result['score'],
+            filename=paper.filename,
+            page_number=page_number,
+            project_name=project_name,
+            project_status=project_status
+        ))
+    return formatted_results
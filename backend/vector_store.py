@@ -0,0 +1,316 @@
+import os
+import json
+import threading
+import numpy as np
+from typing import List, Optional, Tuple
+from interprocess import SharedLock, file_stamp
+from config import VECTOR_STORE_DIR, VECTOR_STORE_DTYPE, VECTOR_STORE_MAX_SEGMENTS, EMBEDDING_DIMENSION
+
+MANIFEST_NAME = "manifest.json"
+REMOVED_NAME = "removed.bin"
+LOCK_NAME = "store.lock"
+DTYPES = ("float32", "float16", "int8")
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Encode float32 vectors as dtype; int8 uses a symmetric per-vector scale"""
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype("int8")
+        return codes, scales.astype("float32")
+    return vectors.astype(dtype), None
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    if scales is not None:
+        return codes.astype("float32") * scales[:, None]
+    return codes.astype("float32")
+
+
+class VectorStore:
+    """Append-only store of raw chunk vectors keyed by vector id.
+
+    Each add writes a segment of ``.npy`` files (codes, ids and, for int8, scales) that are
+    memory-mapped on load. Removed ids are appended to ``removed.bin`` and dropped when
+    segments are merged. This is the source of truth the FAISS index is rebuilt from.
+
+    Processes sharing the directory serialise writes on ``store.lock``, and reads reload the
+    manifest when another process changed it (segments already mapped are reused).
+    """
+
+    def __init__(self, store_dir: str = VECTOR_STORE_DIR, dimension: int = EMBEDDING_DIMENSION,
+                 dtype: str = VECTOR_STORE_DTYPE):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector store dtype '{dtype}', expected one of {DTYPES}")
+        self.store_dir = store_dir
+        self.dimension = dimension
+        self.dtype = dtype
+        self._lock = threading.RLock()
+        self.segments: List[str] = []
+        self._next_seq = 1
+        self._removed = set()
+        self._ids = np.zeros(0, dtype="int64")
+        self._locations = np.zeros((0, 2), dtype="int64")  # (segment index, row) per entry of _ids
+        self._order = np.zeros(0, dtype="int64")  # argsort of _ids for lookups
+        self._cache = {}
+        self._stamps = None  # (manifest, removed.bin) stamps as of the last load
+        os.makedirs(store_dir, exist_ok=True)
+        self._writer = SharedLock(self._path(LOCK_NAME))
+        with self._writer:
+            self.load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.store_dir, name)
+
+    def _write_manifest(self):
+        manifest = {
+            "dimension": self.dimension,
+            "dtype": self.dtype,
+            "segments": self.segments,
+            "next_seq": self._next_seq,
+        }
+        tmp_path = self._path(MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._path(MANIFEST_NAME))
+        self._stamps = self._disk_stamps()
+
+    def _disk_stamps(self) -> tuple:
+        return file_stamp(self._path(MANIFEST_NAME)), file_stamp(self._path(REMOVED_NAME))
+
+    def refresh(self):
+        """Reload if another process added, removed or compacted vectors"""
+        if self._disk_stamps() == self._stamps:
+            return
+        with self._lock, self._writer:
+            if self._disk_stamps() != self._stamps:
+                self.load()
+
+    def __len__(self) -> int:
+        return len(self._ids) - len(self._removed)
+
+    def __contains__(self, vector_id: int) -> bool:
+        self.refresh()
+        pos = np.searchsorted(self._ids, vector_id, sorter=self._order)
+        return (pos < len(self._order) and self._ids[self._order[pos]] == vector_id
+                and int(vector_id) not in self._removed)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(os.path.getsize(self._path(f"{name}.codes.npy")) for name in self.segments)
+
+    # ------------------------------------------------------------ persistence
+    def load(self):
+        with self._lock:
+            os.makedirs(self.store_dir, exist_ok=True)
+            manifest_path = self._path(MANIFEST_NAME)
+            if not os.path.exists(manifest_path):
+                self._write_manifest()
+                return
+            self._stamps = self._disk_stamps()
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest["dimension"] != self.dimension:
+                raise ValueError(
+                    f"Vector store dimension mismatch: expected {self.dimension}, got {manifest['dimension']}"
+                )
+            # Existing segments keep the dtype they were written with
+            self.dtype = manifest.get("dtype", self.dtype)
+            self.segments = manifest["segments"]
+            self._next_seq = manifest.get("next_seq", len(self.segments) + 1)
+            removed_path = self._path(REMOVED_NAME)
+            self._removed = set()
+            if os.path.exists(removed_path):
+                self._removed = set(np.fromfile(removed_path, dtype="int64").tolist())
+            for name in set(self._cache) - set(self.segments):
+                del self._cache[name]
+            self._reindex()
+
+    def _segment(self, name: str):
+        if name not in self._cache:
+            codes = np.load(self._path(f"{name}.codes.npy"), mmap_mode="r")
+            ids = np.load(self._path(f"{name}.ids.npy"))
+            scales_path = self._path(f"{name}.scales.npy")
+            scales = np.load(scales_path) if os.path.exists(scales_path) else None
+            self._cache[name] = (codes, ids, scales)
+        return self._cache[name]
+
+    def _reindex(self):
+        ids, locations = [], []
+        for seg_index, name in enumerate(self.segments):
+            seg_ids = self._segment(name)[1]
+            ids.append(seg_ids)
+            locations.append(np.stack([np.full(len(seg_ids), seg_index), np.arange(len(seg_ids))], axis=1))
+        if ids:
+            self._ids = np.concatenate(ids)
+            self._locations = np.concatenate(locations)
+        else:
+            self._ids = np.zeros(0, dtype="int64")
+            self._locations = np.zeros((0, 2), dtype="int64")
+        self._order = np.argsort(self._ids, kind="stable")
+
+    def _index_segment(self, seg_index: int):
+        """Merge a newly appended segment's ids into the lookup arrays without re-sorting the rest"""
+        seg_ids = self._segment(self.segments[seg_index])[1]
+        seg_order = np.argsort(seg_ids, kind="stable")
+        # Equal ids go after existing entries, as a stable argsort of the concatenation would
+        positions = np.searchsorted(self._ids[self._order], seg_ids[seg_order], side="right")
+        self._order = np.insert(self._order, positions, seg_order + len(self._ids))
+        self._ids = np.concatenate([self._ids, seg_ids])
+        self._locations = np.concatenate([
+            self._locations, np.stack([np.full(len(seg_ids), seg_index), np.arange(len(seg_ids))], axis=1)
+        ])
+
+    def _save_segment(self, name: str, vectors: np.ndarray, ids: np.ndarray):
+        codes, scales = quantize(vectors, self.dtype)
+        np.save(self._path(f"{name}.codes.npy"), codes)
+        np.save(self._path(f"{name}.ids.npy"), ids)
+        if scales is not None:
+            np.save(self._path(f"{name}.scales.npy"), scales)
+
+    def _delete_segment(self, name: str):
+        self._cache.pop(name, None)
+        for suffix in ("codes", "ids", "scales"):
+            path = self._path(f"{name}.{suffix}.npy")
+            if os.path.exists(path):
+                os.remove(path)
+
+    # ------------------------------------------------------------ mutations
+    def add(self, ids, vectors: np.ndarray):
+        """Persist vectors as a new segment"""
+        ids = np.ascontiguousarray(ids, dtype="int64")
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Embedding dimension mismatch: expected {self.dimension}, got {vectors.shape[1]}")
+
+        with self._lock, self._writer:
+            self.refresh()
+            name = f"seg-{self._next_seq:06d}"
+            self._save_segment(name, vectors, ids)
+            self.segments.append(name)
+            self._next_seq += 1
+            self._write_manifest()
+            self._index_segment(len(self.segments) - 1)
+            if len(self.segments) > VECTOR_STORE_MAX_SEGMENTS:
+                self.compact()
+
+    def remove(self, ids):
+        ids = np.ascontiguousarray(ids, dtype="int64")
+        with self._lock, self._writer:
+            self.refresh()
+            ids = ids[np.isin(ids, self._ids)]
+            if len(ids) == 0:
+                return
+            with open(self._path(REMOVED_NAME), "ab") as f:
+                ids.tofile(f)
+            self._removed.update(ids.tolist())
+            self._stamps = self._disk_stamps()
+
+    def compact(self):
+        """Merge all segments into one, dropping removed vectors"""
+        with self._lock, self._writer:
+            self.refresh()
+            if self.segments:
+                self._rewrite()
+
+    def rekey(self, old_ids, new_ids):
+        """Rename vector ids in one pass (rewrites the store as a single segment)"""
+        old_ids = np.asarray(old_ids, dtype="int64")
+        order = np.argsort(old_ids)
+        with self._lock, self._writer:
+            self.refresh()
+            self._rewrite(old_ids[order], np.asarray(new_ids, dtype="int64")[order])
+
+    def _rewrite(self, old_ids: Optional[np.ndarray] = None, new_ids: Optional[np.ndarray] = None):
+        """Copy live vectors into a single new segment, renaming sorted old_ids to new_ids.
+
+        Codes and scales are copied as stored, one segment at a time into a memory-mapped
+        output, so neither the whole store nor a float32 copy of it is held in memory.
+        """
+        removed = np.fromiter(self._removed, dtype="int64") if self._removed else None
+        keeps = []
+        for name in self.segments:
+            seg_ids = self._segment(name)[1]
+            keeps.append(np.ones(len(seg_ids), dtype=bool) if removed is None else ~np.isin(seg_ids, removed))
+        total = int(sum(keep.sum() for keep in keeps))
+        int8 = self.dtype == "int8"
+
+        name = f"seg-{self._next_seq:06d}"
+        codes_path = self._path(f"{name}.codes.npy")
+        if total:
+            codes_out = np.lib.format.open_memmap(codes_path, mode="w+", dtype=self.dtype, shape=(total, self.dimension))
+        else:
+            np.save(codes_path, np.zeros((0, self.dimension), dtype=self.dtype))
+        ids_out = np.zeros(total, dtype="int64")
+        scales_out = np.zeros(total, dtype="float32") if int8 else None
+        row = 0
+        for seg_name, keep in zip(self.segments, keeps):
+            codes, seg_ids, scales = self._segment(seg_name)
+            count = int(keep.sum())
+            if not count:
+                continue
+            codes_out[row:row + count] = codes[keep]
+            seg_ids = seg_ids[keep]
+            if old_ids is not None and len(old_ids):
+                positions = np.minimum(np.searchsorted(old_ids, seg_ids), len(old_ids) - 1)
+                renamed = old_ids[positions] == seg_ids
+                seg_ids = np.where(renamed, new_ids[positions], seg_ids)
+            ids_out[row:row + count] = seg_ids
+            if int8:
+                scales_out[row:row + count] = scales[keep]
+            row += count
+        if total:
+            codes_out.flush()
+            del codes_out
+        np.save(self._path(f"{name}.ids.npy"), ids_out)
+        if int8:
+            np.save(self._path(f"{name}.scales.npy"), scales_out)
+
+        old_segments = self.segments
+        self.segments = [name]
+        self._next_seq += 1
+        open(self._path(REMOVED_NAME), "wb").close()
+        self._write_manifest()
+        self._removed = set()
+        for old in old_segments:
+            self._delete_segment(old)
+        self._reindex()
+
+    # ------------------------------------------------------------ reads
+    def get(self, ids) -> np.ndarray:
+        """float32 vectors for ids (rows of zeros for unknown or removed ids)"""
+        ids = np.asarray(ids, dtype="int64")
+        out = np.zeros((len(ids), self.dimension), dtype="float32")
+        self.refresh()
+        with self._lock:
+            if len(ids) == 0 or len(self._ids) == 0:
+                return out
+            positions = np.minimum(np.searchsorted(self._ids, ids, sorter=self._order), len(self._order) - 1)
+            entries = self._order[positions]
+            found = self._ids[entries] == ids
+            if self._removed:
+                found &= ~np.isin(ids, np.fromiter(self._removed, dtype="int64"))
+            rows_out = np.flatnonzero(found)
+            locations = self._locations[entries[rows_out]]
+            for seg_index in np.unique(locations[:, 0]):
+                in_segment = locations[:, 0] == seg_index
+                rows = locations[in_segment, 1]
+                codes, _, scales = self._segment(self.segments[seg_index])
+                out[rows_out[in_segment]] = dequantize(codes[rows], None if scales is None else scales[rows])
+        return out
+
+    def load_all(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(vectors, ids) for every live vector, as float32"""
+        self.refresh()
+        with self._lock:
+            vectors, ids = [], []
+            removed = np.fromiter(self._removed, dtype="int64") if self._removed else None
+            for name in self.segments:
+                codes, seg_ids, scales = self._segment(name)
+                keep = np.ones(len(seg_ids), dtype=bool) if removed is None else ~np.isin(seg_ids, removed)
+                vectors.append(dequantize(codes[keep], None if scales is None else scales[keep]))
+                ids.append(seg_ids[keep])
+        if not vectors:
+            return np.zeros((0, self.dimension), dtype="float32"), np.zeros(0, dtype="int64")
+        return np.vstack(vectors), np.concatenate(ids)
@@ -0,0 +1,83 @@
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class Lazy:
+    """Stand-in for an expensive module-level object (index, cache) that is built on first
+    use, or ahead of time by the warm-up thread, and then forwards every attribute to it"""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.__dict__.update(_name=name, _factory=factory, _value=None, _lock=threading.Lock())
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> Any:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self.__dict__["_value"] = self._factory()
+        return self._value
+
+    def __getattr__(self, attr: str):
+        return getattr(self.get(), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self.get(), attr, value)
+
+    def __contains__(self, item) -> bool:
+        return item in self.get()
+
+    def __len__(self) -> int:
+        return len(self.get())
+
+
+# Warm-up runs named steps in order on a background thread; status() reports progress
+_steps: List[Tuple[str, Callable[[], Any]]] = []
+_state: Dict[str, Any] = {"status": "pending", "current": None, "error": None, "seconds": {}}
+_thread: Optional[threading.Thread] = None
+
+
+def _run():
+    started = time.monotonic()
+    _state["status"] = "warming"
+    for name, step in _steps:
+        _state["current"] = name
+        step_started = time.monotonic()
+        try:
+            step()
+        except Exception as e:
+            _state.update(status="failed", error=f"{name}: {e}")
+            print(f"Warm-up step {name} failed: {e}")
+            return
+        _state["seconds"][name] = round(time.monotonic() - step_started, 3)
+    _state.update(status="ready", current=None)
+    print(f"Warm-up finished in {time.monotonic() - started:.2f}s")
+
+
+def start(steps: List[Tuple[str, Callable[[], Any]]]) -> threading.Thread:
+    """Run steps on a daemon thread (once per process)"""
+    global _thread
+    if _thread is None:
+        _steps.extend(steps)
+        _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+        _thread.start()
+    return _thread
+
+
+def is_ready() -> bool:
+    return _state["status"] == "ready"
+
+
+def status() -> Dict[str, Any]:
+    done = len(_state["seconds"])
+    return {
+        "status": _state["status"],
+        "progress": round(done / len(_steps), 3) if _steps else 0.0,
+        "current_step": _state["current"],
+        "completed_steps": dict(_state["seconds"]),
+        "pending_steps": [name for name, _ in _steps[done:]],
+        "error": _state["error"],
+    }
@@ -36,11 +36,20 @@ export const uploadResearchPaper = (formData, config = {}) => api.post("/api/upl
     ...config
 });
 
-export const searchPapers = (query, top_k = 10) => {
-  return api.get("/api/search", { params: { query, top_k } });
+export const getJob = (jobId) => api.get(`/api/jobs/${jobId}`);
+export const retryJob = (jobId) => api.post(`/api/jobs/${jobId}/retry`);
+
+export const searchPapers = (query, top_k = 10, filters = {}) => {
+  // Filters are applied server-side; empty values are omitted
+  const activeFilters = Object.fromEntries(
+    Object.entries(filters).filter(([, value]) => value !== "" && value !== null && value !== undefined)
+  );
+  return api.get("/api/search", { params: { query, top_k, ...activeFilters } });
 };
 
-export const getAllPapers = () => api.get("/api/papers");
+// Keyset-paginated listing: pass the previous page's next_cursor as `after`
+export const getPapers = (params = {}) => api.get("/api/papers", { params });
+export const getPaperFacets = () => api.get("/api/papers/facets");
 export const getPaper = (paperId) => api.get(`/api/papers/${paperId}`);
 export const deletePaper = (paperId) => api.delete(`/api/papers/${paperId}`);
 export const downloadPaper = (paperId) => {
@@ -93,8 +93,8 @@ export default function AdminUploadPage() {
                 config.params = { project_id: selectedProject };
             }
             
-            await uploadResearchPaper(formData, config);
-            alert("Research paper uploaded successfully!");
+            const res = await uploadResearchPaper(formData, config);
+            alert(`Research paper uploaded and queued for processing (job ${res.data.job_id}).`);
             // Reset form
             setFile(null);
             setSelectedProject("");
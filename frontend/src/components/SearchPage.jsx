@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from "react";
-import { searchPapers, downloadPaper, getAllPapers } from "../api";
+import { searchPapers, downloadPaper, getPaperFacets } from "../api";
 import SearchResults from "./SearchResults";
 
 export default function SearchPage() {
@@ -9,24 +9,19 @@ export default function SearchPage() {
     const [searchStats, setSearchStats] = useState(null);
     const [filters, setFilters] = useState({
         category: "",
-        project: "",
+        project_id: "",
+        date_from: "",
+        date_to: "",
     });
-    const [allPapers, setAllPapers] = useState([]);
+    const [facets, setFacets] = useState({ categories: [], projects: [] });
 
-    // Load all papers for filter options
+    // Load category/project counts for filter options
     useEffect(() => {
-        loadAllPapers();
+        getPaperFacets()
+            .then(response => setFacets(response.data))
+            .catch(error => console.error("Failed to load filter options:", error));
     }, []);
 
-    const loadAllPapers = async () => {
-        try {
-            const response = await getAllPapers();
-            setAllPapers(response.data);
-        } catch (error) {
-            console.error("Failed to load papers:", error);
-        }
-    };
-
     const handleSearch = async () => {
         if (!query.trim()) return;
         
@@ -34,29 +29,13 @@ export default function SearchPage() {
         setSearchStats(null);
         try {
             const startTime = performance.now();
-            const res = await searchPapers(query);
+            const res = await searchPapers(query, 10, filters);
             const endTime = performance.now();
             
-            let filteredResults = res.data.results;
-            
-            // Apply filters
-            if (filters.category) {
-                filteredResults = filteredResults.filter(result => 
-                    result.category === filters.category
-                );
-            }
-            
-            if (filters.project) {
-                filteredResults = filteredResults.filter(result => 
-                    result.project_name === filters.project
-                );
-            }
-            
-            setResults(filteredResults);
+            setResults(res.data.results);
             setSearchStats({
                 time: (endTime - startTime) / 1000,
-                count: filteredResults.length,
-                total: res.data.total_count
+                count: res.data.total_count
             });
         } catch (error) {
             console.error("Search failed:", error);
@@ -87,14 +66,13 @@ export default function SearchPage() {
         }
     };
 
-    // Get unique values for filters from all papers (not just search results)
-    const categories = [...new Set(allPapers.map(paper => paper.category).filter(Boolean))];
-    const projects = [...new Set(allPapers.map(paper => paper.project_name).filter(Boolean))];
 
     const clearFilters = () => {
         setFilters({
             category: "",
-            project: "",
+            project_id: "",
+            date_from: "",
+            date_to: "",
         });
         if (query) {
             handleSearch();
@@ -126,8 +104,8 @@ export default function SearchPage() {
                                 onChange={(e) => setFilters({...filters, category: e.target.value})}
                             >
                                 <option value="">All Categories</option>
-                                {categories.map(cat => (
-                                    <option key={cat} value={cat}>{cat}</option>
+                                {facets.categories.map(cat => (
+                                    <option key={cat.value} value={cat.value}>{cat.value} ({cat.count})</option>
                                 ))}
                             </select>
                         </div>
@@ -135,15 +113,33 @@ export default function SearchPage() {
                         <div className="filter-group">
                             <label>Project</label>
                             <select 
-                                value={filters.project}
-                                onChange={(e) => setFilters({...filters, project: e.target.value})}
+                                value={filters.project_id}
+                                onChange={(e) => setFilters({...filters, project_id: e.target.value})}
                             >
                                 <option value="">All Projects</option>
-                                {projects.map(project => (
-                                    <option key={project} value={project}>{project}</option>
+                                {facets.projects.map(project => (
+                                    <option key={project.id} value={project.id}>{project.name} ({project.count})</option>
                                 ))}
                             </select>
                         </div>
+
+                        <div className="filter-group">
+                            <label>Published From</label>
+                            <input 
+                                type="date"
+                                value={filters.date_from}
+                                onChange={(e) => setFilters({...filters, date_from: e.target.value})}
+                            />
+                        </div>
+
+                        <div className="filter-group">
+                            <label>Published To</label>
+                            <input 
+                                type="date"
+                                value={filters.date_to}
+                                onChange={(e) => setFilters({...filters, date_to: e.target.value})}
+                            />
+                        </div>
                         
                         <button 
                             onClick={clearFilters}
@@ -158,7 +154,7 @@ export default function SearchPage() {
 
             {searchStats && (
                 <div className="search-stats">
-                    Found {searchStats.count} results (filtered from {searchStats.total} total) in {searchStats.time.toFixed(2)} seconds
+                    Found {searchStats.count} results in {searchStats.time.toFixed(2)} seconds
                 </div>
             )}
 
@@ -1,5 +1,18 @@
 import React from "react";
 
+// Render a snippet with the backend's (start, end) highlight spans wrapped in <mark>
+function HighlightedSnippet({ text, highlights = [] }) {
+    const parts = [];
+    let position = 0;
+    highlights.forEach(([start, end], i) => {
+        if (start > position) parts.push(text.slice(position, start));
+        parts.push(<mark key={i}>{text.slice(start, end)}</mark>);
+        position = end;
+    });
+    parts.push(text.slice(position));
+    return <div className="snippet-preview">{parts}</div>;
+}
+
 export default function SearchResults({ results, query, loading, onDownload }) {
     if (loading) {
         return <div className="loading">Searching through repository...</div>;
@@ -30,9 +43,10 @@ export default function SearchResults({ results, query, loading, onDownload }) {
         );
     }
 
-    const handleView = (paperId) => {
-    // Use the full backend API URL
-    const apiUrl = `${process.env.REACT_APP_API_URL || 'http://localhost:8000'}/api/download/${paperId}?view=true`;
+    const handleView = (paperId, pageNumber) => {
+    // Use the full backend API URL; open at the matched page when known
+    const pageAnchor = pageNumber ? `#page=${pageNumber}` : '';
+    const apiUrl = `${process.env.REACT_APP_API_URL || 'http://localhost:8000'}/api/download/${paperId}?view=true${pageAnchor}`;
     window.open(apiUrl, '_blank', 'noopener,noreferrer');
 };
 
@@ -71,6 +85,9 @@ export default function SearchResults({ results, query, loading, onDownload }) {
                                                     : result.abstract}
                                             </div>
                                         )}
+                                        {result.snippet && (
+                                            <HighlightedSnippet text={result.snippet} highlights={result.highlights} />
+                                        )}
                                         <div className="paper-meta">
                                             {result.category && (
                                                 <span className="meta-tag category">{result.category}</span>
@@ -113,7 +130,7 @@ export default function SearchResults({ results, query, loading, onDownload }) {
                                     <div className="action-buttons">
                                         <button
                                             className="download-btn"
-                                            onClick={() => handleView(result.id)}
+                                            onClick={() => handleView(result.id, result.page_number)}
                                             title="View PDF"
                                         >
                                             View
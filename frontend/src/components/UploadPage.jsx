@@ -15,7 +15,7 @@ export default function UploadPage() {
         setUploading(true);
         try {
             const res = await uploadResearchPaper(file);
-            alert(`Research paper uploaded successfully! Paper ID: ${res.data.paper_id}`);
+            alert(`Research paper uploaded and queued for processing! Job ID: ${res.data.job_id}`);
             setFile(null);
             document.getElementById("file-input").value = "";
         } catch (error) {